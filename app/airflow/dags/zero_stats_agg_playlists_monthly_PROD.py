@@ -1,8 +1,15 @@
 from airflow.decorators import dag, task
+from airflow.models.param import Param
 from datetime import datetime
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 import jinja2
 
+QUERIES = {
+    'full': 'queries/zero_stats/agg_playlists_monthly.sql',
+    'incremental': 'queries/zero_stats/agg_playlists_monthly_incremental.sql',
+    'refresh': 'queries/zero_stats/refresh_agg_playlists_monthly.sql',
+}
+
 @dag(
     dag_id='zero_stats_agg_playlists_monthly_PROD',
     description='Agregacja danych o playlistach',
@@ -13,6 +20,13 @@ import jinja2
     tags=['zero_stats','PROD'],
     default_args={
         'owner': 'mateuszwisniewski',
+    },
+    params={
+        # incremental - tylko klucze zmienione od ostatniego watermarku, full - pełne przeliczenie,
+        # refresh - REFRESH MATERIALIZED VIEW CONCURRENTLY (po ddl/materialized_views.sql)
+        'mode': Param('incremental', enum=['incremental', 'full', 'refresh']),
+        # Porównanie tabeli z pełnym przeliczeniem (pełny skan videos / playlist_videos)
+        'verify': Param(False, type='boolean'),
     }
 )
 def zero_stats_agg_playlists_monthly(**context):
@@ -26,12 +40,25 @@ def zero_stats_agg_playlists_monthly(**context):
         
         # Odczytaj SQL z pliku
         sql = jinja2.Template(
-            open('queries/zero_stats/agg_playlists_monthly.sql', 'r').read()
+            open(QUERIES[context['params']['mode']], 'r').read()
         )
         # Wykonaj zapytanie z parametrem timestamp
         hook.run(sql.render())
     
+    # Task 2: Weryfikacja zgodności z pełnym przeliczeniem
+    @task(task_id='verify_playlists_data')
+    def verify_playlists_data(**context):
+        """Sprawdza czy agregat jest zgodny z pełnym przeliczeniem"""
+        if not context['params']['verify']:
+            return
+        hook = PostgresHook(postgres_conn_id='mikrus_postgres_PROD_zero_stats_writer')
+        sql = open('queries/zero_stats/verify_agg_playlists_monthly.sql', 'r').read()
+        mismatched_rows = hook.get_first(sql)[0]
+        if mismatched_rows:
+            raise ValueError(f"agg_playlists_monthly różni się od pełnego przeliczenia w {mismatched_rows} wierszach")
+    
     aggregate_data = aggregate_playlists_data()
-    # validate_data = validate_data_quality()
+    validate_data = verify_playlists_data()
+    aggregate_data >> validate_data
 
-zero_stats_agg_playlists_monthly()
\ No newline at end of file
+zero_stats_agg_playlists_monthly()
@@ -0,0 +1,63 @@
+from airflow.decorators import dag, task
+from airflow.models.param import Param
+from datetime import datetime
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+import jinja2
+
+QUERIES = {
+    'full': 'queries/zero_stats/agg_playlists_summary.sql',
+    'incremental': 'queries/zero_stats/agg_playlists_summary_incremental.sql',
+    'refresh': 'queries/zero_stats/refresh_agg_playlists_summary.sql',
+}
+
+@dag(
+    dag_id='zero_stats_agg_playlists_summary_PROD',
+    description='Agregacja podsumowania playlist',
+    start_date=datetime(2025, 8, 21),
+    schedule='0 2 * * *',
+    catchup=False,
+    max_active_runs=3,
+    tags=['zero_stats','PROD'],
+    default_args={
+        'owner': 'mateuszwisniewski',
+    },
+    params={
+        # incremental - tylko playlisty zmienione od ostatniego watermarku, full - pełne przeliczenie,
+        # refresh - REFRESH MATERIALIZED VIEW CONCURRENTLY (po ddl/materialized_views.sql)
+        'mode': Param('incremental', enum=['incremental', 'full', 'refresh']),
+        # Porównanie tabeli z pełnym przeliczeniem (pełny skan videos / playlist_videos)
+        'verify': Param(False, type='boolean'),
+    }
+)
+def zero_stats_agg_playlists_summary(**context):
+    """DAG do agregacji podsumowania playlist"""
+    
+    # Task 1: Agregacja danych
+    @task(task_id='aggregate_playlists_summary')
+    def aggregate_playlists_summary(**context):
+        """Agreguje podsumowanie playlist"""
+        hook = PostgresHook(postgres_conn_id='mikrus_postgres_PROD_zero_stats_writer')
+        
+        # Odczytaj SQL z pliku
+        sql = jinja2.Template(
+            open(QUERIES[context['params']['mode']], 'r').read()
+        )
+        hook.run(sql.render())
+    
+    # Task 2: Weryfikacja zgodności z pełnym przeliczeniem
+    @task(task_id='verify_playlists_summary')
+    def verify_playlists_summary(**context):
+        """Sprawdza czy agregat jest zgodny z pełnym przeliczeniem"""
+        if not context['params']['verify']:
+            return
+        hook = PostgresHook(postgres_conn_id='mikrus_postgres_PROD_zero_stats_writer')
+        sql = open('queries/zero_stats/verify_agg_playlists_summary.sql', 'r').read()
+        mismatched_rows = hook.get_first(sql)[0]
+        if mismatched_rows:
+            raise ValueError(f"agg_playlists_summary różni się od pełnego przeliczenia w {mismatched_rows} wierszach")
+    
+    aggregate_data = aggregate_playlists_summary()
+    validate_data = verify_playlists_summary()
+    aggregate_data >> validate_data
+
+zero_stats_agg_playlists_summary()
@@ -1,7 +1,8 @@
 from airflow.decorators import dag, task
+from airflow.models.param import Param
+from airflow.operators.python import get_current_context
 from datetime import datetime, timedelta
 from airflow.operators.python import PythonOperator
-from zero_stats.prod.utils.data_loader import DataLoader
 import logging
 
 # Configure logging
@@ -12,12 +13,18 @@ logger = logging.getLogger(__name__)
     dag_id='zero_stats_agg_raw_ytdata_insert_PROD',
     description='Check for new videos and update statistics',
     start_date=datetime(2025, 8, 21),
-    schedule='0 1 * * *',
+    # Co godzinę: statystyki odświeżane są tylko dla filmów, których termin minął (planer odświeżania)
+    schedule='0 * * * *',
     catchup=False,
     max_active_runs=1,
     tags=['zero_stats','PROD'],  
     default_args={
         'owner': 'mateuszwisniewski',
+    },
+    params={
+        # delta - nowe filmy z playlisty uploads, reconcile - pełne przejrzenie wszystkich playlist;
+        # przebieg w niedzielę o 1:00 jest zawsze rekoncyliacją
+        'mode': Param('delta', enum=['delta', 'reconcile']),
     }
 )
 def zero_stats_check_new_videos_dev():
@@ -27,6 +34,9 @@ def zero_stats_check_new_videos_dev():
     @task(task_id='check_for_new_videos')
     def check_for_new_videos():
         """Sprawdza czy pojawiły się nowe filmy i aktualizuje statystyki"""
+        # Import w zadaniu, nie przy parsowaniu DAG-a (requests, psycopg2, konfiguracja .env)
+        from zero_stats.prod.utils.data_loader import DataLoader, config
+
         logger.info("Sprawdzam nowe filmy i aktualizuję statystyki...")
 
         # Inicjalizacja DataLoader
@@ -35,8 +45,19 @@ def zero_stats_check_new_videos_dev():
         # Inicjalizacja połączenia z bazą danych
         data_loader.initialize_database()
 
+        context = get_current_context()
+        # Okresowa rekoncyliacja: zmiany przynależności starych filmów do playlist
+        # (poza nią tryb z UPLOADS_DISCOVERY_ENABLED)
+        logical_date = context['logical_date']
+        weekly_reconcile = logical_date.weekday() == 6 and logical_date.hour == 1
+        reconcile = (context['params']['mode'] == 'reconcile' or weekly_reconcile
+                     or not config.UPLOADS_DISCOVERY_ENABLED)
+        # Ponowienie rekoncyliacji (np. po timeoucie) kontynuuje od punktu kontrolnego;
+        # przebieg przez playlistę uploads jest idempotentny i zaczyna od nowa
+        resume = reconcile and context['ti'].try_number > 1
+
         # Sprawdzenie nowych filmów i aktualizacja statystyk
-        data_loader.check_for_new_videos()
+        data_loader.check_for_new_videos(resume=resume, reconcile=reconcile)
 
         logger.info("Sprawdzenie nowych filmów i aktualizacja statystyk zakończone")
 
@@ -1,52 +1,82 @@
+-- Only non-empty (playlist, month) cells are stored; the website fills empty months
+-- of the requested range at read time.
+
+-- Cells that no longer have any videos (and zero rows of the former dense grid)
+DELETE FROM zero_stats.agg_playlists_monthly m
+WHERE NOT EXISTS (
+	select 1
+	from zero_stats.playlists p
+	join zero_stats.playlist_videos pv on pv.playlist_key = p.playlist_key
+	join zero_stats.videos v on v.video_key = pv.video_key
+	where p.playlist_id = m.playlist_id
+		and v.published_at >= to_date(m.year_month, 'YYYY.MM')
+		and v.published_at < to_date(m.year_month, 'YYYY.MM') + INTERVAL '1 month'
+		and v.published_at < CURRENT_DATE
+);
+
 INSERT INTO zero_stats.agg_playlists_monthly (year_month, playlist_id, playlist_title, total_views, total_likes, total_videos)
-WITH years_months AS ( 
-	SELECT to_char(date_trunc('month', generate_series(
-	    '2024-01-01'::date, 
-	     (now() - INTERVAL '1 day')::date, 
-	    '1 month'::interval
-	)), 'YYYY.MM') AS year_month
-)
-,distinct_playlits as (
-	select 
-		ym.playlist_id, MAX(ym.playlist_title) as playlist_title
-	from zero_stats.yt_movies ym 
-	WHERE ym.published_at::date <= (now() - INTERVAL '1 day')::date
-	group by ym.playlist_id
-)
-,crossed_data as (
-	select year_month, playlist_id, playlist_title 
-	from years_months
-	cross join distinct_playlits
-)
-,playlists_agg as (
+WITH playlists_agg as (
 	select 
-		to_char(ym.published_at, 'YYYY.MM') as year_month,
-		ym.playlist_id, 
-		MAX(ym.playlist_title) as playlist_title, 
-		sum(ym.view_count) as total_views, 
-		sum(ym.like_count) as total_likes,
-		count(ym.video_id) as total_videos
-	from zero_stats.yt_movies ym 
-	WHERE ym.published_at::date <= (now() - INTERVAL '1 day')::date
-	group by ym.playlist_id, to_char(ym.published_at, 'YYYY.MM')
-)
-,crossed_agg as (
-	select
-		cd.year_month,
-		cd.playlist_id, cd.playlist_title, 
-		coalesce(agg.total_views,0) as total_views, 
-		coalesce(agg.total_likes,0) as total_likes,
-		coalesce(agg.total_videos,0) as total_videos
-	from crossed_data as cd
-	left join playlists_agg as agg
-		on cd.year_month = agg.year_month
-		and cd.playlist_id  = agg.playlist_id
+		to_char(v.published_at, 'YYYY.MM') as year_month,
+		pv.playlist_key, 
+		sum(v.view_count) as total_views, 
+		sum(v.like_count) as total_likes,
+		count(*) as total_videos
+	from zero_stats.playlist_videos pv
+	join zero_stats.videos v on v.video_key = pv.video_key
+	WHERE v.published_at < CURRENT_DATE
+	group by pv.playlist_key, to_char(v.published_at, 'YYYY.MM')
 )
-select * 
-from crossed_agg
+select
+	agg.year_month,
+	p.playlist_id, p.playlist_title, 
+	agg.total_views, 
+	agg.total_likes,
+	agg.total_videos
+from playlists_agg as agg
+join zero_stats.playlists p
+	on p.playlist_key = agg.playlist_key
 ON CONFLICT (year_month, playlist_id) 
 DO UPDATE SET 
     playlist_title = EXCLUDED.playlist_title,
     total_views = EXCLUDED.total_views,
     total_likes = EXCLUDED.total_likes,
     total_videos = EXCLUDED.total_videos;
+
+-- Per-playlist chart payloads (columnar JSON of the non-empty months only) rebuilt from the
+-- small monthly table; the website slices them to the requested range and fills empty months.
+-- Unchanged payloads are not rewritten
+INSERT INTO zero_stats.agg_playlists_monthly_payload (playlist_id, playlist_title, payload, updated_at)
+SELECT
+    playlist_id,
+    MAX(playlist_title) as playlist_title,
+    jsonb_build_object(
+        'id', playlist_id,
+        'title', MAX(playlist_title),
+        'year_month', jsonb_agg(year_month ORDER BY year_month),
+        'total_views', jsonb_agg(total_views ORDER BY year_month),
+        'total_likes', jsonb_agg(total_likes ORDER BY year_month),
+        'video_count', jsonb_agg(total_videos ORDER BY year_month)
+    ) as payload,
+    CURRENT_TIMESTAMP
+FROM zero_stats.agg_playlists_monthly
+GROUP BY playlist_id
+ON CONFLICT (playlist_id)
+DO UPDATE SET
+    playlist_title = EXCLUDED.playlist_title,
+    payload = EXCLUDED.payload,
+    updated_at = EXCLUDED.updated_at
+WHERE zero_stats.agg_playlists_monthly_payload.payload IS DISTINCT FROM EXCLUDED.payload;
+
+DELETE FROM zero_stats.agg_playlists_monthly_payload p
+WHERE NOT EXISTS (
+    SELECT 1 FROM zero_stats.agg_playlists_monthly m WHERE m.playlist_id = p.playlist_id
+);
+
+-- Invalidate website caches
+INSERT INTO zero_stats.data_version (name, version, updated_at)
+VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+ON CONFLICT (name)
+DO UPDATE SET
+    version = zero_stats.data_version.version + 1,
+    updated_at = CURRENT_TIMESTAMP;
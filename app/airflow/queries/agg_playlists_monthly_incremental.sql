@@ -0,0 +1,134 @@
+-- Incremental refresh of agg_playlists_monthly.
+-- Recomputes only the (playlist, month) keys with videos or memberships inserted/updated since
+-- the last watermark or with videos that crossed the published_at cutoff since the last run,
+-- and renames the stored cells of renamed playlists. Only non-empty cells are stored, so new
+-- playlists and new months need no zero rows.
+
+-- 1. Capture the next watermark before reading source data. created_at/updated_at hold the writing
+--    transaction's start time, so a loader transaction still open now may commit rows older than the
+--    newest visible one: the watermark trails the clock by a safety lag longer than any loader transaction.
+INSERT INTO zero_stats.agg_watermarks (agg_name, pending_source_updated_at, pending_cutoff_date)
+SELECT
+    'agg_playlists_monthly',
+    LEAST(
+        GREATEST(
+            (SELECT MAX(updated_at) FROM zero_stats.videos),
+            (SELECT MAX(created_at) FROM zero_stats.videos),
+            (SELECT MAX(created_at) FROM zero_stats.playlist_videos),
+            (SELECT MAX(updated_at) FROM zero_stats.playlists)
+        ),
+        LOCALTIMESTAMP - INTERVAL '1 hour'
+    ),
+    (now() - INTERVAL '1 day')::date
+ON CONFLICT (agg_name)
+DO UPDATE SET
+    pending_source_updated_at = EXCLUDED.pending_source_updated_at,
+    pending_cutoff_date = EXCLUDED.pending_cutoff_date;
+
+-- 2. Recompute touched keys
+INSERT INTO zero_stats.agg_playlists_monthly (year_month, playlist_id, playlist_title, total_views, total_likes, total_videos)
+WITH params AS (
+	SELECT
+		COALESCE(source_updated_at, '-infinity'::timestamp) AS source_updated_at,
+		COALESCE(cutoff_date, '-infinity'::date) AS cutoff_date
+	FROM zero_stats.agg_watermarks
+	WHERE agg_name = 'agg_playlists_monthly'
+)
+,changed_keys as (
+	select distinct
+		pv.playlist_key,
+		to_char(v.published_at, 'YYYY.MM') as year_month
+	from zero_stats.playlist_videos pv
+	join zero_stats.videos v on v.video_key = pv.video_key, params p
+	WHERE v.published_at < CURRENT_DATE
+		and (v.updated_at > p.source_updated_at
+			or v.created_at > p.source_updated_at
+			or pv.created_at > p.source_updated_at
+			or v.published_at >= p.cutoff_date + 1)
+)
+,playlists_agg as (
+	select 
+		to_char(v.published_at, 'YYYY.MM') as year_month,
+		pv.playlist_key, 
+		sum(v.view_count) as total_views, 
+		sum(v.like_count) as total_likes,
+		count(*) as total_videos
+	from zero_stats.playlist_videos pv
+	join zero_stats.videos v on v.video_key = pv.video_key
+	WHERE v.published_at < CURRENT_DATE
+		and (pv.playlist_key, to_char(v.published_at, 'YYYY.MM')) in (select playlist_key, year_month from changed_keys)
+	group by pv.playlist_key, to_char(v.published_at, 'YYYY.MM')
+)
+select
+	agg.year_month,
+	pl.playlist_id, pl.playlist_title, 
+	agg.total_views, 
+	agg.total_likes,
+	agg.total_videos
+from playlists_agg as agg
+join zero_stats.playlists pl
+	on pl.playlist_key = agg.playlist_key
+ON CONFLICT (year_month, playlist_id) 
+DO UPDATE SET 
+    playlist_title = EXCLUDED.playlist_title,
+    total_views = EXCLUDED.total_views,
+    total_likes = EXCLUDED.total_likes,
+    total_videos = EXCLUDED.total_videos;
+
+-- Renamed playlists: title of their other stored cells
+UPDATE zero_stats.agg_playlists_monthly agg
+SET playlist_title = pl.playlist_title
+FROM zero_stats.playlists pl
+WHERE pl.playlist_id = agg.playlist_id
+	and pl.updated_at > (
+		SELECT COALESCE(source_updated_at, '-infinity'::timestamp)
+		FROM zero_stats.agg_watermarks
+		WHERE agg_name = 'agg_playlists_monthly'
+	)
+	and agg.playlist_title <> pl.playlist_title;
+
+-- 3. Promote the watermark
+UPDATE zero_stats.agg_watermarks
+SET
+    source_updated_at = pending_source_updated_at,
+    cutoff_date = pending_cutoff_date,
+    refreshed_at = CURRENT_TIMESTAMP
+WHERE agg_name = 'agg_playlists_monthly';
+
+-- Per-playlist chart payloads (columnar JSON of the non-empty months only) rebuilt from the
+-- small monthly table; the website slices them to the requested range and fills empty months.
+-- Unchanged payloads are not rewritten
+INSERT INTO zero_stats.agg_playlists_monthly_payload (playlist_id, playlist_title, payload, updated_at)
+SELECT
+    playlist_id,
+    MAX(playlist_title) as playlist_title,
+    jsonb_build_object(
+        'id', playlist_id,
+        'title', MAX(playlist_title),
+        'year_month', jsonb_agg(year_month ORDER BY year_month),
+        'total_views', jsonb_agg(total_views ORDER BY year_month),
+        'total_likes', jsonb_agg(total_likes ORDER BY year_month),
+        'video_count', jsonb_agg(total_videos ORDER BY year_month)
+    ) as payload,
+    CURRENT_TIMESTAMP
+FROM zero_stats.agg_playlists_monthly
+GROUP BY playlist_id
+ON CONFLICT (playlist_id)
+DO UPDATE SET
+    playlist_title = EXCLUDED.playlist_title,
+    payload = EXCLUDED.payload,
+    updated_at = EXCLUDED.updated_at
+WHERE zero_stats.agg_playlists_monthly_payload.payload IS DISTINCT FROM EXCLUDED.payload;
+
+DELETE FROM zero_stats.agg_playlists_monthly_payload p
+WHERE NOT EXISTS (
+    SELECT 1 FROM zero_stats.agg_playlists_monthly m WHERE m.playlist_id = p.playlist_id
+);
+
+-- Invalidate website caches
+INSERT INTO zero_stats.data_version (name, version, updated_at)
+VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+ON CONFLICT (name)
+DO UPDATE SET
+    version = zero_stats.data_version.version + 1,
+    updated_at = CURRENT_TIMESTAMP;
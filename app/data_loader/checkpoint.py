@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class RunCheckpoint:
+    """Punkt kontrolny przebiegu loadera (plik JSON) pozwalający wznowić przerwany przebieg.
+
+    Przechowuje tryb przebiegu, ukończone playlisty, token następnej strony dla
+    playlist przetworzonych częściowo oraz liczniki podsumowania. Zapisywany
+    jest dopiero po zatwierdzeniu (COMMIT) odpowiadających mu zapisów w bazie,
+    więc wznowiony przebieg niczego nie liczy podwójnie. Pusta ścieżka wyłącza
+    punkty kontrolne.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.state: Dict = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start(self, mode: str, resume: bool = False):
+        """Wczytuje punkt kontrolny przy resume (tego samego trybu) albo zaczyna nowy przebieg"""
+        if resume:
+            state = self._load()
+            if state.get('mode') == mode:
+                self.state = state
+                logger.info(
+                    f"Wznawiam przebieg {mode} z {self.state['started_at']}: "
+                    f"ukończono {len(self.state['completed_playlists'])} playlist"
+                )
+                return
+            logger.info(f"Brak punktu kontrolnego dla trybu {mode} - zaczynam od początku")
+        self.state = {
+            'mode': mode,
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'completed_playlists': [],
+            'page_tokens': {},
+            'totals': {}
+        }
+        self.save()
+
+    def _load(self) -> Dict:
+        if not self.enabled or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Nie można wczytać punktu kontrolnego z {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """Zapisuje punkt kontrolny (atomowo, przez plik tymczasowy)"""
+        if not self.enabled:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Usuwa punkt kontrolny po ukończonym przebiegu"""
+        self.state = {}
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def is_completed(self, playlist_id: str) -> bool:
+        return playlist_id in self.state['completed_playlists']
+
+    @property
+    def page_tokens(self) -> Dict[str, str]:
+        """Tokeny następnej strony dla playlist przetworzonych częściowo"""
+        return self.state['page_tokens']
+
+    def record_page(self, playlist_id: str, next_page_token: str | None):
+        """Zapamiętuje zapisaną stronę playlisty (bez następnej strony = playlista ukończona)"""
+        if next_page_token:
+            self.state['page_tokens'][playlist_id] = next_page_token
+        else:
+            self.complete_playlist(playlist_id)
+
+    def complete_playlist(self, playlist_id: str):
+        self.state['page_tokens'].pop(playlist_id, None)
+        if playlist_id not in self.state['completed_playlists']:
+            self.state['completed_playlists'].append(playlist_id)
+
+    def add_totals(self, **counts: int):
+        totals = self.state['totals']
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + count
+
+    @property
+    def totals(self) -> Dict[str, int]:
+        return self.state['totals']
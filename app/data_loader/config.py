@@ -1,34 +1,123 @@
+"""
+Data loader configuration (environment variables, .env).
+
+Settings are resolved on first access (config.DB_SCHEMA etc.), not at import
+time: importing the package stays cheap for DAG parsing and CLI startup, and a
+missing DB_SCHEMA only fails when the database settings are used.
+"""
+
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'postgres'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', ''),
-}
-
-# Schema configuration
-DB_SCHEMA = os.getenv('DB_SCHEMA')
-if not DB_SCHEMA:
-    raise ValueError("DB_SCHEMA must be set (e.g. in .env)")
-DB_TABLE = os.getenv('DB_TABLE')
-if not DB_TABLE:
-    raise ValueError("DB_TABLE must be set (e.g. in .env)")
-
-# YouTube API configuration
-YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
-CHANNEL_ID = os.getenv('CHANNEL_ID', None)  # Google Developers as default
-
-# Data loader configuration
-CHECK_INTERVAL_HOURS = int(os.getenv('CHECK_INTERVAL_HOURS', '6'))  # Check every 6 hours by default
-MAX_RESULTS_PER_REQUEST = 50  # YouTube API limit
-
-# Playlists to skip (comma-separated IDs)
-SKIP_PLAYLIST_IDS = os.getenv('SKIP_PLAYLIST_IDS', '').split(',') if os.getenv('SKIP_PLAYLIST_IDS') else []
-# Remove empty strings and whitespace
-SKIP_PLAYLIST_IDS = [pid.strip() for pid in SKIP_PLAYLIST_IDS if pid.strip()] 
\ No newline at end of file
+
+# Settings without a usable default; accessing them unset raises ValueError
+REQUIRED = ('DB_SCHEMA',)
+
+_settings = None
+
+
+def _load_settings():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    # Database configuration
+    DB_CONFIG = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'postgres'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', ''),
+    }
+
+    # Schema configuration
+    DB_SCHEMA = os.getenv('DB_SCHEMA')
+    # Normalized tables: playlist dimension, videos and playlist membership (many-to-many)
+    DB_PLAYLISTS_TABLE = os.getenv('DB_PLAYLISTS_TABLE', 'playlists')
+    DB_VIDEOS_TABLE = os.getenv('DB_VIDEOS_TABLE', 'videos')
+    DB_PLAYLIST_VIDEOS_TABLE = os.getenv('DB_PLAYLIST_VIDEOS_TABLE', 'playlist_videos')
+    # Base name of the snapshot and refresh tables (the former denormalized video table)
+    DB_TABLE = os.getenv('DB_TABLE', 'yt_movies')
+    # Append-only view/like/comment history, written only when a value changed
+    DB_SNAPSHOT_TABLE = os.getenv('DB_SNAPSHOT_TABLE', f'{DB_TABLE}_snapshots')
+    SNAPSHOTS_ENABLED = os.getenv('SNAPSHOTS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # When each video's statistics are due again (adaptive refresh planner)
+    DB_REFRESH_TABLE = os.getenv('DB_REFRESH_TABLE', f'{DB_TABLE}_refresh')
+
+    # YouTube API configuration
+    YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+    CHANNEL_ID = os.getenv('CHANNEL_ID', None)  # Google Developers as default
+    # Multiple channels / API keys (comma-separated); fall back to CHANNEL_ID / YOUTUBE_API_KEY
+    CHANNEL_IDS = [cid.strip() for cid in os.getenv('CHANNEL_IDS', '').split(',') if cid.strip()]
+    if not CHANNEL_IDS and CHANNEL_ID:
+        CHANNEL_IDS = [CHANNEL_ID]
+    YOUTUBE_API_KEYS = [key.strip() for key in os.getenv('YOUTUBE_API_KEYS', '').split(',') if key.strip()]
+    if not YOUTUBE_API_KEYS and YOUTUBE_API_KEY:
+        YOUTUBE_API_KEYS = [YOUTUBE_API_KEY]
+    # Daily quota units per API key (YouTube default: 10000, reset at midnight Pacific Time)
+    API_KEY_DAILY_QUOTA = int(os.getenv('API_KEY_DAILY_QUOTA', '10000'))
+    # Quota usage shared by all scheduler processes; empty path keeps it in memory only
+    QUOTA_STATE_PATH = os.getenv('QUOTA_STATE_PATH', 'quota_state.json')
+    # Worker processes the channels are sharded across
+    SCHEDULER_WORKERS = max(1, int(os.getenv('SCHEDULER_WORKERS', '2')))
+
+    # Data loader configuration
+    CHECK_INTERVAL_HOURS = int(os.getenv('CHECK_INTERVAL_HOURS', '6'))  # Check every 6 hours by default
+    MAX_RESULTS_PER_REQUEST = 50  # YouTube API limit
+    # Concurrent fetching: max in-flight API requests and request rate (token bucket)
+    FETCH_CONCURRENCY = max(1, int(os.getenv('FETCH_CONCURRENCY', '4')))
+    API_RATE_LIMIT_PER_SECOND = float(os.getenv('API_RATE_LIMIT_PER_SECOND', '10'))
+    API_RATE_LIMIT_BURST = float(os.getenv('API_RATE_LIMIT_BURST', '10'))
+    if API_RATE_LIMIT_BURST < 1:
+        # A bucket smaller than one request never fills up enough to send it
+        raise ValueError(f"API_RATE_LIMIT_BURST must be at least 1, got {API_RATE_LIMIT_BURST:g}")
+    # HTTP session: connection pool size, timeout and retries with exponential backoff
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', str(FETCH_CONCURRENCY)))
+    API_TIMEOUT_SECONDS = float(os.getenv('API_TIMEOUT_SECONDS', '30'))
+    API_MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', '5'))
+    API_BACKOFF_BASE_SECONDS = float(os.getenv('API_BACKOFF_BASE_SECONDS', '1'))
+    API_BACKOFF_MAX_SECONDS = float(os.getenv('API_BACKOFF_MAX_SECONDS', '60'))
+    # Fetch-state cache (ETags, item counts, page tokens per playlist); empty path disables it
+    FETCH_STATE_PATH = os.getenv('FETCH_STATE_PATH', 'fetch_state.json')
+    # Skip playlistItems paging when itemCount is unchanged and the cached entry is fresh enough
+    FETCH_STATE_SKIP_UNCHANGED = os.getenv('FETCH_STATE_SKIP_UNCHANGED', 'true').lower() in ('1', 'true', 'yes')
+    FETCH_STATE_MAX_AGE_HOURS = float(os.getenv('FETCH_STATE_MAX_AGE_HOURS', '168'))
+    # New videos from the channel's uploads playlist (newest first, stops at the first stored video);
+    # false - every check rescans all playlists (like --reconcile)
+    UPLOADS_DISCOVERY_ENABLED = os.getenv('UPLOADS_DISCOVERY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Adaptive stats refresh of stored videos (check): only videos that are due, by age and view growth;
+    # false - every check refreshes all stored videos
+    STATS_REFRESH_ADAPTIVE = os.getenv('STATS_REFRESH_ADAPTIVE', 'true').lower() in ('1', 'true', 'yes')
+    # videos calls (50 videos each) per run for due videos; 0 - limited only by the daily quota budget
+    STATS_REFRESH_QUOTA_PER_RUN = int(os.getenv('STATS_REFRESH_QUOTA_PER_RUN', '100'))
+    # A fast-growing video is due again once about this many views are expected
+    STATS_REFRESH_TARGET_VIEWS = int(os.getenv('STATS_REFRESH_TARGET_VIEWS', '1000'))
+    STATS_REFRESH_MIN_INTERVAL_HOURS = float(os.getenv('STATS_REFRESH_MIN_INTERVAL_HOURS', '1'))
+    STATS_REFRESH_MAX_INTERVAL_HOURS = float(os.getenv('STATS_REFRESH_MAX_INTERVAL_HOURS', '168'))
+    # Bulk writes: one INSERT ... ON CONFLICT and one transaction per playlist instead of per row
+    BULK_WRITE_ENABLED = os.getenv('BULK_WRITE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Streaming initial load: videos written in batches of this size, at most this many pages fetched ahead
+    WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', '500'))
+    STREAM_PREFETCH_PAGES = int(os.getenv('STREAM_PREFETCH_PAGES', '4'))
+    # Run checkpoint (finished playlists, last page tokens) used by --resume; empty path disables it
+    CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', 'loader_checkpoint.json')
+    # Run report: phase timings and counters as JSON, optionally as a Prometheus textfile; empty path disables
+    RUN_REPORT_PATH = os.getenv('RUN_REPORT_PATH', 'run_report.json')
+    PROMETHEUS_TEXTFILE_PATH = os.getenv('PROMETHEUS_TEXTFILE_PATH', '')
+
+    # Playlists to skip (comma-separated IDs)
+    SKIP_PLAYLIST_IDS = os.getenv('SKIP_PLAYLIST_IDS', '').split(',') if os.getenv('SKIP_PLAYLIST_IDS') else []
+    # Remove empty strings and whitespace
+    SKIP_PLAYLIST_IDS = [pid.strip() for pid in SKIP_PLAYLIST_IDS if pid.strip()] 
+
+    return {name: value for name, value in locals().items() if name.isupper()}
+
+
+def __getattr__(name):
+    global _settings
+    if _settings is None:
+        _settings = _load_settings()
+    if name not in _settings:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _settings[name]
+    if name in REQUIRED and not value:
+        raise ValueError(f"{name} must be set (e.g. in .env)")
+    return value
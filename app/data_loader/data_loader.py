@@ -1,27 +1,38 @@
 import logging
-from .database import DatabaseManager
-from .youtube_api import YouTubeAPIManager
-from typing import List, Dict
-import time
-from .config import CHECK_INTERVAL_HOURS
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from . import config
+from .checkpoint import RunCheckpoint
+from .metrics import RunMetrics, write_json_report, write_prometheus_textfile
+from .models import VideoRecord
+from .quota import QuotaBudget
+from .refresh_planner import RefreshPlanner, utc_now
+from .streaming import batched, prefetch
 
 
-# Konfiguracja logowania
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_loader.log'),
-        logging.StreamHandler()
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
 class DataLoader:
-    def __init__(self):
+    def __init__(self, channel_id: str | None = None, quota: QuotaBudget | None = None,
+                 fetch_state_path: str | None = None, checkpoint_path: str | None = None,
+                 report_path: str | None = None, prometheus_path: str | None = None):
+        # Czasy faz (API, zapis do bazy) i liczniki przebiegu zamiast logowania każdego wiersza
+        self.metrics = RunMetrics()
+        # psycopg2 / requests are imported only when a loader is created, not when the module is imported
+        from .database import DatabaseManager
+        from .youtube_api import YouTubeAPIManager
         self.db_manager = DatabaseManager()
-        self.youtube_api = YouTubeAPIManager()
+        self.youtube_api = YouTubeAPIManager(channel_id=channel_id, quota=quota, fetch_state_path=fetch_state_path,
+                                             metrics=self.metrics)
+        self.channel_id = self.youtube_api.channel_id
+        self.checkpoint = RunCheckpoint(config.CHECKPOINT_PATH if checkpoint_path is None else checkpoint_path)
+        self.report_path = config.RUN_REPORT_PATH if report_path is None else report_path
+        self.prometheus_path = config.PROMETHEUS_TEXTFILE_PATH if prometheus_path is None else prometheus_path
+        self.refresh_planner = RefreshPlanner(
+            min_interval=timedelta(hours=config.STATS_REFRESH_MIN_INTERVAL_HOURS),
+            max_interval=timedelta(hours=config.STATS_REFRESH_MAX_INTERVAL_HOURS),
+            target_views=config.STATS_REFRESH_TARGET_VIEWS
+        )
         
     def initialize_database(self):
         """Inicjalizuje połączenie z bazą danych"""
@@ -32,8 +43,11 @@ class DataLoader:
             logger.error(f"Błąd inicjalizacji bazy danych: {e}")
             raise
             
-    def load_initial_data(self):
-        """Ładuje początkowe dane - wszystkie playlisty i filmy"""
+    def load_initial_data(self, resume: bool = False) -> Dict:
+        """Ładuje początkowe dane - wszystkie playlisty i filmy, zwraca podsumowanie kanału.
+
+        Z resume=True kontynuuje przerwany przebieg od punktu kontrolnego.
+        """
         logger.info("Rozpoczynam ładowanie początkowych danych...")
         
         try:
@@ -42,103 +56,398 @@ class DataLoader:
             
             if not playlists:
                 logger.warning("Nie znaleziono żadnych playlist")
-                return
+                return {'channel_id': self.channel_id, 'playlists': 0, 'new_videos': 0}
                 
-            total_videos_processed = 0
             total_playlists = len(playlists)
+            self.checkpoint.start('initial', resume)
+            pending_playlists = [playlist for playlist in playlists if not self.checkpoint.is_completed(playlist['id'])]
             
-            logger.info(f"Znaleziono {total_playlists} playlist do przetworzenia")
+            logger.info(f"Znaleziono {total_playlists} playlist do przetworzenia (pozostało: {len(pending_playlists)})")
             
-            for i, playlist in enumerate(playlists, 1):
-                logger.info(f"Przetwarzam playlistę {i}/{total_playlists}: {playlist['title']} ({playlist['video_count']} filmów)")
-                
-                # Pobierz filmy z playlisty wraz ze statystykami
-                videos = self.youtube_api.get_all_videos_with_stats(
-                    playlist['id'], 
-                    playlist['title']
-                )
-                
-                # Zapisz filmy do bazy danych
-                videos_added = self._save_videos_to_database(videos)
-                total_videos_processed += videos_added
+            # Strumień stron playlistItems (po max 50 filmów) uzupełnianych statystykami.
+            # Pobieranie wyprzedza zapis o najwyżej STREAM_PREFETCH_PAGES stron, a zapis
+            # idzie partiami po WRITE_BATCH_SIZE - pamięć nie rośnie z rozmiarem kanału.
+            pages = prefetch(
+                self.youtube_api.iter_video_records(pending_playlists, dict(self.checkpoint.page_tokens)),
+                config.STREAM_PREFETCH_PAGES
+            )
+            for batch_number, batch in enumerate(batched(pages, config.WRITE_BATCH_SIZE, weight=lambda page: len(page[1])), 1):
+                videos = [video for _, page_videos, _ in batch for video in page_videos]
                 
-                logger.info(f"✓ Playlista {i}/{total_playlists} - dodano {videos_added} filmów")
+                # Partia filmów i migawek w jednej transakcji, punkt kontrolny dopiero po COMMIT
+                snapshots = 0
+                with self.metrics.span('db_write'), self.db_manager.transaction():
+                    videos_added = self._save_videos_to_database(videos)
+                    if config.SNAPSHOTS_ENABLED:
+                        snapshots = self.db_manager.insert_stats_snapshots(videos)
+                self.metrics.incr('rows_inserted', videos_added)
+                self.metrics.incr('snapshots_written', snapshots)
+                for playlist, _, next_page_token in batch:
+                    self.checkpoint.record_page(playlist['id'], next_page_token)
+                self.checkpoint.add_totals(new_videos=videos_added)
+                self.checkpoint.save()
                 
-                # Krótka przerwa między playlistami aby nie przekroczyć limitów API
-                time.sleep(1)
+                logger.info(f"✓ Partia {batch_number} ({batch[-1][0]['title']}) - dodano {videos_added} filmów")
                 
-            logger.info(f"Zakończono ładowanie początkowych danych. Dodano {total_videos_processed} filmów z {total_playlists} playlist.")
+            total_videos_processed = self.checkpoint.totals.get('new_videos', 0)
+            self.db_manager.bump_data_version()
+            self.checkpoint.clear()
+            logger.info(f"[{self.channel_id}] Zakończono ładowanie początkowych danych. Dodano {total_videos_processed} filmów z {total_playlists} playlist.")
+            self._log_request_stats()
+            summary = {'channel_id': self.channel_id, 'playlists': total_playlists, 'new_videos': total_videos_processed}
+            self._write_run_report('initial', 'ok', summary)
+            return summary
         except Exception as e:
             logger.error(f"Błąd podczas ładowania początkowych danych: {e}")
+            self._write_run_report('initial', 'error', {'error': str(e)})
             raise
             
-    def check_for_new_videos(self):
-        """Sprawdza czy pojawiły się nowe filmy i aktualizuje statystyki"""
-        logger.info("Sprawdzam nowe filmy i aktualizuję statystyki...")
+    def check_for_new_videos(self, resume: bool = False, reconcile: bool | None = None) -> Dict:
+        """Sprawdza czy pojawiły się nowe filmy i aktualizuje statystyki, zwraca podsumowanie kanału.
+
+        Domyślnie (UPLOADS_DISCOVERY_ENABLED) nowe filmy wykrywane są z playlisty
+        uploads kanału, a statystyki odświeżane dla filmów z bazy - koszt zależy od
+        liczby nowych filmów, nie od rozmiaru playlist. reconcile=True przegląda
+        wszystkie playlisty od początku (wykrywa też zmiany przynależności starych
+        filmów); z resume=True pomija playlisty ukończone w przerwanym przebiegu.
+        Przebieg przez playlistę uploads nie ma punktu kontrolnego - resume=True
+        jest w nim błędem (przerwany przebieg wystarczy uruchomić ponownie).
+        """
+        if reconcile is None:
+            reconcile = not config.UPLOADS_DISCOVERY_ENABLED
+        if not reconcile:
+            if resume:
+                raise ValueError("Wznawianie (--resume) działa tylko z rekoncyliacją (--reconcile) - "
+                                 "przerwane sprawdzanie przez playlistę uploads wystarczy uruchomić ponownie")
+            return self._check_uploads_delta()
+        
+        logger.info("Przeglądam wszystkie playlisty (rekoncyliacja) i aktualizuję statystyki...")
         
         try:
             # Pobierz wszystkie playlisty
             playlists = self.youtube_api.get_channel_playlists()
             
-            new_videos_count = 0
-            updated_videos_count = 0
-            new_playlists_count = 0
+            self.checkpoint.start('reconcile', resume)
+            pending_playlists = [playlist for playlist in playlists if not self.checkpoint.is_completed(playlist['id'])]
+            if len(pending_playlists) < len(playlists):
+                logger.info(f"Pomijam {len(playlists) - len(pending_playlists)} playlist ukończonych w przerwanym przebiegu")
             
-            for playlist in playlists:
+            # Playlisty pobierane są równolegle, zapis odbywa się w kolejności playlist
+            for playlist, videos in self.youtube_api.iter_all_videos_with_stats(pending_playlists):
                 # Sprawdź czy playlista istnieje w bazie
-                if not self.db_manager.playlist_exists(playlist['id']):
+                is_new_playlist = not self.db_manager.playlist_exists(playlist['id'])
+                if is_new_playlist:
                     logger.info(f"Znaleziono nową playlistę: {playlist['title']}")
-                    new_playlists_count += 1
                 
                 logger.info(f"Sprawdzam playlistę: {playlist['title']}")
                 
-                # Pobierz filmy z playlisty wraz ze statystykami
-                videos = self.youtube_api.get_all_videos_with_stats(
-                    playlist['id'], 
-                    playlist['title']
-                )
-                
-                for video in videos:
-                    if self.db_manager.video_exists(video['video_id']):
-                        # Film już istnieje - zaktualizuj statystyki
-                        self.db_manager.update_video_stats(
-                            video['video_id'],
-                            video['view_count'],
-                            video['like_count']
-                        )
-                        updated_videos_count += 1
-                    else:
-                        # Nowy film - dodaj do bazy (automatycznie dodaje info o playliście)
-                        self.db_manager.insert_video(video)
-                        new_videos_count += 1
-                        logger.info(f"Dodano nowy film: {video['title']}")
+                # Cała playlista (filmy i migawki) w jednej transakcji - wznowiony przebieg
+                # nie zastanie połowy playlisty ani niczego nie policzy podwójnie
+                inserted, updated, snapshots = self._write_videos(videos, self._plan_refresh(videos))
                 
-                # Krótka przerwa między playlistami
-                time.sleep(1)
+                self.checkpoint.complete_playlist(playlist['id'])
+                self.checkpoint.add_totals(
+                    new_playlists=int(is_new_playlist),
+                    new_videos=inserted,
+                    updated_videos=updated,
+                    snapshots=snapshots
+                )
+                self.checkpoint.save()
                 
-            logger.info(f"Sprawdzanie zakończone. Nowe playlisty: {new_playlists_count}, Nowe filmy: {new_videos_count}, Zaktualizowane: {updated_videos_count}")
+            self.db_manager.bump_data_version()
+            # Stan pobierania zapisujemy dopiero po udanym zapisie wszystkich playlist
+            self.youtube_api.save_fetch_state()
+            totals = self.checkpoint.totals
+            summary = {
+                'channel_id': self.channel_id,
+                'new_playlists': totals.get('new_playlists', 0),
+                'new_videos': totals.get('new_videos', 0),
+                'updated_videos': totals.get('updated_videos', 0),
+                'snapshots': totals.get('snapshots', 0)
+            }
+            self.checkpoint.clear()
+            logger.info(f"[{self.channel_id}] Rekoncyliacja zakończona. Nowe playlisty: {summary['new_playlists']}, Nowe filmy: {summary['new_videos']}, Zaktualizowane: {summary['updated_videos']}, Migawki statystyk: {summary['snapshots']}")
+            self._log_request_stats()
+            self._write_run_report('reconcile', 'ok', summary)
+            return summary
+            
+        except Exception as e:
+            logger.error(f"Błąd podczas rekoncyliacji playlist: {e}")
+            self._write_run_report('reconcile', 'error', {'error': str(e)})
+            raise
+            
+    def _check_uploads_delta(self) -> Dict:
+        """Nowe filmy z playlisty uploads i odświeżenie statystyk filmów z bazy.
+
+        Przebieg jest idempotentny (upserty), więc przerwany przebieg po prostu
+        uruchamia się ponownie - bez punktu kontrolnego.
+        """
+        logger.info("Sprawdzam nowe filmy (playlista uploads) i aktualizuję statystyki...")
+        
+        try:
+            uploads_playlist_id, uploads_count, new_video_ids = self._discover_new_uploads()
+            # Nowe filmy spoza playlist z poprzedniego przebiegu - nie wymuszają ponownego przeglądania playlist
+            uploads_state = self.youtube_api.fetch_state.get(uploads_playlist_id) or {}
+            known_unassigned = set(uploads_state.get('unassigned_video_ids', []))
+            # Playlisty kanału wyznaczają też jego filmy w bazie (tabela jest wspólna dla kanałów)
+            playlists = self.youtube_api.get_channel_playlists()
+            totals = {'new_playlists': 0, 'new_videos': 0, 'updated_videos': 0, 'snapshots': 0}
+            assigned_ids = set()
+            
+            if new_video_ids:
+                new_videos = self.youtube_api.get_new_videos_with_stats(
+                    playlists, new_video_ids, rescan_ids=new_video_ids - known_unassigned
+                )
+                for playlist, videos in new_videos:
+                    is_new_playlist = not self.db_manager.playlist_exists(playlist['id'])
+                    if is_new_playlist:
+                        logger.info(f"Znaleziono nową playlistę: {playlist['title']}")
+                    # Film z kilku playlist jest zapisywany raz, z przynależnością do każdej z nich
+                    assigned_ids.update(video.video_id for video in videos)
+                    inserted, updated, snapshots = self._write_videos(videos, self._plan_refresh(videos))
+                    totals['new_playlists'] += int(is_new_playlist)
+                    totals['new_videos'] += inserted
+                    totals['updated_videos'] += updated
+                    totals['snapshots'] += snapshots
+                    
+            unassigned = new_video_ids - assigned_ids
+            if unassigned:
+                # Zapisywane są tylko filmy należące do co najmniej jednej playlisty
+                logger.info(f"Pominięto {len(unassigned)} nowych filmów spoza playlist kanału")
+            # Stan playlisty uploads zapisywany razem ze stanem pobierania (po udanym przebiegu)
+            self.youtube_api.fetch_state.set(uploads_playlist_id, uploads_count, [],
+                                             unassigned_video_ids=sorted(unassigned))
+                    
+            _, updated, snapshots = self._refresh_stored_stats(playlists, exclude=new_video_ids)
+            totals['updated_videos'] += updated
+            totals['snapshots'] += snapshots
+            
+            self.db_manager.bump_data_version()
+            self.youtube_api.save_fetch_state()
+            summary = {'channel_id': self.channel_id, **totals}
+            logger.info(f"[{self.channel_id}] Sprawdzanie zakończone. Nowe playlisty: {summary['new_playlists']}, Nowe filmy: {summary['new_videos']}, Zaktualizowane: {summary['updated_videos']}, Migawki statystyk: {summary['snapshots']}")
+            self._log_request_stats()
+            self._write_run_report('check', 'ok', summary)
+            return summary
             
         except Exception as e:
             logger.error(f"Błąd podczas sprawdzania nowych filmów: {e}")
+            self._write_run_report('check', 'error', {'error': str(e)})
             raise
             
-    def _save_videos_to_database(self, videos: List[Dict]) -> int:
-        """Zapisuje filmy do bazy danych, zwraca liczbę dodanych filmów"""
+    def _discover_new_uploads(self) -> Tuple[str, Optional[int], set]:
+        """ID playlisty uploads, liczba jej elementów i ID nowych filmów z niej
+        (od najnowszego do pierwszego filmu już zapisanego w bazie).
+
+        Film opublikowany później, ale z wcześniejszą datą (np. prywatny upubliczniony
+        po czasie), leży na playliście poniżej już zapisanych filmów. Gdy liczba
+        elementów playlisty uploads wzrosła o więcej niż znaleziono nowych filmów na
+        jej początku (albo zmalała), przeglądana jest cała playlista.
+        """
+        uploads_playlist_id = self.youtube_api.get_uploads_playlist_id()
+        item_count = self.youtube_api.get_playlist_item_count(uploads_playlist_id)
+        previous = self.youtube_api.fetch_state.get(uploads_playlist_id) or {}
+        
+        new_video_ids = []
+        boundary_found = False
+        for items, _ in self.youtube_api.iter_playlist_item_pages(uploads_playlist_id):
+            page_ids = [item.video_id for item in items]
+            known_ids = self.db_manager.get_existing_video_ids(page_ids)
+            for video_id in page_ids:
+                if video_id in known_ids:
+                    boundary_found = True
+                    break
+                new_video_ids.append(video_id)
+            if boundary_found:
+                break
+        
+        # Nowe od poprzedniego przebiegu (filmy spoza playlist były już na początku playlisty wtedy)
+        added = len(set(new_video_ids) - set(previous.get('unassigned_video_ids', [])))
+        if (boundary_found and item_count is not None and previous.get('item_count') is not None
+                and item_count != previous['item_count'] + added):
+            logger.info(
+                f"Liczba filmów na playliście uploads zmieniła się o {item_count - previous['item_count']}, "
+                f"na jej początku nowych: {added} - przeglądam całą playlistę"
+            )
+            new_video_ids = []
+            for items, _ in self.youtube_api.iter_playlist_item_pages(uploads_playlist_id):
+                page_ids = [item.video_id for item in items]
+                known_ids = self.db_manager.get_existing_video_ids(page_ids)
+                new_video_ids.extend(video_id for video_id in page_ids if video_id not in known_ids)
+        
+        if boundary_found:
+            logger.info(f"Nowe filmy na playliście uploads: {len(new_video_ids)}")
+        else:
+            # Pusta baza albo żaden film z uploads nie jest zapisany - cała playlista jest nowa
+            logger.info(f"Nowe filmy na playliście uploads: {len(new_video_ids)} (cała playlista)")
+        return uploads_playlist_id, item_count, set(new_video_ids)
+        
+    def _refresh_stored_stats(self, playlists: List[Dict], exclude: set) -> Tuple[int, int, int]:
+        """Aktualne statystyki filmów kanału zapisanych w bazie (bez przeglądania playlist).
+
+        Z STATS_REFRESH_ADAPTIVE tylko filmy, których termin odświeżenia minął
+        (najdłużej zaległe najpierw, najwyżej STATS_REFRESH_QUOTA_PER_RUN zapytań
+        videos), w przeciwnym razie wszystkie od najnowszego - w obu przypadkach
+        w ramach budżetu quota. Zapis partiami po WRITE_BATCH_SIZE razem z nowymi
+        terminami odświeżenia. Zwraca (dodane, zaktualizowane, migawki).
+        """
+        playlist_ids = [playlist['id'] for playlist in playlists]
+        now = utc_now()
+        if config.STATS_REFRESH_ADAPTIVE:
+            limit = config.STATS_REFRESH_QUOTA_PER_RUN * config.MAX_RESULTS_PER_REQUEST or None
+            rows = self.db_manager.get_videos_due_for_refresh(playlist_ids, now, limit)
+        else:
+            rows = self.db_manager.get_videos_for_stats_refresh(playlist_ids)
+        stored = {row['video_id']: row for row in rows if row['video_id'] not in exclude}
+        self.metrics.incr('videos_due', len(stored))
+        video_ids = self.youtube_api.limit_to_quota(list(stored))
+        all_stats = self.youtube_api.get_videos_stats_batch(video_ids)
+        
+        records = (
+            VideoRecord(
+                video_id=video_id,
+                title=stored[video_id]['title'],
+                playlist_id=stored[video_id]['playlist_id'],
+                playlist_title=stored[video_id]['playlist_title'],
+                view_count=all_stats[video_id]['view_count'],
+                like_count=all_stats[video_id]['like_count'],
+                comment_count=all_stats[video_id]['comment_count'],
+                published_at=stored[video_id]['published_at']
+            )
+            # Filmy bez statystyk (usunięte / prywatne) zostają bez zmian
+            for video_id in video_ids if video_id in all_stats
+        )
+        totals = [0, 0, 0]
+        for batch in batched(records, config.WRITE_BATCH_SIZE):
+            for index, count in enumerate(self._write_videos(batch, self._plan_refresh(batch, stored, now))):
+                totals[index] += count
+        
+        if config.STATS_REFRESH_ADAPTIVE:
+            # Pobrane bez statystyk (usunięte / prywatne) - kolejna próba po maksymalnym interwale;
+            # filmy obcięte przez budżet quota pozostają zaległe
+            missing = [
+                (video_id, now, stored[video_id]['refreshed_view_count'] or 0, now + self.refresh_planner.max_interval)
+                for video_id in video_ids if video_id not in all_stats
+            ]
+            if missing:
+                with self.db_manager.transaction():
+                    self.db_manager.schedule_refresh(missing)
+        logger.info(f"Odświeżono statystyki {totals[1]} z {len(stored)} filmów w bazie")
+        return tuple(totals)
+        
+    def _plan_refresh(self, videos: List[VideoRecord], stored: Dict[str, Dict] | None = None,
+                      now: datetime | None = None) -> List[Tuple]:
+        """Terminy kolejnego odświeżenia filmów (wiek i tempo przyrostu od poprzedniego odświeżenia)"""
+        if not config.STATS_REFRESH_ADAPTIVE:
+            return []
+        now = now or utc_now()
+        stored = stored or {}
+        schedule = []
+        for video in videos:
+            previous = stored.get(video.video_id, {})
+            next_refresh_at = self.refresh_planner.next_refresh_at(
+                video.published_at, video.view_count, now,
+                previous.get('refreshed_view_count'), previous.get('refreshed_at')
+            )
+            schedule.append((video.video_id, now, video.view_count, next_refresh_at))
+        return schedule
+        
+    def _write_videos(self, videos: List[VideoRecord], schedule: List[Tuple] | None = None) -> Tuple[int, int, int]:
+        """Filmy, migawki i terminy odświeżenia w jednej transakcji, zwraca (dodane, zaktualizowane, migawki)"""
+        snapshots = 0
+        with self.metrics.span('db_write'), self.db_manager.transaction():
+            if config.BULK_WRITE_ENABLED:
+                inserted, updated = self.db_manager.upsert_videos(videos)
+            else:
+                inserted, updated = self._save_videos_row_by_row(videos)
+            if config.SNAPSHOTS_ENABLED:
+                snapshots = self.db_manager.insert_stats_snapshots(videos)
+            if schedule:
+                self.db_manager.schedule_refresh(schedule)
+        self.metrics.incr('rows_inserted', inserted)
+        self.metrics.incr('rows_updated', updated)
+        self.metrics.incr('snapshots_written', snapshots)
+        return inserted, updated, snapshots
+            
+    def _save_videos_row_by_row(self, videos: List[VideoRecord]) -> Tuple[int, int]:
+        """Zapisuje filmy pojedynczo (tryb bez bulk), zwraca (dodane, zaktualizowane)"""
+        inserted_count = 0
+        updated_count = 0
+        
+        for video in videos:
+            if self.db_manager.video_exists(video.video_id):
+                # Film już istnieje - zaktualizuj statystyki (i dopisz go do playlisty, jeśli jest w nowej)
+                self.db_manager.update_video_stats(
+                    video.video_id,
+                    video.view_count,
+                    video.like_count
+                )
+                self.db_manager.add_video_to_playlist(video)
+                updated_count += 1
+            else:
+                # Nowy film - dodaj do bazy (automatycznie dodaje info o playliście)
+                self.db_manager.insert_video(video)
+                inserted_count += 1
+                
+        return inserted_count, updated_count
+            
+    def _save_videos_to_database(self, videos: List[VideoRecord]) -> int:
+        """Zapisuje filmy do bazy danych, zwraca liczbę dodanych filmów.
+
+        Wywoływane wewnątrz transaction(): błąd zapisu partii przerywa przebieg, więc
+        punkt kontrolny nie obejmie niezapisanych stron. W trybie bez bulk błędny
+        wiersz jest wycofywany do SAVEPOINT i pomijany, reszta partii zostaje.
+        """
+        if config.BULK_WRITE_ENABLED:
+            added_count, _ = self.db_manager.upsert_videos(videos, update_existing=False)
+            return added_count
+        
         added_count = 0
         
         for video in videos:
             try:
-                if not self.db_manager.video_exists(video['video_id']):
-                    self.db_manager.insert_video(video)
-                    added_count += 1
-                else:
-                    logger.debug(f"Film już istnieje w bazie: {video['title']}")
+                with self.db_manager.savepoint():
+                    if not self.db_manager.video_exists(video.video_id):
+                        self.db_manager.insert_video(video)
+                        added_count += 1
+                    else:
+                        self.db_manager.add_video_to_playlist(video)
+                        self.metrics.incr('rows_skipped')
             except Exception as e:
-                logger.error(f"Błąd podczas zapisywania filmu {video['video_id']}: {e}")
+                self.metrics.incr('row_errors')
+                logger.error(f"Błąd podczas zapisywania filmu {video.video_id}: {e}")
                 
         return added_count
 
+    def _log_request_stats(self):
+        """Loguje statystyki zapytań do YouTube API per endpoint"""
+        for endpoint, stats in self.youtube_api.get_request_stats().items():
+            logger.info(
+                f"API {endpoint}: zapytania {stats['calls']}, ponowienia {stats['retries']}, "
+                f"błędy {stats['errors']}, {stats['bytes'] / 1024:.0f} KiB, średni czas {stats['avg_time'] * 1000:.0f} ms"
+            )
+        for phase, span in self.metrics.report()['spans'].items():
+            logger.info(f"Faza {phase}: {span['count']}x, łącznie {span['total_seconds']:.2f}s, max {span['max_seconds']:.2f}s")
+
+    def _write_run_report(self, mode: str, status: str, summary: Dict):
+        """Zapisuje raport przebiegu (JSON i opcjonalnie textfile Prometheusa)"""
+        report = self.metrics.report(
+            channel_id=self.channel_id,
+            mode=mode,
+            status=status,
+            summary=summary,
+            api=self.youtube_api.get_request_stats()
+        )
+        try:
+            if self.report_path:
+                write_json_report(report, self.report_path)
+            if self.prometheus_path:
+                write_prometheus_textfile(report, self.prometheus_path, {'channel': self.channel_id or '', 'mode': mode})
+        except OSError as e:
+            logger.warning(f"Nie można zapisać raportu przebiegu: {e}")
+
     def cleanup(self):
         """Zamyka połączenia"""
         self.db_manager.disconnect()
+        self.youtube_api.close()
         logger.info("Zakończono pracę DataLoader") 
\ No newline at end of file
@@ -1,17 +1,27 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Optional
+from psycopg2.extras import RealDictCursor, execute_values
+from contextlib import contextmanager
+from typing import List, Dict, Iterable, Optional, Tuple
+from datetime import datetime
 import logging
-from .config import DB_CONFIG, DB_SCHEMA, DB_TABLE
+from .config import (DB_CONFIG, DB_SCHEMA, DB_PLAYLISTS_TABLE, DB_VIDEOS_TABLE, DB_PLAYLIST_VIDEOS_TABLE,
+                     DB_SNAPSHOT_TABLE, DB_REFRESH_TABLE)
+from .models import VideoRecord
 
-# Quoted identifier for tables/schemas that start with digits (e.g. 03_bronze_yt_movies)
-QUALIFIED_TABLE = f'"{DB_SCHEMA}"."{DB_TABLE}"'
+# Quoted identifier for tables/schemas that start with digits (e.g. 03_bronze_videos)
+QUALIFIED_PLAYLISTS_TABLE = f'"{DB_SCHEMA}"."{DB_PLAYLISTS_TABLE}"'
+QUALIFIED_VIDEOS_TABLE = f'"{DB_SCHEMA}"."{DB_VIDEOS_TABLE}"'
+QUALIFIED_PLAYLIST_VIDEOS_TABLE = f'"{DB_SCHEMA}"."{DB_PLAYLIST_VIDEOS_TABLE}"'
+QUALIFIED_SNAPSHOT_TABLE = f'"{DB_SCHEMA}"."{DB_SNAPSHOT_TABLE}"'
+QUALIFIED_REFRESH_TABLE = f'"{DB_SCHEMA}"."{DB_REFRESH_TABLE}"'
+QUALIFIED_DATA_VERSION_TABLE = f'"{DB_SCHEMA}"."data_version"'
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
     def __init__(self):
         self.connection: psycopg2.extensions.connection | None = None
+        self._in_transaction = False
         
     def connect(self):
         """Nawiązuje połączenie z bazą danych"""
@@ -28,19 +38,64 @@ class DatabaseManager:
             self.connection.close()
             logger.info("Połączenie z bazą danych zamknięte")
             
+    @contextmanager
+    def transaction(self):
+        """Wszystkie zapisy w bloku trafiają do bazy razem (jeden COMMIT) albo wcale"""
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            yield
+            # COMMIT przerwanej transakcji (błąd zapytania złapany w bloku) to po cichu ROLLBACK
+            if self.connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+                raise psycopg2.InternalError("Transakcja przerwana błędem zapytania - zapisy wycofane")
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+            
+    @contextmanager
+    def savepoint(self, name: str = 'row_write'):
+        """Wewnątrz transaction() błąd w bloku wycofuje tylko ten blok (SAVEPOINT), nie całą transakcję"""
+        if not self._in_transaction:
+            yield
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except Exception:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"RELEASE SAVEPOINT {name}")
+            
+    def _commit(self):
+        # Wewnątrz transaction() zatwierdza dopiero wyjście z bloku
+        if not self._in_transaction:
+            self.connection.commit()
+            
+    def _rollback(self):
+        if not self._in_transaction:
+            self.connection.rollback()
+            
     def execute_query(self, query: str, params: tuple | None = None):
         """Wykonuje zapytanie SQL"""
         try:
             with self.connection.cursor() as cursor:
                 cursor.execute(query, params)
-                self.connection.commit()
+                self._commit()
                 return cursor
         except Exception as e:
-            self.connection.rollback()
+            self._rollback()
             logger.error(f"Błąd wykonania zapytania: {e}")
             raise
             
-    def fetch_all(self, query: str, params: tuple | None = None) -> List[Dict]:
+    def fetch_all(self, query: str, params: tuple | Dict | None = None) -> List[Dict]:
         """Pobiera wszystkie wyniki zapytania"""
         try:
             with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -62,57 +117,362 @@ class DatabaseManager:
             
     def video_exists(self, video_id: str) -> bool:
         """Sprawdza czy film już istnieje w bazie"""
-        query = f"SELECT 1 FROM {QUALIFIED_TABLE} WHERE video_id = %s"
+        query = f"SELECT 1 FROM {QUALIFIED_VIDEOS_TABLE} WHERE video_id = %s"
         result = self.fetch_one(query, (video_id,))
         return result is not None
         
-    def insert_video(self, video_data: Dict):
-        """Dodaje nowy film do bazy danych"""
+    def insert_video(self, video_data: VideoRecord):
+        """Dodaje nowy film do bazy danych (razem z przynależnością do playlisty)"""
         query = f"""
-        INSERT INTO {QUALIFIED_TABLE} (video_id, title, playlist_id, playlist_title, 
-                              view_count, like_count, published_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        INSERT INTO {QUALIFIED_VIDEOS_TABLE} (video_id, title, view_count, like_count, published_at)
+        VALUES (%s, %s, %s, %s, %s)
         """
         params = (
-            video_data['video_id'],
-            video_data['title'],
-            video_data['playlist_id'],
-            video_data['playlist_title'],
-            video_data['view_count'],
-            video_data['like_count'],
-            video_data['published_at']
+            video_data.video_id,
+            video_data.title,
+            video_data.view_count,
+            video_data.like_count,
+            video_data.published_at
         )
-        self.execute_query(query, params)
-        logger.info(f"Dodano film: {video_data['title']}")
+        with self.transaction():
+            self.execute_query(query, params)
+            self.add_video_to_playlist(video_data)
+        
+    def add_video_to_playlist(self, video_data: VideoRecord):
+        """Zapisuje playlistę filmu i przynależność filmu do niej (film musi już być w bazie)"""
+        playlist_query = f"""
+        INSERT INTO {QUALIFIED_PLAYLISTS_TABLE} (playlist_id, playlist_title)
+        VALUES (%s, %s)
+        ON CONFLICT (playlist_id) DO UPDATE SET
+            playlist_title = EXCLUDED.playlist_title
+        WHERE {QUALIFIED_PLAYLISTS_TABLE}.playlist_title IS DISTINCT FROM EXCLUDED.playlist_title
+        """
+        membership_query = f"""
+        INSERT INTO {QUALIFIED_PLAYLIST_VIDEOS_TABLE} (playlist_key, video_key)
+        SELECT p.playlist_key, v.video_key
+        FROM {QUALIFIED_PLAYLISTS_TABLE} p, {QUALIFIED_VIDEOS_TABLE} v
+        WHERE p.playlist_id = %s AND v.video_id = %s
+        ON CONFLICT (playlist_key, video_key) DO NOTHING
+        """
+        with self.transaction():
+            self.execute_query(playlist_query, (video_data.playlist_id, video_data.playlist_title))
+            self.execute_query(membership_query, (video_data.playlist_id, video_data.video_id))
         
     def update_video_stats(self, video_id: str, view_count: int, like_count: int):
         """Aktualizuje statystyki filmu"""
         query = f"""
-        UPDATE {QUALIFIED_TABLE} 
+        UPDATE {QUALIFIED_VIDEOS_TABLE} 
         SET view_count = %s, like_count = %s 
         WHERE video_id = %s
         """
         self.execute_query(query, (view_count, like_count, video_id))
-        logger.info(f"Zaktualizowano statystyki filmu: {video_id}")
+
+    def upsert_videos(self, videos: Iterable[VideoRecord], update_existing: bool = True) -> Tuple[int, int]:
+        """Zapisuje partię filmów w jednej transakcji: playlisty, filmy (INSERT ... ON CONFLICT)
+        i przynależność filmów do playlist - po jednym zapytaniu na tabelę.
+
+        Zwraca krotkę (dodane, zaktualizowane) dla filmów. Przy update_existing=False
+        istniejące filmy są pomijane (ON CONFLICT DO NOTHING); przynależność do playlisty
+        jest dopisywana zawsze (film może należeć do kilku playlist).
+        """
+        videos = list(videos)
+        # ON CONFLICT nie pozwala dotknąć tego samego wiersza dwa razy w jednym poleceniu
+        unique_videos = {}
+        playlists = {}
+        memberships = set()
+        for video in videos:
+            unique_videos.setdefault(video.video_id, video)
+            playlists.setdefault(video.playlist_id, video.playlist_title)
+            memberships.add((video.playlist_id, video.video_id))
+        if not unique_videos:
+            return 0, 0
+
+        rows = [
+            (
+                video.video_id,
+                video.title,
+                video.view_count,
+                video.like_count,
+                video.published_at
+            )
+            for video in unique_videos.values()
+        ]
+
+        # Tytuł zmieniany tylko, gdy jest inny - updated_at playlisty wskazuje realne zmiany
+        playlists_query = f"""
+        INSERT INTO {QUALIFIED_PLAYLISTS_TABLE} (playlist_id, playlist_title)
+        VALUES %s
+        ON CONFLICT (playlist_id) DO UPDATE SET
+            playlist_title = EXCLUDED.playlist_title
+        WHERE {QUALIFIED_PLAYLISTS_TABLE}.playlist_title IS DISTINCT FROM EXCLUDED.playlist_title
+        """
+
+        if update_existing:
+            # Bez zmian wartości wiersz nie jest ruszany, więc updated_at wskazuje realne zmiany
+            # (na nim opiera się przyrostowe odświeżanie agregacji)
+            conflict_action = f"""DO UPDATE SET
+            view_count = EXCLUDED.view_count,
+            like_count = EXCLUDED.like_count
+        WHERE ({QUALIFIED_VIDEOS_TABLE}.view_count, {QUALIFIED_VIDEOS_TABLE}.like_count)
+              IS DISTINCT FROM (EXCLUDED.view_count, EXCLUDED.like_count)"""
+        else:
+            conflict_action = "DO NOTHING"
+
+        # xmax = 0 oznacza wiersz nowo wstawiony, w przeciwnym razie zaktualizowany
+        videos_query = f"""
+        INSERT INTO {QUALIFIED_VIDEOS_TABLE} (video_id, title, view_count, like_count, published_at)
+        VALUES %s
+        ON CONFLICT (video_id) {conflict_action}
+        RETURNING (xmax = 0) AS inserted
+        """
+
+        # Klucze zastępcze z obu tabel; istniejąca przynależność zostaje bez zmian
+        memberships_query = f"""
+        INSERT INTO {QUALIFIED_PLAYLIST_VIDEOS_TABLE} (playlist_key, video_key)
+        SELECT p.playlist_key, v.video_key
+        FROM (VALUES %s) AS m(playlist_id, video_id)
+        JOIN {QUALIFIED_PLAYLISTS_TABLE} p ON p.playlist_id = m.playlist_id
+        JOIN {QUALIFIED_VIDEOS_TABLE} v ON v.video_id = m.video_id
+        ON CONFLICT (playlist_key, video_key) DO NOTHING
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                execute_values(cursor, playlists_query, list(playlists.items()), page_size=len(playlists))
+                results = execute_values(cursor, videos_query, rows, page_size=len(rows), fetch=True)
+                execute_values(cursor, memberships_query, list(memberships), page_size=len(memberships))
+            self._commit()
+        except Exception as e:
+            self._rollback()
+            logger.error(f"Błąd zapisu partii filmów: {e}")
+            raise
+
+        inserted_count = sum(1 for (inserted,) in results if inserted)
+        # Istniejące filmy bez zmian nie są zwracane przez RETURNING, ale liczą się jako zaktualizowane
+        updated_count = len(rows) - inserted_count if update_existing else 0
+        logger.info(f"Zapisano partię {len(rows)} filmów (dodane: {inserted_count}, zaktualizowane: {updated_count})")
+        return inserted_count, updated_count
+        
+    def insert_stats_snapshots(self, videos: Iterable[VideoRecord]) -> int:
+        """Dopisuje migawki statystyk (tylko dla filmów, których wartości się zmieniły).
+
+        Zwraca liczbę zapisanych migawek. Całość to jedno zapytanie i jedna transakcja.
+        """
+        unique_videos = {}
+        for video in videos:
+            unique_videos.setdefault(video.video_id, video)
+        if not unique_videos:
+            return 0
+
+        rows = [
+            (video.video_id, video.view_count, video.like_count, video.comment_count)
+            for video in unique_videos.values()
+        ]
+        # Porównanie z ostatnią migawką filmu - niezmienione wartości nie są zapisywane
+        query = f"""
+        INSERT INTO {QUALIFIED_SNAPSHOT_TABLE} (video_id, captured_at, view_count, like_count, comment_count)
+        SELECT v.video_id, CURRENT_TIMESTAMP, v.view_count, v.like_count, v.comment_count
+        FROM (VALUES %s) AS v(video_id, view_count, like_count, comment_count)
+        LEFT JOIN LATERAL (
+            SELECT s.view_count, s.like_count, s.comment_count
+            FROM {QUALIFIED_SNAPSHOT_TABLE} s
+            WHERE s.video_id = v.video_id
+            ORDER BY s.captured_at DESC
+            LIMIT 1
+        ) AS last ON TRUE
+        WHERE last.view_count IS NULL
+           OR (last.view_count, last.like_count, last.comment_count)
+              IS DISTINCT FROM (v.view_count, v.like_count, v.comment_count)
+        RETURNING 1
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                results = execute_values(
+                    cursor, query, rows,
+                    template="(%s, %s::bigint, %s::bigint, %s::bigint)",
+                    page_size=len(rows), fetch=True
+                )
+            self._commit()
+        except Exception as e:
+            self._rollback()
+            logger.error(f"Błąd zapisu migawek statystyk: {e}")
+            raise
+
+        logger.info(f"Zapisano {len(results)} migawek statystyk (bez zmian: {len(rows) - len(results)})")
+        return len(results)
+
+    def get_stats_growth(self, since: datetime, until: datetime | None = None,
+                         video_ids: List[str] | None = None) -> List[Dict]:
+        """Przyrost wyświetleń, polubień i komentarzy filmów w oknie czasowym [since, until].
+
+        Wartość w danej chwili to ostatnia migawka sprzed niej; dla filmów bez migawki
+        sprzed początku okna punktem startowym jest ich pierwsza migawka w oknie.
+        Domyślny koniec okna to bieżący czas bazy (LOCALTIMESTAMP - ten sam zegar
+        i typ co captured_at), a nie lokalny czas hosta loadera.
+        """
+        video_filter = "AND video_id = ANY(%(video_ids)s)" if video_ids else ""
+        query = f"""
+        WITH end_values AS (
+            SELECT DISTINCT ON (video_id) video_id, view_count, like_count, comment_count
+            FROM {QUALIFIED_SNAPSHOT_TABLE}
+            WHERE captured_at <= COALESCE(%(until)s::timestamp, LOCALTIMESTAMP) {video_filter}
+            ORDER BY video_id, captured_at DESC
+        ),
+        start_values AS (
+            SELECT DISTINCT ON (video_id) video_id, view_count, like_count, comment_count
+            FROM {QUALIFIED_SNAPSHOT_TABLE}
+            WHERE captured_at <= %(since)s {video_filter}
+            ORDER BY video_id, captured_at DESC
+        ),
+        first_in_window AS (
+            SELECT DISTINCT ON (video_id) video_id, view_count, like_count, comment_count
+            FROM {QUALIFIED_SNAPSHOT_TABLE}
+            WHERE captured_at > %(since)s AND captured_at <= COALESCE(%(until)s::timestamp, LOCALTIMESTAMP) {video_filter}
+            ORDER BY video_id, captured_at ASC
+        )
+        SELECT
+            e.video_id,
+            e.view_count - COALESCE(s.view_count, f.view_count) AS views_gained,
+            e.like_count - COALESCE(s.like_count, f.like_count) AS likes_gained,
+            e.comment_count - COALESCE(s.comment_count, f.comment_count) AS comments_gained,
+            e.view_count,
+            e.like_count,
+            e.comment_count
+        FROM end_values e
+        LEFT JOIN start_values s ON s.video_id = e.video_id
+        LEFT JOIN first_in_window f ON f.video_id = e.video_id
+        ORDER BY views_gained DESC NULLS LAST
+        """
+        return self.fetch_all(query, {'since': since, 'until': until, 'video_ids': video_ids})
+        
+    def bump_data_version(self):
+        """Podbija znacznik wersji danych - unieważnia cache strony"""
+        query = f"""
+        INSERT INTO {QUALIFIED_DATA_VERSION_TABLE} (name, version, updated_at)
+        VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (name)
+        DO UPDATE SET
+            version = {QUALIFIED_DATA_VERSION_TABLE}.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """
+        self.execute_query(query)
         
     def get_all_videos(self) -> List[Dict]:
-        """Pobiera wszystkie filmy z bazy"""
-        query = f"SELECT * FROM {QUALIFIED_TABLE} ORDER BY published_at DESC"
+        """Pobiera wszystkie filmy z bazy (film z kilku playlist - raz na playlistę)"""
+        query = f"""
+        SELECT v.video_id, v.title, p.playlist_id, p.playlist_title, v.view_count, v.like_count,
+               v.published_at, v.created_at, v.updated_at
+        FROM {QUALIFIED_VIDEOS_TABLE} v
+        JOIN {QUALIFIED_PLAYLIST_VIDEOS_TABLE} pv ON pv.video_key = v.video_key
+        JOIN {QUALIFIED_PLAYLISTS_TABLE} p ON p.playlist_key = pv.playlist_key
+        ORDER BY v.published_at DESC
+        """
         return self.fetch_all(query)
         
+    def get_existing_video_ids(self, video_ids: List[str]) -> set:
+        """Zwraca te z podanych ID filmów, które są już w bazie (jedno zapytanie)"""
+        if not video_ids:
+            return set()
+        query = f"SELECT video_id FROM {QUALIFIED_VIDEOS_TABLE} WHERE video_id = ANY(%s)"
+        return {row['video_id'] for row in self.fetch_all(query, (list(video_ids),))}
+        
+    def get_videos_for_stats_refresh(self, playlist_ids: List[str]) -> List[Dict]:
+        """Filmy z podanych playlist (bez statystyk) do odświeżenia, od najnowszego.
+
+        Film z kilku playlist zwracany jest raz, z jedną z nich.
+        """
+        if not playlist_ids:
+            return []
+        query = f"""
+        SELECT v.video_id, v.title, p.playlist_id, p.playlist_title, v.published_at
+        FROM {QUALIFIED_VIDEOS_TABLE} v
+        CROSS JOIN LATERAL (
+            SELECT p.playlist_id, p.playlist_title
+            FROM {QUALIFIED_PLAYLIST_VIDEOS_TABLE} pv
+            JOIN {QUALIFIED_PLAYLISTS_TABLE} p ON p.playlist_key = pv.playlist_key
+            WHERE pv.video_key = v.video_key AND p.playlist_id = ANY(%s)
+            ORDER BY p.playlist_key
+            LIMIT 1
+        ) p
+        ORDER BY v.published_at DESC NULLS LAST, v.video_id
+        """
+        return self.fetch_all(query, (list(playlist_ids),))
+        
+    def get_videos_due_for_refresh(self, playlist_ids: List[str], now: datetime,
+                                   limit: int | None = None) -> List[Dict]:
+        """Filmy z podanych playlist, których termin odświeżenia statystyk minął.
+
+        Najpierw filmy jeszcze nie zaplanowane, potem najdłużej zaległe. Zwraca też
+        moment i liczbę wyświetleń z poprzedniego odświeżenia (tempo przyrostu).
+        Film z kilku playlist zwracany jest raz, z jedną z nich.
+        """
+        if not playlist_ids:
+            return []
+        query = f"""
+        SELECT v.video_id, v.title, p.playlist_id, p.playlist_title, v.published_at,
+               r.refreshed_at, r.view_count AS refreshed_view_count
+        FROM {QUALIFIED_VIDEOS_TABLE} v
+        CROSS JOIN LATERAL (
+            SELECT p.playlist_id, p.playlist_title
+            FROM {QUALIFIED_PLAYLIST_VIDEOS_TABLE} pv
+            JOIN {QUALIFIED_PLAYLISTS_TABLE} p ON p.playlist_key = pv.playlist_key
+            WHERE pv.video_key = v.video_key AND p.playlist_id = ANY(%(playlist_ids)s)
+            ORDER BY p.playlist_key
+            LIMIT 1
+        ) p
+        LEFT JOIN {QUALIFIED_REFRESH_TABLE} r ON r.video_id = v.video_id
+        WHERE r.next_refresh_at IS NULL OR r.next_refresh_at <= %(now)s
+        ORDER BY r.next_refresh_at NULLS FIRST, v.published_at DESC NULLS LAST, v.video_id
+        LIMIT %(limit)s
+        """
+        return self.fetch_all(query, {'playlist_ids': list(playlist_ids), 'now': now, 'limit': limit})
+        
+    def schedule_refresh(self, schedule: Iterable[Tuple[str, datetime, int, datetime]]) -> int:
+        """Zapisuje terminy odświeżenia: (video_id, odświeżono, wyświetlenia, następne odświeżenie).
+
+        Jedno zapytanie; wewnątrz transaction() zatwierdzane razem z zapisem filmów.
+        """
+        rows = list({row[0]: row for row in schedule}.values())
+        if not rows:
+            return 0
+        query = f"""
+        INSERT INTO {QUALIFIED_REFRESH_TABLE} (video_id, refreshed_at, view_count, next_refresh_at)
+        VALUES %s
+        ON CONFLICT (video_id) DO UPDATE SET
+            refreshed_at = EXCLUDED.refreshed_at,
+            view_count = EXCLUDED.view_count,
+            next_refresh_at = EXCLUDED.next_refresh_at
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                execute_values(cursor, query, rows, page_size=len(rows))
+            self._commit()
+        except Exception as e:
+            self._rollback()
+            logger.error(f"Błąd zapisu terminów odświeżenia: {e}")
+            raise
+        return len(rows)
+        
     def get_videos_by_playlist(self, playlist_id: str) -> List[Dict]:
         """Pobiera filmy z konkretnej playlisty"""
-        query = f"SELECT * FROM {QUALIFIED_TABLE} WHERE playlist_id = %s ORDER BY published_at DESC"
+        query = f"""
+        SELECT v.video_id, v.title, p.playlist_id, p.playlist_title, v.view_count, v.like_count,
+               v.published_at, v.created_at, v.updated_at
+        FROM {QUALIFIED_PLAYLISTS_TABLE} p
+        JOIN {QUALIFIED_PLAYLIST_VIDEOS_TABLE} pv ON pv.playlist_key = p.playlist_key
+        JOIN {QUALIFIED_VIDEOS_TABLE} v ON v.video_key = pv.video_key
+        WHERE p.playlist_id = %s
+        ORDER BY v.published_at DESC
+        """
         return self.fetch_all(query, (playlist_id,)) 
 
     def playlist_exists(self, playlist_id: str) -> bool:
         """Sprawdza czy playlista już istnieje w bazie"""
-        query = f"SELECT 1 FROM {QUALIFIED_TABLE} WHERE playlist_id = %s LIMIT 1"
+        query = f"SELECT 1 FROM {QUALIFIED_PLAYLISTS_TABLE} WHERE playlist_id = %s"
         result = self.fetch_one(query, (playlist_id,))
         return result is not None
         
     def get_existing_playlists(self) -> List[str]:
         """Pobiera listę ID wszystkich playlist w bazie"""
-        query = f"SELECT DISTINCT playlist_id FROM {QUALIFIED_TABLE}"
+        query = f"SELECT playlist_id FROM {QUALIFIED_PLAYLISTS_TABLE}"
         results = self.fetch_all(query)
-        return [row['playlist_id'] for row in results] 
\ No newline at end of file
+        return [row['playlist_id'] for row in results]
\ No newline at end of file
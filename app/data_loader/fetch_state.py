@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FetchStateCache:
+    """Lokalny, trwały cache stanu pobierania playlist (plik JSON).
+
+    Dla każdej playlisty przechowuje liczbę elementów (contentDetails.itemCount),
+    ETag playlisty z listy playlist oraz kolejne strony playlistItems: token strony, token następnej strony,
+    ETag odpowiedzi i listę filmów. Pusta ścieżka wyłącza cache.
+    Plik z inną wersją formatu (FORMAT_VERSION) jest ignorowany.
+    """
+
+    # 2: filmy stron zapisane jako [video_id, title, published_at]
+    FORMAT_VERSION = 2
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict] = {}
+        self._dirty = False
+        self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def load(self):
+        """Wczytuje stan z pliku (brak pliku lub uszkodzony plik = pusty cache)"""
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.FORMAT_VERSION:
+                logger.info(f"Pominięto stan pobierania z {self.path} (inna wersja formatu)")
+                return
+            self._state = data.get('playlists', {})
+            logger.info(f"Wczytano stan pobierania dla {len(self._state)} playlist z {self.path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Nie można wczytać stanu pobierania z {self.path}: {e}")
+            self._state = {}
+
+    def save(self):
+        """Zapisuje stan do pliku (atomowo, przez plik tymczasowy)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.FORMAT_VERSION, 'playlists': self._state}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def get(self, playlist_id: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._state.get(playlist_id)
+
+    def set(self, playlist_id: str, item_count: int | None, pages: List[Dict], **fields):
+        """Zapamiętuje pobraną playlistę; fields - dodatkowe pola wpisu (np. etag playlisty)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._state[playlist_id] = {
+                **fields,
+                'item_count': item_count,
+                'pages': pages,
+                'fetched_at': datetime.now(timezone.utc).isoformat()
+            }
+            self._dirty = True
+
+    @staticmethod
+    def age_hours(entry: Dict) -> float:
+        """Wiek wpisu w godzinach (od ostatniego pełnego pobrania playlisty)"""
+        fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        return (datetime.now(timezone.utc) - fetched_at).total_seconds() / 3600
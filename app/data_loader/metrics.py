@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict
+
+
+class RunMetrics:
+    """Pomiary jednego przebiegu loadera: czasy faz (spany) i liczniki.
+
+    Spany o tej samej nazwie są sumowane (liczba, łączny i maksymalny czas) -
+    dla faz wykonywanych równolegle łączny czas jest sumą czasów wątków.
+    Bezpieczne dla wielu wątków.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.spans = defaultdict(lambda: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def span(self, name: str):
+        """Mierzy czas bloku jako fazę name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                span = self.spans[name]
+                span['count'] += 1
+                span['total_seconds'] += elapsed
+                span['max_seconds'] = max(span['max_seconds'], elapsed)
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def report(self, **extra) -> Dict:
+        """Raport przebiegu jako słownik (gotowy do zapisu w JSON)"""
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(),
+                'duration_seconds': round(time.perf_counter() - self._started, 3),
+                'spans': {
+                    name: {**span, 'total_seconds': round(span['total_seconds'], 3), 'max_seconds': round(span['max_seconds'], 3)}
+                    for name, span in self.spans.items()
+                },
+                'counters': dict(self.counters),
+                **extra
+            }
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_json_report(report: Dict, path: str):
+    """Zapisuje raport przebiegu jako JSON"""
+    _write_atomic(path, json.dumps(report, indent=2, default=str))
+
+
+def write_prometheus_textfile(report: Dict, path: str, labels: Dict[str, str] | None = None):
+    """Zapisuje raport w formacie textfile dla node_exporter (textfile collector)"""
+    base_labels = labels or {}
+
+    def metric_line(metric: str, value, **line_labels) -> str:
+        all_labels = {**base_labels, **line_labels}
+        label_text = ','.join(f'{key}="{val}"' for key, val in all_labels.items())
+        return f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}"
+
+    lines = [
+        '# TYPE zero_stats_loader_run_duration_seconds gauge',
+        metric_line('zero_stats_loader_run_duration_seconds', report['duration_seconds']),
+        '# TYPE zero_stats_loader_run_success gauge',
+        metric_line('zero_stats_loader_run_success', int(report.get('status') == 'ok')),
+        '# TYPE zero_stats_loader_span_seconds_total gauge',
+        *(metric_line('zero_stats_loader_span_seconds_total', span['total_seconds'], phase=name)
+          for name, span in report['spans'].items()),
+        '# TYPE zero_stats_loader_span_count gauge',
+        *(metric_line('zero_stats_loader_span_count', span['count'], phase=name)
+          for name, span in report['spans'].items()),
+        '# TYPE zero_stats_loader_counter gauge',
+        *(metric_line('zero_stats_loader_counter', value, counter=name)
+          for name, value in report['counters'].items()),
+    ]
+    for metric in ('calls', 'retries', 'errors', 'not_modified', 'bytes'):
+        lines.append(f'# TYPE zero_stats_loader_api_{metric} gauge')
+        lines.extend(
+            metric_line(f'zero_stats_loader_api_{metric}', stats[metric], endpoint=endpoint)
+            for endpoint, stats in report.get('api', {}).items()
+        )
+    _write_atomic(path, '\n'.join(lines) + '\n')
@@ -0,0 +1,21 @@
+from typing import NamedTuple, Optional
+
+
+class PlaylistItem(NamedTuple):
+    """Film na playliście (z playlistItems, bez opisu)"""
+    video_id: str
+    title: str
+    published_at: Optional[str]
+    playlist_id: str
+
+
+class VideoRecord(NamedTuple):
+    """Film playlisty wraz ze statystykami - rekord zapisywany do bazy"""
+    video_id: str
+    title: str
+    playlist_id: str
+    playlist_title: str
+    view_count: int
+    like_count: int
+    comment_count: Optional[int]
+    published_at: Optional[str]
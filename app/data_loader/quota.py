@@ -0,0 +1,116 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Koszt zapytań list w jednostkach quota YouTube Data API (każde zapytanie list = 1 jednostka)
+QUOTA_COSTS = {
+    'channels': 1,
+    'playlists': 1,
+    'playlistItems': 1,
+    'videos': 1
+}
+
+# Dzienna quota YouTube resetuje się o północy czasu pacyficznego
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Żaden klucz API nie ma już dziennej quota na zapytanie"""
+
+
+class QuotaBudget:
+    """Dzienny budżet quota dla kilku kluczy API z rotacją kluczy.
+
+    Zużycie jest zapisywane w pliku JSON z blokadą (fcntl), więc budżet jest
+    wspólny dla wszystkich procesów schedulera. W pliku zapisywane są tylko
+    skróty kluczy. Pusta ścieżka = budżet tylko w pamięci bieżącego procesu.
+    """
+
+    def __init__(self, api_keys: List[str], daily_quota: int, path: str | None = None):
+        if not api_keys:
+            raise ValueError("At least one YouTube API key is required")
+        self.api_keys = list(dict.fromkeys(api_keys))
+        self.daily_quota = daily_quota
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict = {}
+
+    @staticmethod
+    def key_label(api_key: str) -> str:
+        return hashlib.sha1(api_key.encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    @contextmanager
+    def _locked_state(self):
+        """Stan zużycia z bieżącego dnia, zapisywany po wyjściu z bloku"""
+        with self._lock:
+            if not self.path:
+                if self._state.get('day') != self._today():
+                    self._state = {'day': self._today(), 'used': {}}
+                yield self._state
+                return
+            with open(f"{self.path}.lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    state = self._read()
+                    if state.get('day') != self._today():
+                        state = {'day': self._today(), 'used': {}}
+                    yield state
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Nie można wczytać stanu quota z {self.path}: {e}")
+            return {}
+
+    def acquire(self, units: int = 1) -> str:
+        """Rezerwuje jednostki quota i zwraca klucz z największym pozostałym budżetem"""
+        with self._locked_state() as state:
+            used = state['used']
+            api_key = min(self.api_keys, key=lambda key: used.get(self.key_label(key), 0))
+            label = self.key_label(api_key)
+            if used.get(label, 0) + units > self.daily_quota:
+                raise QuotaExhaustedError(f"Daily quota exhausted for all {len(self.api_keys)} API keys")
+            used[label] = used.get(label, 0) + units
+            return api_key
+
+    def mark_exhausted(self, api_key: str):
+        """Oznacza klucz jako wyczerpany do końca dnia (API zwróciło quotaExceeded)"""
+        with self._locked_state() as state:
+            state['used'][self.key_label(api_key)] = self.daily_quota
+        logger.warning(f"Klucz API {self.key_label(api_key)} wyczerpał dzienną quota")
+
+    def remaining(self) -> int:
+        """Łączna liczba jednostek quota pozostała na dziś we wszystkich kluczach"""
+        with self._locked_state() as state:
+            return sum(
+                max(0, self.daily_quota - state['used'].get(self.key_label(key), 0))
+                for key in self.api_keys
+            )
+
+    def usage(self) -> Dict[str, int]:
+        """Zużycie quota na dziś per klucz (skrót klucza -> jednostki)"""
+        with self._locked_state() as state:
+            return {self.key_label(key): state['used'].get(self.key_label(key), 0) for key in self.api_keys}
@@ -0,0 +1,37 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Ogranicznik liczby zapytań (token bucket), bezpieczny dla wielu wątków.
+
+    rate - liczba tokenów dodawanych na sekundę, capacity - maksymalny "zapas"
+    zapytań, które można wysłać od razu. rate <= 0 wyłącza ograniczanie.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Blokuje do momentu, aż dostępna będzie wymagana liczba tokenów"""
+        if self.rate <= 0:
+            return
+        if tokens > self.capacity:
+            raise ValueError(f"Żądane tokeny ({tokens:g}) przekraczają pojemność ({self.capacity:g}) - acquire nigdy by się nie zakończył")
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Interwał odświeżania statystyk według wieku filmu: świeże filmy zmieniają się
+# z godziny na godzinę, kilkuletnie prawie wcale. (maksymalny wiek, interwał)
+AGE_INTERVALS = (
+    (timedelta(days=2), timedelta(hours=1)),
+    (timedelta(days=7), timedelta(hours=3)),
+    (timedelta(days=30), timedelta(hours=12)),
+    (timedelta(days=365), timedelta(days=3)),
+)
+OLDEST_INTERVAL = timedelta(days=7)
+
+
+def utc_now() -> datetime:
+    """Bieżący czas UTC bez strefy (jak kolumny TIMESTAMP w bazie)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def as_utc(value: datetime | str | None) -> Optional[datetime]:
+    """published_at z API (ISO 8601, 'Z') albo z bazy (TIMESTAMP) jako czas UTC bez strefy"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class RefreshPlanner:
+    """Wyznacza termin kolejnego odświeżenia statystyk filmu.
+
+    Interwał wynika z wieku filmu (AGE_INTERVALS) i jest skracany, gdy film
+    szybko zbiera wyświetlenia: kolejne odświeżenie wypada mniej więcej wtedy,
+    gdy przy obecnym tempie przybędzie target_views wyświetleń. Wynik mieści
+    się w [min_interval, max_interval].
+    """
+
+    def __init__(self, min_interval: timedelta, max_interval: timedelta, target_views: int):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.target_views = target_views
+
+    @staticmethod
+    def age_interval(age: timedelta) -> timedelta:
+        for max_age, interval in AGE_INTERVALS:
+            if age < max_age:
+                return interval
+        return OLDEST_INTERVAL
+
+    @staticmethod
+    def views_per_hour(view_count: int, published_at: datetime | str | None, now: datetime,
+                       previous_view_count: int | None = None, previous_at: datetime | None = None) -> float:
+        """Tempo przyrostu wyświetleń od poprzedniego odświeżenia (bez niego - średnie od publikacji)"""
+        if previous_view_count is not None and previous_at is not None:
+            hours = (now - previous_at).total_seconds() / 3600
+            gained = view_count - previous_view_count
+        else:
+            published = as_utc(published_at)
+            if published is None:
+                return 0.0
+            hours = (now - published).total_seconds() / 3600
+            gained = view_count
+        return max(0, gained) / hours if hours > 0 else 0.0
+
+    def interval(self, published_at: datetime | str | None, now: datetime, views_per_hour: float = 0.0) -> timedelta:
+        published = as_utc(published_at)
+        interval = self.age_interval(now - published) if published else self.max_interval
+        if views_per_hour > 0 and self.target_views > 0:
+            interval = min(interval, timedelta(hours=self.target_views / views_per_hour))
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def next_refresh_at(self, published_at: datetime | str | None, view_count: int, now: datetime,
+                        previous_view_count: int | None = None, previous_at: datetime | None = None) -> datetime:
+        velocity = self.views_per_hour(view_count, published_at, now, previous_view_count, previous_at)
+        return now + self.interval(published_at, now, velocity)
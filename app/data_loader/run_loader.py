@@ -6,7 +6,20 @@ Skrypt do uruchamiania YouTube Data Loader
 import argparse
 import sys
 import logging
+from . import config
 from .data_loader import DataLoader
+from .scheduler import ChannelScheduler
+
+def configure_logging():
+    """Logowanie do data_loader.log i na konsolę (tylko CLI - import pakietu nie zmienia konfiguracji logowania)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('data_loader.log'),
+            logging.StreamHandler()
+        ]
+    )
 
 def main():
     parser = argparse.ArgumentParser(description='YouTube Data Loader')
@@ -14,13 +27,28 @@ def main():
                        help='Załaduj początkowe dane (wszystkie playlisty i filmy)')
     parser.add_argument('--check', action='store_true',
                        help='Jednorazowe sprawdzenie nowych filmów')
+    parser.add_argument('--reconcile', action='store_true',
+                       help='Pełne przejrzenie wszystkich playlist (okresowa rekoncyliacja zamiast playlisty uploads)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Kontynuuj przerwany przebieg od punktu kontrolnego')
     
     args = parser.parse_args()
     
-    if not any([args.initial, args.check]):
+    if not any([args.initial, args.check, args.reconcile]):
         parser.print_help()
         sys.exit(1)
     
+    # --check przez playlistę uploads nie ma punktu kontrolnego - przerwany przebieg wystarczy powtórzyć
+    if args.resume and args.check and config.UPLOADS_DISCOVERY_ENABLED:
+        parser.error('--resume działa z --initial i --reconcile; --check (playlista uploads) uruchom ponownie bez --resume')
+    
+    configure_logging()
+    
+    # Wiele kanałów lub kluczy API - scheduler z procesami roboczymi i budżetem quota
+    if len(config.CHANNEL_IDS) > 1 or len(config.YOUTUBE_API_KEYS) > 1:
+        run_scheduler(args)
+        return
+    
     # Inicjalizacja data loadera
     loader = DataLoader()
     
@@ -30,14 +58,19 @@ def main():
         
         if args.initial:
             print("Ładowanie początkowych danych...")
-            loader.load_initial_data()
+            loader.load_initial_data(resume=args.resume)
             print("Zakończono ładowanie początkowych danych")
             
         if args.check:
             print("Sprawdzanie nowych filmów...")
-            loader.check_for_new_videos()
+            loader.check_for_new_videos(resume=args.resume)
             print("Zakończono sprawdzanie")
             
+        if args.reconcile:
+            print("Rekoncyliacja playlist...")
+            loader.check_for_new_videos(resume=args.resume, reconcile=True)
+            print("Zakończono rekoncyliację")
+            
             
     except KeyboardInterrupt:
         print("\nZatrzymano przez użytkownika")
@@ -47,5 +80,20 @@ def main():
     finally:
         loader.cleanup()
 
+def run_scheduler(args):
+    try:
+        scheduler = ChannelScheduler()
+        requested = (('initial', args.initial), ('check', args.check), ('reconcile', args.reconcile))
+        for mode in [mode for mode, enabled in requested if enabled]:
+            print(f"Scheduler ({mode}): {len(scheduler.channel_ids)} kanałów...")
+            summaries = scheduler.run(mode, resume=args.resume)
+            if any(summary['status'] == 'error' for summary in summaries):
+                sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nZatrzymano przez użytkownika")
+    except Exception as e:
+        logging.error(f"Błąd: {e}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,109 @@
+import logging
+import os
+import concurrent.futures
+from typing import Dict, List
+from . import config
+from .data_loader import DataLoader
+from .quota import QuotaBudget, QuotaExhaustedError
+
+logger = logging.getLogger(__name__)
+
+
+def channel_state_path(path: str, channel_id: str) -> str:
+    """Osobny plik stanu dla każdego kanału (procesy nie nadpisują sobie stanu)"""
+    if not path:
+        return ''
+    root, ext = os.path.splitext(path)
+    return f"{root}.{channel_id}{ext}"
+
+
+def run_shard(channel_ids: List[str], mode: str, resume: bool, api_keys: List[str], daily_quota: int,
+              quota_state_path: str) -> List[Dict]:
+    """Przetwarza kanały jednego shardu po kolei (w procesie roboczym).
+
+    Gdy quota wszystkich kluczy się wyczerpie, pozostałe kanały shardu są
+    oznaczane jako odłożone do kolejnego uruchomienia.
+    """
+    quota = QuotaBudget(api_keys, daily_quota, quota_state_path)
+    summaries = []
+    for channel_id in channel_ids:
+        if summaries and summaries[-1]['status'] == 'quota_exhausted':
+            summaries.append({'channel_id': channel_id, 'status': 'quota_exhausted'})
+            continue
+
+        loader = DataLoader(channel_id=channel_id, quota=quota,
+                            fetch_state_path=channel_state_path(config.FETCH_STATE_PATH, channel_id),
+                            checkpoint_path=channel_state_path(config.CHECKPOINT_PATH, channel_id),
+                            report_path=channel_state_path(config.RUN_REPORT_PATH, channel_id),
+                            prometheus_path=channel_state_path(config.PROMETHEUS_TEXTFILE_PATH, channel_id))
+        try:
+            loader.initialize_database()
+            if mode == 'initial':
+                summary = loader.load_initial_data(resume=resume)
+            elif mode == 'reconcile':
+                summary = loader.check_for_new_videos(resume=resume, reconcile=True)
+            else:
+                summary = loader.check_for_new_videos(resume=resume)
+            summaries.append({**summary, 'status': 'ok'})
+        except QuotaExhaustedError as e:
+            logger.warning(f"[{channel_id}] {e}")
+            summaries.append({'channel_id': channel_id, 'status': 'quota_exhausted'})
+        except Exception as e:
+            logger.error(f"[{channel_id}] Błąd przetwarzania kanału: {e}")
+            summaries.append({'channel_id': channel_id, 'status': 'error', 'error': str(e)})
+        finally:
+            loader.cleanup()
+    return summaries
+
+
+class ChannelScheduler:
+    """Rozdziela kanały między procesy robocze i współdzieli między nimi budżet quota kluczy API"""
+
+    def __init__(self, channel_ids: List[str] | None = None, api_keys: List[str] | None = None,
+                 workers: int | None = None, daily_quota: int | None = None,
+                 quota_state_path: str | None = None):
+        self.channel_ids = list(dict.fromkeys(channel_ids or config.CHANNEL_IDS))
+        self.api_keys = api_keys or config.YOUTUBE_API_KEYS
+        self.workers = max(1, min(workers or config.SCHEDULER_WORKERS, len(self.channel_ids) or 1))
+        self.daily_quota = daily_quota or config.API_KEY_DAILY_QUOTA
+        self.quota_state_path = config.QUOTA_STATE_PATH if quota_state_path is None else quota_state_path
+
+        if not self.channel_ids:
+            raise ValueError("At least one channel ID is required (CHANNEL_IDS or CHANNEL_ID)")
+        if not self.api_keys:
+            raise ValueError("YouTube API key is required")
+        if self.workers > 1 and not self.quota_state_path:
+            logger.warning("QUOTA_STATE_PATH jest pusty - procesy nie współdzielą budżetu quota")
+
+    def shards(self) -> List[List[str]]:
+        """Kanały rozdzielone po kolei między procesy (kolejność w obrębie shardu zachowana)"""
+        return [self.channel_ids[i::self.workers] for i in range(self.workers)]
+
+    def run(self, mode: str = 'check', resume: bool = False) -> List[Dict]:
+        """Uruchamia ładowanie ('initial'), sprawdzanie ('check') lub rekoncyliację ('reconcile') wszystkich kanałów.
+
+        Z resume=True każdy kanał kontynuuje od swojego punktu kontrolnego.
+        """
+        args = (mode, resume, self.api_keys, self.daily_quota, self.quota_state_path)
+        logger.info(f"Scheduler: {len(self.channel_ids)} kanałów, {self.workers} procesów, {len(self.api_keys)} kluczy API")
+
+        if self.workers == 1:
+            summaries = run_shard(self.channel_ids, *args)
+        else:
+            # Resolved on use: concurrent.futures loads the process pool (multiprocessing) lazily
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(run_shard, shard, *args) for shard in self.shards()]
+                summaries = [summary for future in futures for summary in future.result()]
+
+        self._log_summary(summaries)
+        return summaries
+
+    def _log_summary(self, summaries: List[Dict]):
+        """Loguje podsumowanie per kanał oraz zużycie quota per klucz"""
+        for summary in sorted(summaries, key=lambda s: self.channel_ids.index(s['channel_id'])):
+            details = ', '.join(f"{key}: {value}" for key, value in summary.items() if key not in ('channel_id', 'status'))
+            logger.info(f"Kanał {summary['channel_id']}: {summary['status']}" + (f" ({details})" if details else ""))
+        if self.quota_state_path:
+            usage = QuotaBudget(self.api_keys, self.daily_quota, self.quota_state_path).usage()
+            for label, used in usage.items():
+                logger.info(f"Quota klucza {label}: {used}/{self.daily_quota}")
@@ -1,10 +1,16 @@
--- Schema for YouTube movies data
-CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_yt_movies" (
-    id SERIAL PRIMARY KEY,
+-- Schema for YouTube movies data: playlist dimension, videos and playlist membership (many-to-many)
+CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_playlists" (
+    playlist_key SERIAL PRIMARY KEY,
+    playlist_id VARCHAR(50) UNIQUE NOT NULL,
+    playlist_title VARCHAR(200) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_videos" (
+    video_key SERIAL PRIMARY KEY,
     video_id VARCHAR(20) UNIQUE NOT NULL,
     title VARCHAR(500) NOT NULL,
-    playlist_id VARCHAR(50) NOT NULL,
-    playlist_title VARCHAR(200) NOT NULL,
     view_count INTEGER DEFAULT 0,
     like_count INTEGER DEFAULT 0,
     published_at TIMESTAMP,
@@ -12,10 +18,17 @@ CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_yt_movies" (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Index for faster lookups
-CREATE INDEX IF NOT EXISTS idx_03_bronze_yt_movies_video_id ON zero_stats."03_bronze_yt_movies"(video_id);
-CREATE INDEX IF NOT EXISTS idx_03_bronze_yt_movies_playlist_id ON zero_stats."03_bronze_yt_movies"(playlist_id);
-CREATE INDEX IF NOT EXISTS idx_03_bronze_yt_movies_published_at ON zero_stats."03_bronze_yt_movies"(published_at);
+CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_playlist_videos" (
+    playlist_key INTEGER NOT NULL REFERENCES zero_stats."03_bronze_playlists" (playlist_key),
+    video_key INTEGER NOT NULL REFERENCES zero_stats."03_bronze_videos" (video_key),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (playlist_key, video_key)
+);
+
+-- Index for faster lookups (playlist -> videos is covered by the primary key)
+CREATE INDEX IF NOT EXISTS idx_03_bronze_playlist_videos_video_key ON zero_stats."03_bronze_playlist_videos"(video_key);
+CREATE INDEX IF NOT EXISTS idx_03_bronze_videos_published_at ON zero_stats."03_bronze_videos"(published_at);
 
 -- Trigger to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -26,7 +39,42 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
-CREATE TRIGGER update_03_bronze_yt_movies_updated_at 
-    BEFORE UPDATE ON zero_stats."03_bronze_yt_movies" 
+CREATE TRIGGER update_03_bronze_playlists_updated_at 
+    BEFORE UPDATE ON zero_stats."03_bronze_playlists" 
     FOR EACH ROW 
-    EXECUTE FUNCTION update_updated_at_column(); 
\ No newline at end of file
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_03_bronze_videos_updated_at 
+    BEFORE UPDATE ON zero_stats."03_bronze_videos" 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
+
+-- Append-only history of video statistics (a row is written only when a value changed)
+CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_yt_movies_snapshots" (
+    video_id VARCHAR(20) NOT NULL,
+    captured_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    view_count BIGINT NOT NULL,
+    like_count BIGINT NOT NULL,
+    comment_count BIGINT,
+
+    PRIMARY KEY (video_id, captured_at)
+);
+
+-- BRIN keeps time-window scans cheap on an insert-ordered table of millions of rows
+CREATE INDEX IF NOT EXISTS idx_03_bronze_yt_movies_snapshots_captured_at_brin ON zero_stats."03_bronze_yt_movies_snapshots" USING BRIN (captured_at);
+
+-- Adaptive stats refresh: when each video's statistics are due again (refreshed_at / view_count give the growth rate)
+CREATE TABLE IF NOT EXISTS zero_stats."03_bronze_yt_movies_refresh" (
+    video_id VARCHAR(20) NOT NULL PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    view_count BIGINT NOT NULL,
+    next_refresh_at TIMESTAMP NOT NULL
+);
+
+-- Data version marker bumped after every successful load; the website cache is keyed on it
+CREATE TABLE IF NOT EXISTS zero_stats.data_version (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,74 @@
+import queue
+import threading
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+def batched(items: Iterable[T], size: int, weight: Callable[[T], int] | None = None) -> Iterator[List[T]]:
+    """Dzieli strumień na listy o rozmiarze co najwyżej size.
+
+    Z funkcją weight partia jest zamykana, gdy suma wag jej elementów osiągnie
+    size (np. strony dzielone według liczby filmów) - elementy nie są dzielone.
+    """
+    iterator = iter(items)
+    if weight is None:
+        while batch := list(islice(iterator, size)):
+            yield batch
+        return
+
+    batch, batch_weight = [], 0
+    for item in iterator:
+        batch.append(item)
+        batch_weight += weight(item)
+        if batch_weight >= size:
+            yield batch
+            batch, batch_weight = [], 0
+    if batch:
+        yield batch
+
+
+def prefetch(items: Iterable[T], max_pending: int) -> Iterator[T]:
+    """Pobiera elementy strumienia w osobnym wątku, z wyprzedzeniem co najwyżej max_pending.
+
+    Pełna kolejka blokuje producenta (back-pressure), więc w pamięci jest naraz
+    najwyżej max_pending elementów, niezależnie od długości strumienia.
+    """
+    pending: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+    stop = threading.Event()
+
+    def put(value) -> bool:
+        # Czeka na miejsce w kolejce, chyba że konsument już zakończył odczyt
+        while not stop.is_set():
+            try:
+                pending.put(value, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_DONE, e))
+            return
+        put((_DONE, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = pending.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
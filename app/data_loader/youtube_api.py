@@ -1,21 +1,213 @@
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+import math
+import random
+import threading
 import time
-from typing import List, Dict, Optional
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Iterator, Tuple
 from datetime import datetime
-from .config import YOUTUBE_API_KEY, CHANNEL_ID, MAX_RESULTS_PER_REQUEST, SKIP_PLAYLIST_IDS
+from .config import (
+    YOUTUBE_API_KEY, CHANNEL_ID, MAX_RESULTS_PER_REQUEST, SKIP_PLAYLIST_IDS,
+    FETCH_CONCURRENCY, API_RATE_LIMIT_PER_SECOND, API_RATE_LIMIT_BURST,
+    HTTP_POOL_SIZE, API_TIMEOUT_SECONDS, API_MAX_RETRIES,
+    API_BACKOFF_BASE_SECONDS, API_BACKOFF_MAX_SECONDS,
+    FETCH_STATE_PATH, FETCH_STATE_SKIP_UNCHANGED, FETCH_STATE_MAX_AGE_HOURS
+)
+from .fetch_state import FetchStateCache
+from .metrics import RunMetrics
+from .models import PlaylistItem, VideoRecord
+from .quota import QUOTA_COSTS, QuotaBudget
+from .rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Powody błędu 403, które warto ponowić (limity tempa / quota)
+RETRYABLE_ERROR_REASONS = {'quotaExceeded', 'rateLimitExceeded', 'userRateLimitExceeded'}
+# Faza przebiegu (span w RunMetrics), do której wliczany jest czas zapytań endpointu
+ENDPOINT_PHASES = {
+    'channels': 'playlist_discovery',
+    'playlists': 'playlist_discovery',
+    'playlistItems': 'item_paging',
+    'videos': 'stats_batches'
+}
+
 class YouTubeAPIManager:
-    def __init__(self, api_key: str | None = None, channel_id: str | None = None):
+    def __init__(self, api_key: str | None = None, channel_id: str | None = None,
+                 concurrency: int | None = None, rate_limit: float | None = None,
+                 quota: QuotaBudget | None = None, fetch_state_path: str | None = None,
+                 metrics: RunMetrics | None = None):
         self.api_key = api_key or YOUTUBE_API_KEY
         self.channel_id = channel_id or CHANNEL_ID
         self.base_url = "https://www.googleapis.com/youtube/v3"
+        # Budżet quota z rotacją kluczy - klucz wybierany jest osobno dla każdego zapytania
+        self.quota = quota
         
-        if not self.api_key:
+        if not self.api_key and not self.quota:
             raise ValueError("YouTube API key is required")
+        
+        # Limit równoległych zapytań i tempa zapytań (zamiast stałych sleepów)
+        self.concurrency = max(1, concurrency or FETCH_CONCURRENCY)
+        self._request_slots = threading.BoundedSemaphore(self.concurrency)
+        self.rate_limiter = TokenBucket(
+            rate_limit if rate_limit is not None else API_RATE_LIMIT_PER_SECOND,
+            API_RATE_LIMIT_BURST
+        )
+        
+        # Jedna sesja HTTP (keep-alive) współdzielona przez wszystkie wątki
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(HTTP_POOL_SIZE, self.concurrency))
+        self.session.mount('https://', adapter)
+        # Google kompresuje odpowiedzi gzip tylko gdy User-Agent zawiera "gzip"
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip',
+            'User-Agent': 'zero-stats-data-loader (gzip)'
+        })
+        
+        # Podsumowanie ostatniego pobierania statystyk dla całego kanału
+        self.stats_batching_summary: Dict = {}
+        
+        # Stan pobierania playlist z poprzednich uruchomień (ETagi, liczba elementów)
+        self.fetch_state = FetchStateCache(FETCH_STATE_PATH if fetch_state_path is None else fetch_state_path)
+        
+        # Statystyki zapytań per endpoint: liczba wywołań, ponowień, błędów, bajtów i łączny czas
+        self._stats_lock = threading.Lock()
+        self.request_stats = defaultdict(lambda: {'calls': 0, 'retries': 0, 'errors': 0, 'not_modified': 0,
+                                                  'bytes': 0, 'total_time': 0.0})
+        # Czasy faz i liczniki przebiegu (wspólne z DataLoader)
+        self.metrics = metrics or RunMetrics()
+            
+    def _record_request(self, endpoint: str, elapsed: float, retry: bool = False, error: bool = False,
+                        not_modified: bool = False, nbytes: int = 0):
+        with self._stats_lock:
+            stats = self.request_stats[endpoint]
+            stats['calls'] += 1
+            stats['total_time'] += elapsed
+            stats['retries'] += int(retry)
+            stats['errors'] += int(error)
+            stats['not_modified'] += int(not_modified)
+            stats['bytes'] += nbytes
+            
+    @staticmethod
+    def _error_reasons(response: requests.Response) -> set:
+        try:
+            errors = response.json().get('error', {}).get('errors', [])
+        except ValueError:
+            return set()
+        return {error.get('reason') for error in errors}
+            
+    @classmethod
+    def _is_retryable(cls, response: requests.Response) -> bool:
+        """Sprawdza czy odpowiedź oznacza błąd przejściowy (429, 5xx, przekroczone limity)"""
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            return True
+        if response.status_code == 403:
+            return bool(cls._error_reasons(response) & RETRYABLE_ERROR_REASONS)
+        return False
+            
+    def _backoff_delay(self, attempt: int) -> float:
+        """Wykładnicze opóźnienie z losowym rozrzutem (full jitter)"""
+        return random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            
+    def _get(self, endpoint: str, params: Dict, etag: str | None = None) -> Optional[Dict]:
+        """Zapytanie GET (z ponowieniami) wliczane do czasu fazy endpointu w metrykach przebiegu"""
+        with self.metrics.span(ENDPOINT_PHASES.get(endpoint, endpoint)):
+            return self._get_with_retries(endpoint, params, etag)
             
+    def _get_with_retries(self, endpoint: str, params: Dict, etag: str | None = None) -> Optional[Dict]:
+        """Wykonuje zapytanie GET do YouTube API z limitem współbieżności i tempa.
+
+        Błędy przejściowe są ponawiane z wykładniczym opóźnieniem; po wyczerpaniu
+        prób wyjątek jest propagowany, aby nie zapisywać niekompletnych danych.
+        Z podanym etag wysyła If-None-Match i zwraca None dla odpowiedzi 304.
+        Z budżetem quota każda próba jest wliczana do budżetu wybranego klucza,
+        a klucz z quotaExceeded jest od razu zastępowany kolejnym.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        headers = {'If-None-Match': etag} if etag else None
+        attempt = 0
+        
+        while True:
+            if self.quota:
+                params = {**params, 'key': self.quota.acquire(QUOTA_COSTS.get(endpoint, 1))}
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                with self._request_slots:
+                    response = self.session.get(url, params=params, headers=headers, timeout=API_TIMEOUT_SECONDS)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                elapsed = time.perf_counter() - started
+                if attempt >= API_MAX_RETRIES:
+                    self._record_request(endpoint, elapsed, error=True)
+                    raise
+                self._record_request(endpoint, elapsed, retry=True)
+                error_message = str(e)
+            else:
+                elapsed = time.perf_counter() - started
+                if response.status_code == 304:
+                    self._record_request(endpoint, elapsed, not_modified=True)
+                    return None
+                if response.ok:
+                    self._record_request(endpoint, elapsed, nbytes=len(response.content))
+                    return response.json()
+                if self.quota and 'quotaExceeded' in self._error_reasons(response):
+                    # Rotacja klucza bez czekania - QuotaExhaustedError gdy nie ma już kluczy
+                    self._record_request(endpoint, elapsed, retry=True)
+                    self.quota.mark_exhausted(params['key'])
+                    continue
+                if attempt >= API_MAX_RETRIES or not self._is_retryable(response):
+                    self._record_request(endpoint, elapsed, error=True)
+                    response.raise_for_status()
+                self._record_request(endpoint, elapsed, retry=True)
+                error_message = f"HTTP {response.status_code}"
+            
+            delay = self._backoff_delay(attempt)
+            attempt += 1
+            logger.warning(f"Błąd przejściowy {endpoint} ({error_message}), ponowienie {attempt}/{API_MAX_RETRIES} za {delay:.1f}s")
+            time.sleep(delay)
+            
+    def get_request_stats(self) -> Dict[str, Dict]:
+        """Zwraca statystyki zapytań per endpoint (wywołania, ponowienia, błędy, średni czas)"""
+        with self._stats_lock:
+            return {
+                endpoint: {
+                    **stats,
+                    'avg_time': stats['total_time'] / stats['calls'] if stats['calls'] else 0.0
+                }
+                for endpoint, stats in self.request_stats.items()
+            }
+            
+    def close(self):
+        """Zamyka sesję HTTP"""
+        self.session.close()
+            
+    def get_uploads_playlist_id(self) -> str:
+        """ID playlisty uploads kanału (wszystkie publiczne filmy, od najnowszego)"""
+        params = {
+            'part': 'contentDetails',
+            'id': self.channel_id,
+            'key': self.api_key
+        }
+        data = self._get('channels', params)
+        if not data.get('items'):
+            raise ValueError(f"Nie znaleziono kanału {self.channel_id}")
+        return data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        
+    def get_playlist_item_count(self, playlist_id: str) -> Optional[int]:
+        """Liczba elementów playlisty (contentDetails.itemCount, 1 jednostka quota)"""
+        params = {
+            'part': 'contentDetails',
+            'id': playlist_id,
+            'key': self.api_key
+        }
+        data = self._get('playlists', params)
+        if not data.get('items'):
+            return None
+        return data['items'][0].get('contentDetails', {}).get('itemCount')
+        
     def get_channel_playlists(self) -> List[Dict]:
         """Pobiera wszystkie playlisty kanału (z pomijaniem określonych ID i paginacją)"""
         playlists = []
@@ -23,9 +215,8 @@ class YouTubeAPIManager:
         next_page_token = None
         
         while True:
-            url = f"{self.base_url}/playlists"
             params = {
-                'part': 'snippet',
+                'part': 'snippet,contentDetails',
                 'channelId': self.channel_id,
                 'key': self.api_key,
                 'maxResults': MAX_RESULTS_PER_REQUEST
@@ -35,9 +226,7 @@ class YouTubeAPIManager:
                 params['pageToken'] = next_page_token
             
             try:
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+                data = self._get('playlists', params)
                 
                 for item in data.get('items', []):
                     playlist_id = item['id']
@@ -52,7 +241,8 @@ class YouTubeAPIManager:
                         'id': playlist_id,
                         'title': item['snippet']['title'],
                         'description': item['snippet'].get('description', ''),
-                        'video_count': item['snippet'].get('videoCount', 0),
+                        'video_count': item.get('contentDetails', {}).get('itemCount', 0),
+                        'etag': item.get('etag'),
                         'published_at': item['snippet'].get('publishedAt')
                     }
                     playlists.append(playlist)
@@ -61,24 +251,36 @@ class YouTubeAPIManager:
                 next_page_token = data.get('nextPageToken')
                 if not next_page_token:
                     break
-                    
-                # Krótka przerwa między stronami
-                time.sleep(0.1)
                 
             except requests.exceptions.RequestException as e:
                 logger.error(f"Błąd przy pobieraniu playlist: {e}")
-                break
+                raise
                 
         logger.info(f"Pobrano {len(playlists)} playlist z kanału (pominięto {skipped_count})")
         return playlists
             
-    def get_playlist_videos(self, playlist_id: str) -> List[Dict]:
-        """Pobiera wszystkie filmy z playlisty (z paginacją)"""
-        videos = []
+    def get_playlist_videos(self, playlist_id: str, item_count: int | None = None,
+                            etag: str | None = None, recheck: bool = False) -> List[PlaylistItem]:
+        """Pobiera wszystkie filmy z playlisty (z paginacją).
+
+        Przy włączonym cache stanu: gdy liczba elementów i ETag playlisty (z listy
+        playlist) się nie zmieniły, zwraca zapamiętane filmy bez zapytań; w przeciwnym
+        razie (albo z recheck=True) każda strona jest pobierana warunkowo
+        (If-None-Match), a strony z odpowiedzią 304 brane z cache.
+        """
+        cached = self.fetch_state.get(playlist_id)
+        if (cached and FETCH_STATE_SKIP_UNCHANGED and item_count is not None and not recheck
+                and not self.playlist_changed(cached, item_count, etag)
+                and FetchStateCache.age_hours(cached) < FETCH_STATE_MAX_AGE_HOURS):
+            videos = self._videos_from_pages(playlist_id, cached['pages'])
+            logger.info(f"Playlista {playlist_id} bez zmian - {len(videos)} filmów z cache")
+            return videos
+        
+        cached_pages = {page['page_token']: page for page in cached['pages']} if cached else {}
+        pages = []
         next_page_token = None
         
         while True:
-            url = f"{self.base_url}/playlistItems"
             params = {
                 'part': 'snippet',
                 'playlistId': playlist_id,
@@ -89,40 +291,124 @@ class YouTubeAPIManager:
             if next_page_token:
                 params['pageToken'] = next_page_token
             
+            cached_page = cached_pages.get(next_page_token)
+            
             try:
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+                data = self._get('playlistItems', params, etag=cached_page['etag'] if cached_page else None)
                 
-                for item in data.get('items', []):
-                    video_id = item['snippet']['resourceId']['videoId']
-                    video = {
-                        'video_id': video_id,
-                        'title': item['snippet']['title'],
-                        'description': item['snippet'].get('description', ''),
-                        'published_at': item['snippet'].get('publishedAt'),
-                        'playlist_id': playlist_id
+                if data is None:
+                    # 304 - strona bez zmian
+                    page = cached_page
+                else:
+                    page = {
+                        'page_token': next_page_token,
+                        'next_page_token': data.get('nextPageToken'),
+                        'etag': data.get('etag'),
+                        # [video_id, title, published_at] - zwarty format zapisywany w cache
+                        'items': [
+                            [video.video_id, video.title, video.published_at]
+                            for video in self._parse_playlist_items(data, playlist_id)
+                        ]
                     }
-                    videos.append(video)
+                pages.append(page)
                 
                 # Sprawdź czy są kolejne strony
-                next_page_token = data.get('nextPageToken')
+                next_page_token = page['next_page_token']
                 if not next_page_token:
                     break
-                    
-                # Krótka przerwa między stronami
-                time.sleep(0.1)
                 
             except requests.exceptions.RequestException as e:
                 logger.error(f"Błąd przy pobieraniu filmów z playlisty {playlist_id}: {e}")
-                break
+                raise
+        
+        videos = self._videos_from_pages(playlist_id, pages)
+        self.fetch_state.set(playlist_id, item_count, pages, etag=etag)
                 
         logger.info(f"Pobrano {len(videos)} filmów z playlisty {playlist_id}")
         return videos
             
+    @staticmethod
+    def playlist_changed(cached: Dict | None, item_count: int | None, etag: str | None) -> bool:
+        """Czy playlista zmieniła się od zapamiętanego pobrania (liczba elementów albo ETag z listy playlist)"""
+        if not cached:
+            return True
+        return cached['item_count'] != item_count or (etag is not None and cached.get('etag') != etag)
+            
+    def _parse_playlist_items(self, data: Dict, playlist_id: str) -> List[PlaylistItem]:
+        """Parsuje stronę playlistItems - opisy filmów są od razu pomijane"""
+        self.metrics.incr('playlist_items', len(data.get('items', [])))
+        return [
+            PlaylistItem(
+                item['snippet']['resourceId']['videoId'],
+                item['snippet']['title'],
+                item['snippet'].get('publishedAt'),
+                playlist_id
+            )
+            for item in data.get('items', [])
+        ]
+            
+    @staticmethod
+    def _videos_from_pages(playlist_id: str, pages: List[Dict]) -> List[PlaylistItem]:
+        return [
+            PlaylistItem(video_id, title, published_at, playlist_id)
+            for page in pages
+            for video_id, title, published_at in page['items']
+        ]
+            
+    def iter_playlist_item_pages(self, playlist_id: str,
+                                 page_token: str | None = None) -> Iterator[Tuple[List[PlaylistItem], Optional[str]]]:
+        """Strumieniowo zwraca kolejne strony playlistItems wraz z tokenem następnej strony.
+
+        Bez cache stanu; page_token pozwala zacząć od wskazanej strony (wznowienie).
+        """
+        next_page_token = page_token
+        
+        while True:
+            params = {
+                'part': 'snippet',
+                'playlistId': playlist_id,
+                'key': self.api_key,
+                'maxResults': MAX_RESULTS_PER_REQUEST
+            }
+            
+            if next_page_token:
+                params['pageToken'] = next_page_token
+            
+            try:
+                data = self._get('playlistItems', params)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Błąd przy pobieraniu filmów z playlisty {playlist_id}: {e}")
+                raise
+            
+            next_page_token = data.get('nextPageToken')
+            yield self._parse_playlist_items(data, playlist_id), next_page_token
+            
+            if not next_page_token:
+                break
+            
+    def iter_video_records(self, playlists: List[Dict], page_tokens: Dict[str, str] | None = None
+                           ) -> Iterator[Tuple[Dict, List[VideoRecord], Optional[str]]]:
+        """Strumień (playlista, filmy ze statystykami, token następnej strony) - po jednej stronie naraz.
+
+        Każda strona (max 50 filmów) jest od razu uzupełniana statystykami jednym
+        zapytaniem videos, więc w pamięci jest tylko bieżąca strona - niezależnie
+        od rozmiaru playlisty. Ostatnia strona playlisty ma token None.
+        """
+        page_tokens = page_tokens or {}
+        for playlist in playlists:
+            pages = self.iter_playlist_item_pages(playlist['id'], page_tokens.get(playlist['id']))
+            for items, next_page_token in pages:
+                stats = {}
+                if items:
+                    stats = self.get_videos_stats_batch(list(dict.fromkeys(item.video_id for item in items)))
+                yield playlist, self._merge_videos_with_stats(items, stats, playlist['id'], playlist['title']), next_page_token
+            
+    def save_fetch_state(self):
+        """Zapisuje stan pobierania playlist na dysk"""
+        self.fetch_state.save()
+            
     def get_video_stats(self, video_id: str) -> Optional[Dict]:
         """Pobiera statystyki filmu (wyświetlenia, polubienia)"""
-        url = f"{self.base_url}/videos"
         params = {
             'part': 'statistics,snippet',
             'id': video_id,
@@ -130,9 +416,7 @@ class YouTubeAPIManager:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get('videos', params)
             
             if not data.get('items'):
                 logger.warning(f"Nie znaleziono filmu: {video_id}")
@@ -156,38 +440,172 @@ class YouTubeAPIManager:
             logger.error(f"Błąd przy pobieraniu statystyk filmu {video_id}: {e}")
             return None
             
-    def get_all_videos_with_stats(self, playlist_id: str, playlist_title: str) -> List[Dict]:
+    def get_all_videos_with_stats(self, playlist_id: str, playlist_title: str,
+                                  item_count: int | None = None) -> List[VideoRecord]:
         """Pobiera wszystkie filmy z playlisty wraz ze statystykami"""
-        videos = self.get_playlist_videos(playlist_id)
+        videos = self.get_playlist_videos(playlist_id, item_count)
         if not videos:
             return []
             
-        # Pobierz wszystkie video_id
-        video_ids = [video['video_id'] for video in videos]
-        
         # Pobierz statystyki dla wszystkich filmów za jednym razem
-        all_stats = self.get_videos_stats_batch(video_ids)
+        all_stats = self.get_videos_stats_batch(list(dict.fromkeys(video.video_id for video in videos)))
         
+        return self._merge_videos_with_stats(videos, all_stats, playlist_id, playlist_title)
+        
+    @staticmethod
+    def _merge_videos_with_stats(videos: List[PlaylistItem], all_stats: Dict[str, Dict],
+                                 playlist_id: str, playlist_title: str) -> List[VideoRecord]:
+        """Łączy filmy playlisty z pobranymi statystykami (filmy bez statystyk są pomijane)"""
         videos_with_stats = []
         for video in videos:
-            video_id = video['video_id']
-            stats = all_stats.get(video_id)
+            stats = all_stats.get(video.video_id)
             
             if stats:
-                video_data = {
-                    'video_id': video_id,
-                    'title': video['title'],
-                    'playlist_id': playlist_id,
-                    'playlist_title': playlist_title,
-                    'view_count': stats['view_count'],
-                    'like_count': stats['like_count'],
-                    'published_at': video['published_at']
-                }
-                videos_with_stats.append(video_data)
+                videos_with_stats.append(VideoRecord(
+                    video_id=video.video_id,
+                    title=video.title,
+                    playlist_id=playlist_id,
+                    playlist_title=playlist_title,
+                    view_count=stats['view_count'],
+                    like_count=stats['like_count'],
+                    comment_count=stats['comment_count'],
+                    published_at=video.published_at
+                ))
                 
-        logger.info(f"Pobrano statystyki dla {len(videos_with_stats)} filmów z playlisty {playlist_title}")
+        logger.debug(f"Pobrano statystyki dla {len(videos_with_stats)} filmów z playlisty {playlist_title}")
         return videos_with_stats
         
+    def iter_all_videos_with_stats(self, playlists: List[Dict]) -> Iterator[Tuple[Dict, List[VideoRecord]]]:
+        """Pobiera filmy ze statystykami dla wielu playlist równolegle.
+
+        Najpierw zbiera przynależność filmów do wszystkich playlist, potem pobiera
+        statystyki dla unikalnych video_id w pełnych partiach po 50 (wspólnych dla
+        całego kanału) i rozdziela je z powrotem na playlisty. Wyniki playlist są
+        przetwarzane w miarę ukończenia pobierania i przechowywane zwięźle: dane
+        filmu raz na kanał, per playlista tylko lista video_id. Zwraca pary
+        (playlista, filmy) w kolejności wejściowej listy playlist, więc wynik dla
+        każdej playlisty jest taki sam jak z get_all_videos_with_stats.
+        """
+        def fetch_members(playlist: Dict) -> List[PlaylistItem]:
+            return self.get_playlist_videos(playlist['id'], playlist.get('video_count'), playlist.get('etag'))
+        
+        def completed() -> Iterator[Tuple[int, List[PlaylistItem]]]:
+            if self.concurrency == 1:
+                for index, playlist in enumerate(playlists):
+                    yield index, fetch_members(playlist)
+                return
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = {executor.submit(fetch_members, playlist): index for index, playlist in enumerate(playlists)}
+                for future in as_completed(futures):
+                    yield futures.pop(future), future.result()
+        
+        # video_id -> (title, published_at) raz na kanał; per playlista tylko kolejność video_id
+        video_details: Dict[str, Tuple[str, Optional[str]]] = {}
+        member_ids: List[Tuple[str, ...]] = [()] * len(playlists)
+        memberships_count = 0
+        per_playlist_calls = 0  # ile zapytań videos kosztowałoby pobieranie statystyk osobno dla każdej playlisty
+        for index, videos in completed():
+            for video in videos:
+                video_details.setdefault(video.video_id, (video.title, video.published_at))
+            member_ids[index] = tuple(video.video_id for video in videos)
+            memberships_count += len(videos)
+            per_playlist_calls += math.ceil(len(set(member_ids[index])) / MAX_RESULTS_PER_REQUEST)
+        
+        unique_ids = self._prioritize_recent(
+            list(video_details), {video_id: published_at for video_id, (_, published_at) in video_details.items()}
+        )
+        all_stats = self.get_videos_stats_batch(unique_ids)
+        
+        global_calls = math.ceil(len(unique_ids) / MAX_RESULTS_PER_REQUEST)
+        self.stats_batching_summary = {
+            'memberships': memberships_count,
+            'unique_videos': len(unique_ids),
+            'stats_calls': global_calls,
+            'stats_calls_per_playlist': per_playlist_calls,
+            'stats_calls_saved': per_playlist_calls - global_calls
+        }
+        logger.info(
+            f"Statystyki dla {len(unique_ids)} unikalnych filmów: {global_calls} zapytań videos "
+            f"(zaoszczędzono {per_playlist_calls - global_calls} względem pobierania per playlista)"
+        )
+        
+        for index, playlist in enumerate(playlists):
+            ids, member_ids[index] = member_ids[index], ()
+            videos = [PlaylistItem(video_id, *video_details[video_id], playlist['id']) for video_id in ids]
+            yield playlist, self._merge_videos_with_stats(videos, all_stats, playlist['id'], playlist['title'])
+        
+    def get_new_videos_with_stats(self, playlists: List[Dict], video_ids: set,
+                                  rescan_ids: set | None = None) -> Iterator[Tuple[Dict, List[VideoRecord]]]:
+        """Przynależność nowych filmów (video_ids) do playlist, ze statystykami.
+
+        Najpierw przeglądane są playlisty, których liczba elementów albo ETag zmieniły
+        się od ostatniego pobrania (cache stanu). Liczba elementów nie zmienia się,
+        gdy jeden film doszedł, a inny wypadł - jeśli któregoś z rescan_ids (domyślnie
+        video_ids) nie ma w żadnej z tych playlist, przeglądane są też pozostałe
+        (strony pobierane warunkowo, bez zmian = 304). Statystyki pobierane są tylko
+        dla video_ids. Zwraca pary (playlista, nowe filmy) dla playlist zawierających
+        choć jeden z nowych filmów.
+        """
+        def fetch_members(playlist: Dict, recheck: bool) -> List[PlaylistItem]:
+            videos = self.get_playlist_videos(playlist['id'], playlist.get('video_count'), playlist.get('etag'), recheck)
+            return [video for video in videos if video.video_id in video_ids]
+        
+        def fetch_all(selected: List[Dict], recheck: bool = False) -> List[List[PlaylistItem]]:
+            if self.concurrency == 1:
+                return [fetch_members(playlist, recheck) for playlist in selected]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                return list(executor.map(lambda playlist: fetch_members(playlist, recheck), selected))
+        
+        # Podział przed pobieraniem - pobranie aktualizuje cache stanu
+        changed_playlists, unchanged_playlists = [], []
+        for playlist in playlists:
+            cached = self.fetch_state.get(playlist['id'])
+            if self.playlist_changed(cached, playlist.get('video_count'), playlist.get('etag')):
+                changed_playlists.append(playlist)
+            else:
+                unchanged_playlists.append(playlist)
+        logger.info(f"Playlisty ze zmienioną liczbą filmów lub ETagiem: {len(changed_playlists)} z {len(playlists)}")
+        selected = changed_playlists
+        memberships = fetch_all(changed_playlists)
+        
+        found_ids = {video.video_id for videos in memberships for video in videos}
+        missing_ids = (video_ids if rescan_ids is None else rescan_ids) - found_ids
+        if missing_ids and unchanged_playlists:
+            logger.info(f"{len(missing_ids)} nowych filmów poza zmienionymi playlistami - przeglądam pozostałe {len(unchanged_playlists)}")
+            selected = changed_playlists + unchanged_playlists
+            memberships += fetch_all(unchanged_playlists, recheck=True)
+        
+        member_ids = list(dict.fromkeys(video.video_id for videos in memberships for video in videos))
+        all_stats = self.get_videos_stats_batch(member_ids)
+        for playlist, videos in zip(selected, memberships):
+            if videos:
+                yield playlist, self._merge_videos_with_stats(videos, all_stats, playlist['id'], playlist['title'])
+        
+    def _prioritize_recent(self, video_ids: List[str], published: Dict[str, Optional[str]]) -> List[str]:
+        """Przy budżecie quota: najnowsze filmy najpierw, stary katalog tylko w ramach budżetu.
+
+        published - data publikacji każdego filmu (video_id -> publishedAt). Filmy,
+        na które nie starcza quota, są pomijane w tym uruchomieniu (nie są
+        zapisywane) i zostaną odświeżone w kolejnym.
+        """
+        if not self.quota:
+            return video_ids
+        ordered = sorted(video_ids, key=lambda video_id: published.get(video_id) or '', reverse=True)
+        return self.limit_to_quota(ordered)
+        
+    def limit_to_quota(self, ordered: List[str]) -> List[str]:
+        """Obcina listę filmów (od najważniejszego) do liczby, na którą starcza quota zapytań videos"""
+        if not self.quota:
+            return ordered
+        affordable = self.quota.remaining() * MAX_RESULTS_PER_REQUEST
+        if len(ordered) > affordable:
+            logger.warning(
+                f"Quota wystarczy na statystyki {affordable} z {len(ordered)} filmów - "
+                f"starsze filmy kanału {self.channel_id} zostaną odświeżone w kolejnym uruchomieniu"
+            )
+            ordered = ordered[:affordable]
+        return ordered
+        
     def get_videos_stats_batch(self, video_ids: List[str]) -> Dict[str, Dict]:
         """Pobiera statystyki dla wielu filmów za jednym razem (oszczędza quota)"""
         if not video_ids:
@@ -195,22 +613,23 @@ class YouTubeAPIManager:
             
         # YouTube API pozwala na max 50 filmów na zapytanie
         batch_size = 50
+        batches = [video_ids[i:i + batch_size] for i in range(0, len(video_ids), batch_size)]
         all_stats = {}
         
-        for i in range(0, len(video_ids), batch_size):
-            batch_ids = video_ids[i:i + batch_size]
-            batch_stats = self._get_videos_stats_single_batch(batch_ids)
-            all_stats.update(batch_stats)
-            
-            # Krótka przerwa między batchami
-            if i + batch_size < len(video_ids):
-                time.sleep(0.1)
+        if self.concurrency == 1 or len(batches) == 1:
+            for batch_ids in batches:
+                all_stats.update(self._get_videos_stats_single_batch(batch_ids))
+            return all_stats
+        
+        # Partie pobierane równolegle - tempo ogranicza rate_limiter
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+            for batch_stats in executor.map(self._get_videos_stats_single_batch, batches):
+                all_stats.update(batch_stats)
                 
         return all_stats
         
     def _get_videos_stats_single_batch(self, video_ids: List[str]) -> Dict[str, Dict]:
         """Pobiera statystyki dla jednej partii filmów (max 50)"""
-        url = f"{self.base_url}/videos"
         params = {
             'part': 'statistics,snippet',
             'id': ','.join(video_ids),
@@ -218,9 +637,7 @@ class YouTubeAPIManager:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get('videos', params)
             
             stats_dict = {}
             for item in data.get('items', []):
@@ -236,11 +653,12 @@ class YouTubeAPIManager:
                     'published_at': item['snippet'].get('publishedAt')
                 }
                 
+            self.metrics.incr('videos_with_stats', len(stats_dict))
             return stats_dict
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Błąd przy pobieraniu statystyk dla batch: {e}")
-            return {}
+            raise
             
     def check_quota_usage(self) -> Dict:
         """Sprawdza użycie quota API (wymaga dodatkowych uprawnień)"""
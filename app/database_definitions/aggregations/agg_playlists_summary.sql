@@ -1,16 +1,29 @@
 INSERT INTO zero_stats.agg_playlists_summary (playlist_id, playlist_title, total_views, total_likes, total_videos, avg_views, avg_likes)
+-- Aggregated on the integer playlist key over the narrow membership / video rows, titles joined afterwards
+WITH playlists_agg AS (
+    SELECT 
+        pv.playlist_key,
+        SUM(v.view_count) as total_views,
+        SUM(v.like_count) as total_likes,
+        COUNT(*) as total_videos,
+        AVG(v.view_count) as avg_views,
+        AVG(v.like_count) as avg_likes
+    FROM zero_stats.playlist_videos pv
+    JOIN zero_stats.videos v ON v.video_key = pv.video_key
+    WHERE v.published_at < CURRENT_DATE
+    GROUP BY pv.playlist_key
+)
 SELECT 
-    playlist_id,
-    MAX(playlist_title) as playlist_title,
-    SUM(view_count) as total_views,
-    SUM(like_count) as total_likes,
-    COUNT(*) as total_videos,
-    AVG(view_count) as avg_views,
-    AVG(like_count) as avg_likes
-FROM zero_stats.yt_movies
-WHERE published_at::date <= CURRENT_DATE - INTERVAL '1 day'
-GROUP BY playlist_id
-ORDER BY total_views DESC
+    p.playlist_id,
+    p.playlist_title,
+    agg.total_views,
+    agg.total_likes,
+    agg.total_videos,
+    agg.avg_views,
+    agg.avg_likes
+FROM playlists_agg agg
+JOIN zero_stats.playlists p ON p.playlist_key = agg.playlist_key
+ORDER BY agg.total_views DESC
 ON CONFLICT (playlist_id) 
 DO UPDATE SET 
     playlist_title = EXCLUDED.playlist_title,
@@ -18,4 +31,12 @@ DO UPDATE SET
     total_likes = EXCLUDED.total_likes,
     total_videos = EXCLUDED.total_videos,
     avg_views = EXCLUDED.avg_views,
-    avg_likes = EXCLUDED.avg_likes;
\ No newline at end of file
+    avg_likes = EXCLUDED.avg_likes;
+
+-- Invalidate website caches
+INSERT INTO zero_stats.data_version (name, version, updated_at)
+VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+ON CONFLICT (name)
+DO UPDATE SET
+    version = zero_stats.data_version.version + 1,
+    updated_at = CURRENT_TIMESTAMP;
@@ -0,0 +1,95 @@
+-- Incremental refresh of agg_playlists_summary.
+-- Recomputes only playlists with videos or memberships inserted/updated since the last watermark,
+-- renamed playlists and playlists with videos that crossed the published_at cutoff since the last run.
+
+-- 1. Capture the next watermark before reading source data. created_at/updated_at hold the writing
+--    transaction's start time, so a loader transaction still open now may commit rows older than the
+--    newest visible one: the watermark trails the clock by a safety lag longer than any loader transaction.
+INSERT INTO zero_stats.agg_watermarks (agg_name, pending_source_updated_at, pending_cutoff_date)
+SELECT
+    'agg_playlists_summary',
+    LEAST(
+        GREATEST(
+            (SELECT MAX(updated_at) FROM zero_stats.videos),
+            (SELECT MAX(created_at) FROM zero_stats.videos),
+            (SELECT MAX(created_at) FROM zero_stats.playlist_videos),
+            (SELECT MAX(updated_at) FROM zero_stats.playlists)
+        ),
+        LOCALTIMESTAMP - INTERVAL '1 hour'
+    ),
+    CURRENT_DATE - 1
+ON CONFLICT (agg_name)
+DO UPDATE SET
+    pending_source_updated_at = EXCLUDED.pending_source_updated_at,
+    pending_cutoff_date = EXCLUDED.pending_cutoff_date;
+
+-- 2. Recompute touched playlists
+INSERT INTO zero_stats.agg_playlists_summary (playlist_id, playlist_title, total_views, total_likes, total_videos, avg_views, avg_likes)
+WITH params AS (
+    SELECT
+        COALESCE(source_updated_at, '-infinity'::timestamp) AS source_updated_at,
+        COALESCE(cutoff_date, '-infinity'::date) AS cutoff_date
+    FROM zero_stats.agg_watermarks
+    WHERE agg_name = 'agg_playlists_summary'
+)
+,touched_playlists AS (
+    SELECT pv.playlist_key
+    FROM zero_stats.playlist_videos pv
+    JOIN zero_stats.videos v ON v.video_key = pv.video_key, params p
+    WHERE v.updated_at > p.source_updated_at
+       OR v.created_at > p.source_updated_at
+       OR pv.created_at > p.source_updated_at
+       OR (v.published_at >= p.cutoff_date + 1 AND v.published_at < CURRENT_DATE)
+    UNION
+    SELECT pl.playlist_key
+    FROM zero_stats.playlists pl, params p
+    WHERE pl.updated_at > p.source_updated_at
+)
+,playlists_agg AS (
+    SELECT 
+        pv.playlist_key,
+        SUM(v.view_count) as total_views,
+        SUM(v.like_count) as total_likes,
+        COUNT(*) as total_videos,
+        AVG(v.view_count) as avg_views,
+        AVG(v.like_count) as avg_likes
+    FROM zero_stats.playlist_videos pv
+    JOIN zero_stats.videos v ON v.video_key = pv.video_key
+    WHERE v.published_at < CURRENT_DATE
+        AND pv.playlist_key IN (SELECT playlist_key FROM touched_playlists)
+    GROUP BY pv.playlist_key
+)
+SELECT 
+    p.playlist_id,
+    p.playlist_title,
+    agg.total_views,
+    agg.total_likes,
+    agg.total_videos,
+    agg.avg_views,
+    agg.avg_likes
+FROM playlists_agg agg
+JOIN zero_stats.playlists p ON p.playlist_key = agg.playlist_key
+ON CONFLICT (playlist_id) 
+DO UPDATE SET 
+    playlist_title = EXCLUDED.playlist_title,
+    total_views = EXCLUDED.total_views,
+    total_likes = EXCLUDED.total_likes,
+    total_videos = EXCLUDED.total_videos,
+    avg_views = EXCLUDED.avg_views,
+    avg_likes = EXCLUDED.avg_likes;
+
+-- 3. Promote the watermark
+UPDATE zero_stats.agg_watermarks
+SET
+    source_updated_at = pending_source_updated_at,
+    cutoff_date = pending_cutoff_date,
+    refreshed_at = CURRENT_TIMESTAMP
+WHERE agg_name = 'agg_playlists_summary';
+
+-- Invalidate website caches
+INSERT INTO zero_stats.data_version (name, version, updated_at)
+VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+ON CONFLICT (name)
+DO UPDATE SET
+    version = zero_stats.data_version.version + 1,
+    updated_at = CURRENT_TIMESTAMP;
@@ -0,0 +1,42 @@
+-- Refresh of the agg_playlists_monthly materialized view (ddl/materialized_views.sql).
+-- CONCURRENTLY diffs the new result against the current contents, so dashboard reads
+-- are not blocked and never see an empty view while the refresh runs.
+REFRESH MATERIALIZED VIEW CONCURRENTLY zero_stats.agg_playlists_monthly;
+
+-- Per-playlist chart payloads (columnar JSON of the non-empty months only) rebuilt from the
+-- small monthly table; the website slices them to the requested range and fills empty months.
+-- Unchanged payloads are not rewritten
+INSERT INTO zero_stats.agg_playlists_monthly_payload (playlist_id, playlist_title, payload, updated_at)
+SELECT
+    playlist_id,
+    MAX(playlist_title) as playlist_title,
+    jsonb_build_object(
+        'id', playlist_id,
+        'title', MAX(playlist_title),
+        'year_month', jsonb_agg(year_month ORDER BY year_month),
+        'total_views', jsonb_agg(total_views ORDER BY year_month),
+        'total_likes', jsonb_agg(total_likes ORDER BY year_month),
+        'video_count', jsonb_agg(total_videos ORDER BY year_month)
+    ) as payload,
+    CURRENT_TIMESTAMP
+FROM zero_stats.agg_playlists_monthly
+GROUP BY playlist_id
+ON CONFLICT (playlist_id)
+DO UPDATE SET
+    playlist_title = EXCLUDED.playlist_title,
+    payload = EXCLUDED.payload,
+    updated_at = EXCLUDED.updated_at
+WHERE zero_stats.agg_playlists_monthly_payload.payload IS DISTINCT FROM EXCLUDED.payload;
+
+DELETE FROM zero_stats.agg_playlists_monthly_payload p
+WHERE NOT EXISTS (
+    SELECT 1 FROM zero_stats.agg_playlists_monthly m WHERE m.playlist_id = p.playlist_id
+);
+
+-- Invalidate website caches
+INSERT INTO zero_stats.data_version (name, version, updated_at)
+VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+ON CONFLICT (name)
+DO UPDATE SET
+    version = zero_stats.data_version.version + 1,
+    updated_at = CURRENT_TIMESTAMP;
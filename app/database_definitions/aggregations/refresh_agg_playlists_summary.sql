@@ -0,0 +1,12 @@
+-- Refresh of the agg_playlists_summary materialized view (ddl/materialized_views.sql).
+-- CONCURRENTLY diffs the new result against the current contents, so dashboard reads
+-- are not blocked and never see an empty view while the refresh runs.
+REFRESH MATERIALIZED VIEW CONCURRENTLY zero_stats.agg_playlists_summary;
+
+-- Invalidate website caches
+INSERT INTO zero_stats.data_version (name, version, updated_at)
+VALUES ('dashboard', 1, CURRENT_TIMESTAMP)
+ON CONFLICT (name)
+DO UPDATE SET
+    version = zero_stats.data_version.version + 1,
+    updated_at = CURRENT_TIMESTAMP;
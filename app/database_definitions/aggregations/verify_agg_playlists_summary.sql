@@ -0,0 +1,32 @@
+-- Compares agg_playlists_summary with a full rebuild computed on the fly.
+-- Returns the number of playlists that are missing, differ or should not be stored (0 = consistent).
+WITH expected AS (
+    SELECT 
+        p.playlist_id,
+        p.playlist_title,
+        SUM(v.view_count) as total_views,
+        SUM(v.like_count) as total_likes,
+        COUNT(*) as total_videos,
+        AVG(v.view_count)::DECIMAL(15,2) as avg_views,
+        AVG(v.like_count)::DECIMAL(15,2) as avg_likes
+    FROM zero_stats.playlist_videos pv
+    JOIN zero_stats.videos v ON v.video_key = pv.video_key
+    JOIN zero_stats.playlists p ON p.playlist_key = pv.playlist_key
+    WHERE v.published_at < CURRENT_DATE
+    GROUP BY p.playlist_key
+)
+,stored AS (
+    SELECT playlist_id, playlist_title, total_views, total_likes, total_videos, avg_views, avg_likes
+    FROM zero_stats.agg_playlists_summary
+)
+,mismatched AS (
+    (SELECT * FROM expected
+    EXCEPT
+    SELECT * FROM stored)
+    UNION ALL
+    (SELECT * FROM stored
+    EXCEPT
+    SELECT * FROM expected)
+)
+SELECT COUNT(*) AS mismatched_rows
+FROM mismatched;
@@ -1,10 +1,17 @@
--- Schema for YouTube movies data
-CREATE TABLE IF NOT EXISTS zero_stats.yt_movies (
-    id SERIAL PRIMARY KEY,
+-- Schema for YouTube movies data: playlist dimension, video facts and many-to-many membership.
+-- Integer surrogate keys keep the membership table and the aggregation joins narrow.
+CREATE TABLE IF NOT EXISTS zero_stats.playlists (
+    playlist_key SERIAL PRIMARY KEY,
+    playlist_id VARCHAR(50) UNIQUE NOT NULL,
+    playlist_title VARCHAR(200) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS zero_stats.videos (
+    video_key SERIAL PRIMARY KEY,
     video_id VARCHAR(20) UNIQUE NOT NULL,
     title VARCHAR(500) NOT NULL,
-    playlist_id VARCHAR(50) NOT NULL,
-    playlist_title VARCHAR(200) NOT NULL,
     view_count INTEGER DEFAULT 0,
     like_count INTEGER DEFAULT 0,
     published_at TIMESTAMP,
@@ -12,10 +19,18 @@ CREATE TABLE IF NOT EXISTS zero_stats.yt_movies (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- A video can be in several playlists of the channel
+CREATE TABLE IF NOT EXISTS zero_stats.playlist_videos (
+    playlist_key INTEGER NOT NULL REFERENCES zero_stats.playlists (playlist_key),
+    video_key INTEGER NOT NULL REFERENCES zero_stats.videos (video_key),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (playlist_key, video_key)
+);
+
 -- Index for faster lookups
-CREATE INDEX IF NOT EXISTS idx_yt_movies_video_id ON zero_stats.yt_movies(video_id);
-CREATE INDEX IF NOT EXISTS idx_yt_movies_playlist_id ON zero_stats.yt_movies(playlist_id);
-CREATE INDEX IF NOT EXISTS idx_yt_movies_published_at ON zero_stats.yt_movies(published_at);
+CREATE INDEX IF NOT EXISTS idx_playlist_videos_video_key ON zero_stats.playlist_videos(video_key);
+CREATE INDEX IF NOT EXISTS idx_videos_published_at ON zero_stats.videos(published_at);
 
 -- Trigger to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -26,12 +41,33 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
-CREATE TRIGGER update_yt_movies_updated_at 
-    BEFORE UPDATE ON zero_stats.yt_movies 
+CREATE TRIGGER update_playlists_updated_at 
+    BEFORE UPDATE ON zero_stats.playlists 
     FOR EACH ROW 
-    EXECUTE FUNCTION update_updated_at_column(); 
+    EXECUTE FUNCTION update_updated_at_column();
 
-    
+CREATE TRIGGER update_videos_updated_at 
+    BEFORE UPDATE ON zero_stats.videos 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
+
+-- Append-only history of video statistics (a row is written only when a value changed)
+CREATE TABLE IF NOT EXISTS zero_stats.yt_movies_snapshots (
+    video_id VARCHAR(20) NOT NULL,
+    captured_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    view_count BIGINT NOT NULL,
+    like_count BIGINT NOT NULL,
+    comment_count BIGINT,
+
+    PRIMARY KEY (video_id, captured_at)
+);
+
+-- BRIN keeps time-window scans cheap on an insert-ordered table of millions of rows
+CREATE INDEX IF NOT EXISTS idx_yt_movies_snapshots_captured_at_brin ON zero_stats.yt_movies_snapshots USING BRIN (captured_at);
+
+-- Only non-empty (playlist, month) cells, so the table grows with videos, not playlists x months;
+-- the website fills empty months of the requested range at read time
 CREATE TABLE zero_stats.agg_playlists_monthly (
     year_month VARCHAR(7) NOT NULL,
     playlist_id VARCHAR(255) NOT NULL,
@@ -43,6 +79,17 @@ CREATE TABLE zero_stats.agg_playlists_monthly (
     PRIMARY KEY (year_month, playlist_id)
 );
 
+-- Per-playlist monthly time series in columnar JSON (non-empty months only); the website slices
+-- it to the requested month range and fills the months without videos with zeros
+CREATE TABLE IF NOT EXISTS zero_stats.agg_playlists_monthly_payload (
+    playlist_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    playlist_title TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_agg_playlists_monthly_payload_title ON zero_stats.agg_playlists_monthly_payload(playlist_title);
+
 CREATE TABLE zero_stats.agg_playlists_summary (
     playlist_id VARCHAR(255) NOT NULL PRIMARY KEY,
     playlist_title TEXT NOT NULL,
@@ -51,4 +98,48 @@ CREATE TABLE zero_stats.agg_playlists_summary (
     total_videos INTEGER DEFAULT 0,
     avg_views DECIMAL(15,2) DEFAULT 0,
     avg_likes DECIMAL(15,2) DEFAULT 0
-);
\ No newline at end of file
+);
+
+-- Watermarks for incremental aggregation refreshes.
+-- pending_* is captured before an aggregation run and promoted once the run succeeds.
+CREATE TABLE IF NOT EXISTS zero_stats.agg_watermarks (
+    agg_name VARCHAR(100) NOT NULL PRIMARY KEY,
+    source_updated_at TIMESTAMP,
+    cutoff_date DATE,
+    pending_source_updated_at TIMESTAMP,
+    pending_cutoff_date DATE,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Data version marker bumped by the loader and aggregation jobs; the website cache is keyed on it
+CREATE TABLE IF NOT EXISTS zero_stats.data_version (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Change detection for incremental aggregations
+CREATE INDEX IF NOT EXISTS idx_videos_updated_at ON zero_stats.videos(updated_at);
+CREATE INDEX IF NOT EXISTS idx_videos_created_at ON zero_stats.videos(created_at);
+CREATE INDEX IF NOT EXISTS idx_playlist_videos_created_at ON zero_stats.playlist_videos(created_at);
+CREATE INDEX IF NOT EXISTS idx_playlists_updated_at ON zero_stats.playlists(updated_at);
+
+-- Covering index of the aggregation joins (playlist_videos -> videos by video_key, published_at < CURRENT_DATE,
+-- view/like sums): the fact side of every aggregation is an index-only scan
+CREATE INDEX IF NOT EXISTS idx_videos_key_cover ON zero_stats.videos(video_key) INCLUDE (published_at, view_count, like_count);
+
+-- Keyset pagination of the playlists API (/api/playlists)
+CREATE INDEX IF NOT EXISTS idx_playlists_title_id ON zero_stats.playlists(playlist_title, playlist_id);
+
+-- Playlist search of /api/playlists (playlist_title ILIKE '%...%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_playlists_title_trgm ON zero_stats.playlists USING GIN (playlist_title gin_trgm_ops);
+
+-- Adaptive stats refresh: when each video's statistics are due again (set by the loader from the video's age
+-- and view growth). Kept out of videos, so rescheduling does not touch videos.updated_at (aggregation watermarks)
+CREATE TABLE IF NOT EXISTS zero_stats.yt_movies_refresh (
+    video_id VARCHAR(20) NOT NULL PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    view_count BIGINT NOT NULL,
+    next_refresh_at TIMESTAMP NOT NULL
+);
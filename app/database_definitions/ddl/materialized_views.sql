@@ -0,0 +1,46 @@
+-- Optional: agg_playlists_summary and agg_playlists_monthly as materialized views.
+-- Replaces the aggregation tables from ddl.sql with materialized views of the same name and columns,
+-- so the website and the verify queries keep working unchanged. The views are refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY (DAG mode=refresh, refresh_agg_*.sql), which needs the
+-- unique indexes below and lets readers query the previous contents during the refresh.
+-- After applying this script the full / incremental modes (INSERT ... ON CONFLICT) can no longer be used.
+BEGIN;
+
+DROP TABLE IF EXISTS zero_stats.agg_playlists_summary;
+
+CREATE MATERIALIZED VIEW zero_stats.agg_playlists_summary AS
+SELECT
+    p.playlist_id,
+    p.playlist_title,
+    SUM(v.view_count)::BIGINT as total_views,
+    SUM(v.like_count)::BIGINT as total_likes,
+    COUNT(*)::INTEGER as total_videos,
+    AVG(v.view_count)::DECIMAL(15,2) as avg_views,
+    AVG(v.like_count)::DECIMAL(15,2) as avg_likes
+FROM zero_stats.playlist_videos pv
+JOIN zero_stats.videos v ON v.video_key = pv.video_key
+JOIN zero_stats.playlists p ON p.playlist_key = pv.playlist_key
+WHERE v.published_at < CURRENT_DATE
+GROUP BY p.playlist_key;
+
+CREATE UNIQUE INDEX idx_agg_playlists_summary_playlist_id ON zero_stats.agg_playlists_summary(playlist_id);
+
+DROP TABLE IF EXISTS zero_stats.agg_playlists_monthly;
+
+-- Only non-empty (playlist, month) cells, like the table in ddl.sql
+CREATE MATERIALIZED VIEW zero_stats.agg_playlists_monthly AS
+select
+	to_char(v.published_at, 'YYYY.MM')::VARCHAR(7) as year_month,
+	p.playlist_id, p.playlist_title,
+	sum(v.view_count)::BIGINT as total_views,
+	sum(v.like_count)::BIGINT as total_likes,
+	count(*)::INTEGER as total_videos
+from zero_stats.playlist_videos pv
+join zero_stats.videos v on v.video_key = pv.video_key
+join zero_stats.playlists p on p.playlist_key = pv.playlist_key
+WHERE v.published_at < CURRENT_DATE
+group by p.playlist_key, to_char(v.published_at, 'YYYY.MM');
+
+CREATE UNIQUE INDEX idx_agg_playlists_monthly_key ON zero_stats.agg_playlists_monthly(year_month, playlist_id);
+
+COMMIT;
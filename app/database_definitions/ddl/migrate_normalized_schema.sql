@@ -0,0 +1,102 @@
+-- Migration of an existing database from the denormalized yt_movies table to
+-- playlists / videos / playlist_videos (ddl.sql describes the resulting schema).
+-- Copies the data, keeps the old table as yt_movies_legacy (drop it once the migration is verified)
+-- and resets the aggregation watermarks, so the next incremental run recomputes everything.
+-- Snapshots (yt_movies_snapshots) and the refresh plan (yt_movies_refresh) are keyed by video_id and stay as they are.
+-- With the aggregates as materialized views (materialized_views.sql) run
+--   DROP MATERIALIZED VIEW zero_stats.agg_playlists_summary, zero_stats.agg_playlists_monthly;
+-- first and materialized_views.sql again afterwards (the views would keep reading yt_movies_legacy).
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS zero_stats.playlists (
+    playlist_key SERIAL PRIMARY KEY,
+    playlist_id VARCHAR(50) UNIQUE NOT NULL,
+    playlist_title VARCHAR(200) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS zero_stats.videos (
+    video_key SERIAL PRIMARY KEY,
+    video_id VARCHAR(20) UNIQUE NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    view_count INTEGER DEFAULT 0,
+    like_count INTEGER DEFAULT 0,
+    published_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS zero_stats.playlist_videos (
+    playlist_key INTEGER NOT NULL REFERENCES zero_stats.playlists (playlist_key),
+    video_key INTEGER NOT NULL REFERENCES zero_stats.videos (video_key),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (playlist_key, video_key)
+);
+
+-- A playlist / video has one row per playlist copy in yt_movies: the most recently
+-- updated copy gives the title and stats, created_at is the earliest copy's
+INSERT INTO zero_stats.playlists (playlist_id, playlist_title, created_at, updated_at)
+SELECT DISTINCT ON (playlist_id)
+    playlist_id,
+    playlist_title,
+    MIN(created_at) OVER (PARTITION BY playlist_id),
+    updated_at
+FROM zero_stats.yt_movies
+ORDER BY playlist_id, updated_at DESC NULLS LAST
+ON CONFLICT (playlist_id) DO NOTHING;
+
+INSERT INTO zero_stats.videos (video_id, title, view_count, like_count, published_at, created_at, updated_at)
+SELECT DISTINCT ON (video_id)
+    video_id,
+    title,
+    view_count,
+    like_count,
+    published_at,
+    MIN(created_at) OVER (PARTITION BY video_id),
+    updated_at
+FROM zero_stats.yt_movies
+ORDER BY video_id, updated_at DESC NULLS LAST
+ON CONFLICT (video_id) DO NOTHING;
+
+INSERT INTO zero_stats.playlist_videos (playlist_key, video_key, created_at)
+SELECT p.playlist_key, v.video_key, ym.created_at
+FROM zero_stats.yt_movies ym
+JOIN zero_stats.playlists p ON p.playlist_id = ym.playlist_id
+JOIN zero_stats.videos v ON v.video_id = ym.video_id
+ON CONFLICT (playlist_key, video_key) DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS idx_playlist_videos_video_key ON zero_stats.playlist_videos(video_key);
+CREATE INDEX IF NOT EXISTS idx_videos_published_at ON zero_stats.videos(published_at);
+CREATE INDEX IF NOT EXISTS idx_videos_updated_at ON zero_stats.videos(updated_at);
+CREATE INDEX IF NOT EXISTS idx_videos_created_at ON zero_stats.videos(created_at);
+CREATE INDEX IF NOT EXISTS idx_playlist_videos_created_at ON zero_stats.playlist_videos(created_at);
+CREATE INDEX IF NOT EXISTS idx_playlists_updated_at ON zero_stats.playlists(updated_at);
+CREATE INDEX IF NOT EXISTS idx_videos_key_cover ON zero_stats.videos(video_key) INCLUDE (published_at, view_count, like_count);
+CREATE INDEX IF NOT EXISTS idx_playlists_title_id ON zero_stats.playlists(playlist_title, playlist_id);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_playlists_title_trgm ON zero_stats.playlists USING GIN (playlist_title gin_trgm_ops);
+
+-- Created after the backfill, so the copied updated_at values are kept
+DROP TRIGGER IF EXISTS update_playlists_updated_at ON zero_stats.playlists;
+CREATE TRIGGER update_playlists_updated_at
+    BEFORE UPDATE ON zero_stats.playlists
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_videos_updated_at ON zero_stats.videos;
+CREATE TRIGGER update_videos_updated_at
+    BEFORE UPDATE ON zero_stats.videos
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE zero_stats.yt_movies RENAME TO yt_movies_legacy;
+
+DELETE FROM zero_stats.agg_watermarks;
+
+COMMIT;
+
+ANALYZE zero_stats.playlists;
+ANALYZE zero_stats.videos;
+ANALYZE zero_stats.playlist_videos;
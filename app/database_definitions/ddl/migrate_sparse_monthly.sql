@@ -0,0 +1,47 @@
+-- Migration of agg_playlists_monthly to sparse storage (only non-empty (playlist, month) cells).
+-- Removes the zero rows of the former dense month grid and rewrites the per-playlist payloads
+-- without them; the website slices the payloads to the requested month range.
+-- With the aggregates as materialized views run materialized_views.sql again instead of the DELETE.
+BEGIN;
+
+DELETE FROM zero_stats.agg_playlists_monthly
+WHERE total_videos = 0;
+
+CREATE TABLE IF NOT EXISTS zero_stats.agg_playlists_monthly_payload (
+    playlist_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    playlist_title TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_agg_playlists_monthly_payload_title ON zero_stats.agg_playlists_monthly_payload(playlist_title);
+
+INSERT INTO zero_stats.agg_playlists_monthly_payload (playlist_id, playlist_title, payload, updated_at)
+SELECT
+    playlist_id,
+    MAX(playlist_title) as playlist_title,
+    jsonb_build_object(
+        'id', playlist_id,
+        'title', MAX(playlist_title),
+        'year_month', jsonb_agg(year_month ORDER BY year_month),
+        'total_views', jsonb_agg(total_views ORDER BY year_month),
+        'total_likes', jsonb_agg(total_likes ORDER BY year_month),
+        'video_count', jsonb_agg(total_videos ORDER BY year_month)
+    ) as payload,
+    CURRENT_TIMESTAMP
+FROM zero_stats.agg_playlists_monthly
+GROUP BY playlist_id
+ON CONFLICT (playlist_id)
+DO UPDATE SET
+    playlist_title = EXCLUDED.playlist_title,
+    payload = EXCLUDED.payload,
+    updated_at = EXCLUDED.updated_at;
+
+DELETE FROM zero_stats.agg_playlists_monthly_payload p
+WHERE NOT EXISTS (
+    SELECT 1 FROM zero_stats.agg_playlists_monthly m WHERE m.playlist_id = p.playlist_id
+);
+
+COMMIT;
+
+VACUUM ANALYZE zero_stats.agg_playlists_monthly;
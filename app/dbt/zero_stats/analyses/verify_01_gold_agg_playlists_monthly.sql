@@ -0,0 +1,41 @@
+-- Compares 01_gold_agg_playlists_monthly with a full rebuild computed on the fly.
+-- Returns the number of (playlist, month) rows that are missing, differ or should not be stored
+-- (only non-empty cells are stored; 0 = consistent).
+WITH playlists_agg as (
+	select 
+		to_char(v.published_at, 'YYYY.MM') as year_month,
+		pv.playlist_key, 
+		sum(v.view_count) as total_views, 
+		sum(v.like_count) as total_likes,
+		count(*) as total_videos
+	from {{ source('zero_stats', 'playlist_videos') }} pv
+	join {{ source('zero_stats', 'videos') }} v on v.video_key = pv.video_key
+	WHERE v.published_at < CURRENT_DATE
+	group by pv.playlist_key, to_char(v.published_at, 'YYYY.MM')
+)
+,expected as (
+	select
+		agg.year_month,
+		p.playlist_id, p.playlist_title, 
+		agg.total_views, 
+		agg.total_likes,
+		agg.total_videos
+	from playlists_agg as agg
+	join {{ source('zero_stats', 'playlists') }} p
+		on p.playlist_key = agg.playlist_key
+)
+,stored as (
+	select year_month, playlist_id, playlist_title, total_views, total_likes, total_videos
+	from {{ ref('01_gold_agg_playlists_monthly') }}
+)
+,mismatched as (
+	(select * from expected
+	except
+	select * from stored)
+	union all
+	(select * from stored
+	except
+	select * from expected)
+)
+select count(*) as mismatched_rows
+from mismatched;
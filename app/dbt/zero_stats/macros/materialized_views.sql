@@ -0,0 +1,10 @@
+{#
+  Materialized views (gold_materialized: materialized_view) are refreshed
+  CONCURRENTLY, so readers keep seeing the previous contents instead of waiting
+  for the refresh. Needs the unique index declared in the model's `indexes` config
+  and a populated view (dbt populates it when it creates the view).
+#}
+
+{% macro postgres__refresh_materialized_view(relation) %}
+    refresh materialized view concurrently {{ relation }}
+{% endmacro %}
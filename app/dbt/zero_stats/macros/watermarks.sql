@@ -0,0 +1,46 @@
+{#
+  Watermarks for incremental gold models, stored in zero_stats.agg_watermarks.
+  The next watermark is captured before the model reads its sources (pre_hook)
+  and promoted only after the model has been built (post_hook).
+  created_at/updated_at hold the writing transaction's start time, so a loader
+  transaction still open at capture may commit rows older than the newest
+  visible one: the watermark trails the clock by var('watermark_lag'), which
+  must be longer than any loader transaction.
+#}
+
+{% macro capture_watermark(agg_name) %}
+INSERT INTO {{ source('zero_stats', 'agg_watermarks') }} (agg_name, pending_source_updated_at, pending_cutoff_date)
+SELECT
+    '{{ agg_name }}',
+    LEAST(
+        GREATEST(
+            (SELECT MAX(updated_at) FROM {{ source('zero_stats', 'videos') }}),
+            (SELECT MAX(created_at) FROM {{ source('zero_stats', 'videos') }}),
+            (SELECT MAX(created_at) FROM {{ source('zero_stats', 'playlist_videos') }}),
+            (SELECT MAX(updated_at) FROM {{ source('zero_stats', 'playlists') }})
+        ),
+        LOCALTIMESTAMP - INTERVAL '{{ var("watermark_lag", "1 hour") }}'
+    ),
+    CURRENT_DATE - 1
+ON CONFLICT (agg_name)
+DO UPDATE SET
+    pending_source_updated_at = EXCLUDED.pending_source_updated_at,
+    pending_cutoff_date = EXCLUDED.pending_cutoff_date
+{% endmacro %}
+
+{% macro promote_watermark(agg_name) %}
+UPDATE {{ source('zero_stats', 'agg_watermarks') }}
+SET
+    source_updated_at = pending_source_updated_at,
+    cutoff_date = pending_cutoff_date,
+    refreshed_at = CURRENT_TIMESTAMP
+WHERE agg_name = '{{ agg_name }}'
+{% endmacro %}
+
+{% macro watermark(agg_name) %}
+SELECT
+    COALESCE(source_updated_at, '-infinity'::timestamp) AS source_updated_at,
+    COALESCE(cutoff_date, '-infinity'::date) AS cutoff_date
+FROM {{ source('zero_stats', 'agg_watermarks') }}
+WHERE agg_name = '{{ agg_name }}'
+{% endmacro %}
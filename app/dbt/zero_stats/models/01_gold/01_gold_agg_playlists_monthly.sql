@@ -1,52 +1,55 @@
 {{
   config(
-    materialized='table',
-    unique_key=['year_month', 'playlist_id']
+    materialized=var('gold_materialized', 'table'),
+    unique_key=['year_month', 'playlist_id'],
+    indexes=[{'columns': ['year_month', 'playlist_id'], 'unique': True}],
+    incremental_strategy='delete+insert',
+    pre_hook="{{ capture_watermark('01_gold_agg_playlists_monthly') }}",
+    post_hook="{{ promote_watermark('01_gold_agg_playlists_monthly') }}"
   )
 }}
 
-WITH years_months AS ( 
-	SELECT to_char(date_trunc('month', generate_series(
-	    '2024-01-01'::date, 
-	     (now() - INTERVAL '1 day')::date, 
-	    '1 month'::interval
-	)), 'YYYY.MM') AS year_month
-)
-,distinct_playlits as (
+-- Only non-empty (playlist, month) cells are stored; empty months are filled at read time
+WITH playlists_agg as (
 	select 
-		ym.playlist_id, MAX(ym.playlist_title) as playlist_title
-	from {{ source('zero_stats', 'yt_movies') }} ym 
-	WHERE ym.published_at::date <= (now() - INTERVAL '1 day')::date
-	group by ym.playlist_id
-)
-,crossed_data as (
-	select year_month, playlist_id, playlist_title 
-	from years_months
-	cross join distinct_playlits
-)
-,playlists_agg as (
-	select 
-		to_char(ym.published_at, 'YYYY.MM') as year_month,
-		ym.playlist_id, 
-		MAX(ym.playlist_title) as playlist_title, 
-		sum(ym.view_count) as total_views, 
-		sum(ym.like_count) as total_likes,
-		count(ym.video_id) as total_videos
-	from {{ source('zero_stats', 'yt_movies') }} ym 
-	WHERE ym.published_at::date <= (now() - INTERVAL '1 day')::date
-	group by ym.playlist_id, to_char(ym.published_at, 'YYYY.MM')
-)
-,crossed_agg as (
-	select
-		cd.year_month,
-		cd.playlist_id, cd.playlist_title, 
-		coalesce(agg.total_views,0) as total_views, 
-		coalesce(agg.total_likes,0) as total_likes,
-		coalesce(agg.total_videos,0) as total_videos
-	from crossed_data as cd
-	left join playlists_agg as agg
-		on cd.year_month = agg.year_month
-		and cd.playlist_id  = agg.playlist_id
+		to_char(v.published_at, 'YYYY.MM') as year_month,
+		pv.playlist_key, 
+		sum(v.view_count) as total_views, 
+		sum(v.like_count) as total_likes,
+		count(*) as total_videos
+	from {{ source('zero_stats', 'playlist_videos') }} pv
+	join {{ source('zero_stats', 'videos') }} v on v.video_key = pv.video_key
+	WHERE v.published_at < CURRENT_DATE
+	{% if is_incremental() %}
+		and (pv.playlist_key, to_char(v.published_at, 'YYYY.MM')) in (
+			-- (playlist, month) keys changed since the last watermark
+			select distinct
+				cpv.playlist_key,
+				to_char(cv.published_at, 'YYYY.MM')
+			from {{ source('zero_stats', 'playlist_videos') }} cpv
+			join {{ source('zero_stats', 'videos') }} cv on cv.video_key = cpv.video_key, ({{ watermark('01_gold_agg_playlists_monthly') }}) w
+			WHERE cv.published_at < CURRENT_DATE
+				and (cv.updated_at > w.source_updated_at
+					or cv.created_at > w.source_updated_at
+					or cpv.created_at > w.source_updated_at
+					or cv.published_at >= w.cutoff_date + 1)
+			union
+			-- all stored cells of renamed playlists
+			select rp.playlist_key, agg.year_month
+			from {{ this }} agg
+			join {{ source('zero_stats', 'playlists') }} rp on rp.playlist_id = agg.playlist_id, ({{ watermark('01_gold_agg_playlists_monthly') }}) w
+			where rp.updated_at > w.source_updated_at
+				and agg.playlist_title <> rp.playlist_title
+		)
+	{% endif %}
+	group by pv.playlist_key, to_char(v.published_at, 'YYYY.MM')
 )
-select * 
-from crossed_agg
+select
+	agg.year_month,
+	p.playlist_id, p.playlist_title, 
+	agg.total_views, 
+	agg.total_likes,
+	agg.total_videos
+from playlists_agg as agg
+join {{ source('zero_stats', 'playlists') }} p
+	on p.playlist_key = agg.playlist_key
@@ -0,0 +1,22 @@
+{{
+  config(
+    materialized='table'
+  )
+}}
+
+-- Per-playlist monthly time series in columnar JSON (non-empty months only); the website slices
+-- it to the requested month range and fills the months without videos with zeros
+SELECT
+    playlist_id,
+    MAX(playlist_title) as playlist_title,
+    jsonb_build_object(
+        'id', playlist_id,
+        'title', MAX(playlist_title),
+        'year_month', jsonb_agg(year_month ORDER BY year_month),
+        'total_views', jsonb_agg(total_views ORDER BY year_month),
+        'total_likes', jsonb_agg(total_likes ORDER BY year_month),
+        'video_count', jsonb_agg(total_videos ORDER BY year_month)
+    ) as payload,
+    CURRENT_TIMESTAMP as updated_at
+FROM {{ ref('01_gold_agg_playlists_monthly') }}
+GROUP BY playlist_id
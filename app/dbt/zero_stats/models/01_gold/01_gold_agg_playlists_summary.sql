@@ -1,19 +1,41 @@
 {{
   config(
-    materialized='table',
-    unique_key='playlist_id'
+    materialized=var('gold_materialized', 'table'),
+    unique_key='playlist_id',
+    indexes=[{'columns': ['playlist_id'], 'unique': True}],
+    incremental_strategy='delete+insert',
+    pre_hook="{{ capture_watermark('01_gold_agg_playlists_summary') }}",
+    post_hook="{{ promote_watermark('01_gold_agg_playlists_summary') }}"
   )
 }}
 
 SELECT 
-    playlist_id,
-    MAX(playlist_title) as playlist_title,
-    SUM(view_count) as total_views,
-    SUM(like_count) as total_likes,
+    p.playlist_id,
+    p.playlist_title,
+    SUM(v.view_count) as total_views,
+    SUM(v.like_count) as total_likes,
     COUNT(*) as total_videos,
-    AVG(view_count) as avg_views,
-    AVG(like_count) as avg_likes
-FROM {{ source('zero_stats', 'yt_movies') }}
-WHERE published_at::date <= CURRENT_DATE - INTERVAL '1 day'
-GROUP BY playlist_id
+    AVG(v.view_count) as avg_views,
+    AVG(v.like_count) as avg_likes
+FROM {{ source('zero_stats', 'playlist_videos') }} pv
+JOIN {{ source('zero_stats', 'videos') }} v ON v.video_key = pv.video_key
+JOIN {{ source('zero_stats', 'playlists') }} p ON p.playlist_key = pv.playlist_key
+WHERE v.published_at < CURRENT_DATE
+{% if is_incremental() %}
+    -- only playlists changed since the last watermark
+    AND pv.playlist_key IN (
+        SELECT cpv.playlist_key
+        FROM {{ source('zero_stats', 'playlist_videos') }} cpv
+        JOIN {{ source('zero_stats', 'videos') }} cv ON cv.video_key = cpv.video_key, ({{ watermark('01_gold_agg_playlists_summary') }}) w
+        WHERE cv.updated_at > w.source_updated_at
+           OR cv.created_at > w.source_updated_at
+           OR cpv.created_at > w.source_updated_at
+           OR (cv.published_at >= w.cutoff_date + 1 AND cv.published_at < CURRENT_DATE)
+        UNION
+        SELECT cp.playlist_key
+        FROM {{ source('zero_stats', 'playlists') }} cp, ({{ watermark('01_gold_agg_playlists_summary') }}) w
+        WHERE cp.updated_at > w.source_updated_at
+    )
+{% endif %}
+GROUP BY p.playlist_key
 ORDER BY total_views DESC
@@ -18,14 +18,47 @@ def create_app():
     }
     app.config['DB_SCHEMA'] = environ.get('FLASK_DB_SCHEMA')
 
+    # Per-worker connection pool (recreated after fork)
+    app.config['DB_POOL_MIN'] = int(environ.get('FLASK_DB_POOL_MIN', 1))
+    app.config['DB_POOL_MAX'] = int(environ.get('FLASK_DB_POOL_MAX', 5))
+    app.config['DB_POOL_IDLE_TIMEOUT'] = float(environ.get('FLASK_DB_POOL_IDLE_TIMEOUT', 300))
+    app.config['DB_POOL_HEALTH_CHECK_INTERVAL'] = float(environ.get('FLASK_DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+    app.config['DB_POOL_WAIT_TIMEOUT'] = float(environ.get('FLASK_DB_POOL_WAIT_TIMEOUT', 10))
+    # Bearer token of the internal /health/db-pool endpoint (unset: endpoint disabled)
+    app.config['DB_POOL_STATS_TOKEN'] = environ.get('FLASK_DB_POOL_STATS_TOKEN')
+
+    # Page/query cache invalidated by the data version marker
+    app.config['CACHE_ENABLED'] = environ.get('FLASK_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['CACHE_TTL'] = float(environ.get('FLASK_CACHE_TTL', 24 * 3600))
+    app.config['CACHE_MAX_ENTRIES'] = int(environ.get('FLASK_CACHE_MAX_ENTRIES', 128))
+    app.config['CACHE_VERSION_CHECK_INTERVAL'] = float(environ.get('FLASK_CACHE_VERSION_CHECK_INTERVAL', 30))
+    # Optional directory shared by all gunicorn workers (default: in-process cache per worker)
+    app.config['CACHE_DIR'] = environ.get('FLASK_CACHE_DIR')
+
+    # Monthly charts: default first month of the range (YYYY-MM) and the longest range served
+    app.config['MONTHLY_RANGE_START'] = environ.get('FLASK_MONTHLY_RANGE_START', '2024-01')
+    app.config['MONTHLY_MAX_MONTHS'] = int(environ.get('FLASK_MONTHLY_MAX_MONTHS', 120))
+
+    # Streaming exports: rows fetched from the server-side cursor and encoded per batch
+    app.config['EXPORT_BATCH_SIZE'] = int(environ.get('FLASK_EXPORT_BATCH_SIZE', 10000))
+
+    from .database import init_db_pool
+    from .cache import init_cache
+    init_db_pool(app)
+    init_cache(app)
+
     from .blueprints.playlists.playlists import playlists
     from .blueprints.main.main import main
     from .blueprints.top_playlists.top_playlists import top_playlists
     from .blueprints.playlists_monthly.playlists_monthly import playlists_monthly
+    from .blueprints.api.api import api
+    from .blueprints.export.export import export
 
     app.register_blueprint(playlists, url_prefix='/playlists')
     app.register_blueprint(main, url_prefix='/')
     app.register_blueprint(top_playlists, url_prefix='/top-playlists')
     app.register_blueprint(playlists_monthly, url_prefix='/playlists-monthly')
+    app.register_blueprint(api, url_prefix='/api')
+    app.register_blueprint(export, url_prefix='/api/export')
     
     return app
\ No newline at end of file
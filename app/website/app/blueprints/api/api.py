@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+JSON API with keyset pagination used by the lazily loaded dashboard pages
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request
+from app.cache import cached_page
+from app.database import get_playlists_page, get_playlist_videos, get_playlists_monthly_payloads, join_payloads, month_range
+
+api = Blueprint('api', __name__)
+
+MAX_PLAYLISTS_PAGE = 100
+MAX_VIDEOS_PAGE = 1000
+
+
+def encode_cursor(values):
+    """Opaque cursor for the next page (last row's keyset values)"""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def decode_playlist_cursor(cursor):
+    """(playlist_title, playlist_id) of a playlists page cursor"""
+    after = decode_cursor(cursor)
+    if after is None:
+        return None
+    if len(after) != 2 or not all(isinstance(value, str) for value in after):
+        raise ValueError('Invalid cursor')
+    return after
+
+
+def decode_video_cursor(cursor):
+    """(published_at, video_id) of a playlist videos cursor; published_at is None for undated videos"""
+    after = decode_cursor(cursor)
+    if after is None:
+        return None
+    if len(after) != 2 or not isinstance(after[1], str):
+        raise ValueError('Invalid cursor')
+    published_at, video_id = after
+    if published_at is not None:
+        try:
+            published_at = datetime.fromisoformat(published_at)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+    return published_at, video_id
+
+
+def get_limit(default, maximum):
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, maximum))
+
+
+@api.errorhandler(ValueError)
+def handle_bad_request(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@api.route('/playlists')
+@cached_page
+def playlists_list():
+    """Playlists page: ?q=<title search>&limit=<n>&cursor=<next_cursor>"""
+    limit = get_limit(20, MAX_PLAYLISTS_PAGE)
+    search = request.args.get('q', '').strip() or None
+    rows = get_playlists_page(search=search, after=decode_playlist_cursor(request.args.get('cursor')), limit=limit)
+
+    playlists = [
+        {
+            'id': row['playlist_id'],
+            'title': row['playlist_title'],
+            'video_count': row['video_count']
+        }
+        for row in rows
+    ]
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor([rows[-1]['playlist_title'], rows[-1]['playlist_id']])
+
+    return jsonify({'playlists': playlists, 'next_cursor': next_cursor})
+
+
+@api.route('/playlists/<playlist_id>/videos')
+@cached_page
+def playlist_videos(playlist_id):
+    """Videos of a playlist by published_at: ?limit=<n>&cursor=<next_cursor>, or ?top=<n> by views"""
+    top = request.args.get('top', type=int)
+    if top is not None:
+        top = max(1, min(top, MAX_VIDEOS_PAGE))
+    limit = get_limit(500, MAX_VIDEOS_PAGE)
+    rows = get_playlist_videos(playlist_id, top=top, after=decode_video_cursor(request.args.get('cursor')), limit=limit)
+
+    videos = [
+        {
+            'video_id': row['video_id'],
+            'title': row['title'],
+            'view_count': row['view_count'],
+            'like_count': row['like_count'],
+            'published_at': row['published_at'].isoformat() if row['published_at'] else None
+        }
+        for row in rows
+    ]
+    next_cursor = None
+    if top is None and len(rows) == limit:
+        published_at = rows[-1]['published_at']
+        next_cursor = encode_cursor([published_at.isoformat() if published_at else None, rows[-1]['video_id']])
+
+    return jsonify({'videos': videos, 'next_cursor': next_cursor})
+
+
+@api.route('/playlists-monthly')
+@cached_page
+def playlists_monthly_series():
+    """Monthly chart payloads of all playlists for ?from=YYYY-MM&to=YYYY-MM.
+
+    Columnar shape per playlist: {id, title, year_month[], total_views[], total_likes[], video_count[]},
+    one entry per month of the range (months without videos are 0)
+    """
+    start, end = month_range(request.args.get('from'), request.args.get('to'))
+    rows = get_playlists_monthly_payloads(start, end)
+    return Response(join_payloads(rows), mimetype='application/json')
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Streaming exports of the videos and the aggregation tables (CSV or Parquet)
+for analysis outside the dashboard
+"""
+
+from datetime import date
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from app.database import EXPORT_DATASETS, iter_export_batches, parse_month
+from app.export import CSV_MIMETYPE, PARQUET_MIMETYPE, csv_chunks, parquet_available, parquet_chunks
+
+export = Blueprint('export', __name__)
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def export_filters(dataset):
+    """Filter parameters of the dataset from the query string (unknown parameters are ignored)"""
+    args = request.args
+    filters = {'playlist_id': args.get('playlist_id') or None}
+    if dataset == 'videos':
+        filters['published_from'] = parse_date(args.get('from'))
+        filters['published_to'] = parse_date(args.get('to'))
+    elif dataset == 'playlists-monthly':
+        filters['month_from'] = parse_month(args['from']).strftime('%Y.%m') if args.get('from') else None
+        filters['month_to'] = parse_month(args['to']).strftime('%Y.%m') if args.get('to') else None
+    return filters
+
+
+@export.errorhandler(ValueError)
+def handle_bad_request(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@export.route('/<dataset>')
+def export_dataset(dataset):
+    """Whole dataset as a stream: ?format=csv|parquet&playlist_id=<id>&from=<..>&to=<..>
+
+    videos: from/to filter published_at (YYYY-MM-DD, inclusive);
+    playlists-monthly: from/to filter year_month (YYYY-MM, inclusive);
+    playlists-summary: playlist_id only.
+    Rows are read from a server-side cursor in batches of EXPORT_BATCH_SIZE and
+    sent as they arrive, so the export size does not affect worker memory.
+    """
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f"Unknown dataset '{dataset}'", 'datasets': sorted(EXPORT_DATASETS)}), 404
+    output = request.args.get('format', 'csv')
+    if output not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown format '{output}', expected csv or parquet")
+    if output == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export needs the pyarrow package'}), 501
+
+    columns = EXPORT_DATASETS[dataset][0]
+    batches = iter_export_batches(dataset, export_filters(dataset), current_app.config['EXPORT_BATCH_SIZE'])
+    if output == 'csv':
+        chunks, mimetype = csv_chunks(columns, batches), CSV_MIMETYPE
+    else:
+        chunks, mimetype = parquet_chunks(columns, batches), PARQUET_MIMETYPE
+    filename = f"{dataset}.{output}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'Cache-Control': 'no-store'}
+    )
@@ -1,7 +1,25 @@
-from flask import Blueprint, render_template
+import hmac
+
+from flask import Blueprint, render_template, jsonify, current_app, request, abort
+from app.database import get_db_pool
 
 main = Blueprint('main', __name__, template_folder='templates', static_folder='static')
 
 @main.route('/')
 def index():
-    return render_template('main.html') 
\ No newline at end of file
+    return render_template('main.html')
+
+
+@main.route('/health/db-pool')
+def db_pool_health():
+    """Connection pool metrics of the current worker (checkouts, waits, idle/in use).
+
+    Internal endpoint: served only with DB_POOL_STATS_TOKEN set and an
+    "Authorization: Bearer <token>" header, otherwise 404.
+    """
+    token = current_app.config['DB_POOL_STATS_TOKEN']
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        abort(404)
+    return jsonify(get_db_pool().stats())
@@ -1,35 +1,39 @@
-from flask import Blueprint, render_template, jsonify
-from app.database import get_playlists_monthly_data
-from collections import defaultdict
+from flask import Blueprint, render_template, request
+from app.cache import cached_page
+from app.database import get_playlists_monthly_payloads, join_payloads, month_range
 
 playlists_monthly = Blueprint('playlists_monthly', __name__, template_folder='templates', static_folder='static')
 
+
 @playlists_monthly.route('/')
+@cached_page
 def playlists_monthly_index():
+    """Monthly charts of the range ?from=YYYY-MM&to=YYYY-MM (default: MONTHLY_RANGE_START - last month)"""
     try:
-        monthly_data = get_playlists_monthly_data()
-        
-        # Group data by playlist - much simpler since data is already complete
-        playlists = defaultdict(lambda: {
-            'id': None,
-            'title': None,
-            'monthly_data': []
-        })
+        start, end = month_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return render_template('playlists_monthly.html',
+                             playlists=[],
+                             chart_data='[]',
+                             range_from=request.args.get('from', ''),
+                             range_to=request.args.get('to', ''),
+                             error=str(e)), 400
+    try:
+        rows = get_playlists_monthly_payloads(start, end)
+        playlists = [{'id': row['playlist_id'], 'title': row['playlist_title']} for row in rows]
         
-        for row in monthly_data:
-            playlist_id = row['playlist_id']
-            playlists[playlist_id]['id'] = playlist_id
-            playlists[playlist_id]['title'] = row['playlist_title']
-            playlists[playlist_id]['monthly_data'].append({
-                'year_month': row['year_month'],
-                'total_views': row['total_views'],
-                'total_likes': row['total_likes'],
-                'video_count': row['video_count']
-            })
+        # Embedded in a <script> block - "</" must not close it
+        chart_data = join_payloads(rows).replace('</', '<\\/')
         
         return render_template('playlists_monthly.html', 
-                             playlists=dict(playlists))
+                             playlists=playlists,
+                             chart_data=chart_data,
+                             range_from=start.strftime('%Y-%m'),
+                             range_to=end.strftime('%Y-%m'))
     except Exception as e:
         return render_template('playlists_monthly.html', 
-                             playlists={}, 
-                             error=str(e))
\ No newline at end of file
+                             playlists=[], 
+                             chart_data='[]',
+                             range_from=start.strftime('%Y-%m'),
+                             range_to=end.strftime('%Y-%m'),
+                             error=str(e)), 500
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Server-side caching of query results and rendered pages.
+
+Cached entries are keyed on the data version marker (zero_stats.data_version),
+which is bumped by the loader and the aggregation jobs, so a refresh of the data
+invalidates everything at once. Responses carry ETag/Last-Modified derived from
+the version and repeat visitors get 304 Not Modified.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import current_app, request, make_response
+import logging
+
+logger = logging.getLogger(__name__)
+
+DataVersion = namedtuple('DataVersion', ['version', 'updated_at'])
+
+_MISSING = object()
+
+
+class LRUCache:
+    """In-process (per worker) LRU cache with TTL"""
+
+    def __init__(self, max_entries=128, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FileCache:
+    """Cache shared by all gunicorn workers, stored as files in a directory.
+
+    Keys end with the data version, which prefixes the file name. Expired files
+    are deleted when read; files of older versions (and expired ones) are pruned
+    when a worker first writes for a new version, and at most once per ttl.
+    """
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        self._version = None
+        self._pruned_at = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key[-1]}-{hashlib.sha1(repr(key).encode()).hexdigest()}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self._remove(path)
+                return _MISSING
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return _MISSING
+
+    def set(self, key, value):
+        self._maybe_prune(key[-1])
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Cache write error: {e}")
+            self._remove(tmp_path)
+
+    def _maybe_prune(self, version):
+        with self._lock:
+            if version == self._version and time.monotonic() - self._pruned_at < self.ttl:
+                return
+            self._version = version
+            self._pruned_at = time.monotonic()
+        self.prune(version)
+
+    def prune(self, version):
+        """Delete files of older data versions, expired files and leftover temp files"""
+        now = time.time()
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            logger.warning(f"Cache prune error: {e}")
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                expired = now - os.path.getmtime(path) > self.ttl
+            except OSError:
+                continue
+            try:
+                outdated = int(name.split('-', 1)[0]) < version
+            except ValueError:
+                outdated = False
+            # Another worker may already write for a newer version: those files are kept
+            if expired or outdated:
+                self._remove(path)
+                removed += 1
+        if removed:
+            logger.info(f"Cache pruned: {removed} files")
+        return removed
+
+
+class DataVersionMarker:
+    """Data version read from the database at most once per check_interval seconds"""
+
+    def __init__(self, check_interval=30):
+        self.check_interval = check_interval
+        self._value = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._value
+        from .database import get_data_version
+        try:
+            value = get_data_version()
+        except Exception as e:
+            logger.warning(f"Data version check failed, caching disabled: {e}")
+            value = None
+        with self._lock:
+            self._value = value
+            self._checked_at = time.monotonic()
+        return value
+
+
+def init_cache(app):
+    """Create the cache backend and data version marker for the app"""
+    if app.config['CACHE_DIR']:
+        backend = FileCache(app.config['CACHE_DIR'], ttl=app.config['CACHE_TTL'])
+    else:
+        backend = LRUCache(app.config['CACHE_MAX_ENTRIES'], ttl=app.config['CACHE_TTL'])
+    app.extensions['response_cache'] = backend
+    app.extensions['data_version'] = DataVersionMarker(app.config['CACHE_VERSION_CHECK_INTERVAL'])
+
+
+def _cache_enabled():
+    return current_app.config['CACHE_ENABLED'] and 'response_cache' in current_app.extensions
+
+
+def current_data_version():
+    if not _cache_enabled():
+        return None
+    return current_app.extensions['data_version'].get()
+
+
+def cached_query(func):
+    """Cache the result of a query function for the current data version"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        version = current_data_version()
+        if version is None:
+            return func(*args, **kwargs)
+        backend = current_app.extensions['response_cache']
+        key = ('query', func.__name__, args, tuple(sorted(kwargs.items())), version.version)
+        result = backend.get(key)
+        if result is _MISSING:
+            result = func(*args, **kwargs)
+            backend.set(key, result)
+        return result
+    return wrapper
+
+
+def cached_page(view):
+    """Cache the rendered page for the current data version and answer conditional requests.
+
+    Only 200 responses are cached. ETag and Last-Modified come from the data
+    version, so If-None-Match / If-Modified-Since requests get 304 Not Modified.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = current_data_version()
+        if version is None:
+            return view(*args, **kwargs)
+
+        etag = hashlib.sha1(f"{request.full_path}-{version.version}".encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            backend = current_app.extensions['response_cache']
+            key = ('page', request.full_path, version.version)
+            cached = backend.get(key)
+            if cached is _MISSING:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                backend.set(key, (response.get_data(), response.mimetype))
+            else:
+                body, mimetype = cached
+                response = make_response(body)
+                response.mimetype = mimetype
+
+        response.set_etag(etag)
+        if version.updated_at:
+            response.last_modified = version.updated_at
+        # Browsers may keep the page but must revalidate it (cheap 304)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
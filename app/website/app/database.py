@@ -3,55 +3,324 @@
 Database connection and query utilities for the web application
 """
 
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 from flask import current_app
 import logging
 
+from .cache import cached_query, DataVersion
+
 logger = logging.getLogger(__name__)
 
+
+class DatabasePool:
+    """Per-process PostgreSQL connection pool.
+
+    Keeps up to maxconn connections open and reuses them: a returned connection
+    goes back to the idle list (most recently used is handed out first) instead
+    of being closed. When all connections are busy, checkouts wait (up to
+    wait_timeout) instead of failing. Idle connections are health-checked before
+    reuse, and connections idle longer than idle_timeout are closed on checkout
+    and by a background reaper thread (minconn of them are kept). Checkouts and
+    pool waits are counted. The pool is recreated after fork, so it is safe with
+    gunicorn --preload.
+    """
+
+    def __init__(self, db_config, minconn=1, maxconn=5, idle_timeout=300,
+                 health_check_interval=30, wait_timeout=10):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._slots = None
+        # Idle connections as (connection, last returned at), oldest first
+        self._idle = []
+        self._in_use = 0
+        self._stats = {'checkouts': 0, 'connects': 0, 'waits': 0, 'wait_time': 0.0, 'wait_timeouts': 0,
+                       'health_check_failures': 0, 'idle_closed': 0}
+
+    def _ensure_pool(self):
+        """Set the pool up lazily in the current process (again after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Connections inherited from the parent process must not be reused or closed here
+            self._idle = []
+            self._in_use = 0
+            self._slots = threading.BoundedSemaphore(self.maxconn)
+            self._pid = os.getpid()
+            self._start_reaper()
+
+    def _start_reaper(self):
+        """Background thread of the current process closing idle connections (daemon, ends with the pool)"""
+        if self.idle_timeout <= 0:
+            return
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        reaper = threading.Thread(target=self._reap_loop, args=(self._pid, interval),
+                                  name='db-pool-reaper', daemon=True)
+        reaper.start()
+
+    def _reap_loop(self, pid, interval):
+        while True:
+            time.sleep(interval)
+            if self._pid != pid or os.getpid() != pid:
+                return
+            self.reap_idle()
+
+    def reap_idle(self):
+        """Close idle connections unused for longer than idle_timeout, keeping minconn open.
+
+        Returns the number of closed connections.
+        """
+        if self._pid != os.getpid():
+            return 0
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            # The idle list is ordered by last use, so expired connections are at its front
+            keep = max(0, self.minconn - self._in_use)
+            while len(self._idle) > keep and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.pop(0)[0])
+            self._stats['idle_closed'] += len(expired)
+        for conn in expired:
+            self._close(conn)
+        return len(expired)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_config)
+        # Read-only queries - no transaction left open on pooled connections
+        conn.autocommit = True
+        with self._lock:
+            self._stats['connects'] += 1
+        return conn
+
+    def getconn(self):
+        self._ensure_pool()
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            # All connections busy - wait for one to be returned
+            acquired = self._slots.acquire(timeout=self.wait_timeout)
+            waited = time.perf_counter() - started
+            with self._lock:
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += waited
+                if not acquired:
+                    self._stats['wait_timeouts'] += 1
+            if not acquired:
+                raise psycopg2.pool.PoolError(f"No database connection available after {self.wait_timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    conn, returned_at = self._idle.pop() if self._idle else (None, None)
+                if conn is None:
+                    conn = self._connect()
+                    break
+                idle_for = time.monotonic() - returned_at
+                if not conn.closed and idle_for > self.idle_timeout:
+                    self._close(conn)
+                    with self._lock:
+                        self._stats['idle_closed'] += 1
+                    continue
+                if conn.closed or (idle_for > self.health_check_interval and not self._is_healthy(conn)):
+                    self._close(conn)
+                    with self._lock:
+                        self._stats['health_check_failures'] += 1
+                    continue
+                break
+            with self._lock:
+                self._in_use += 1
+                self._stats['checkouts'] += 1
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        if self._pid != os.getpid():
+            return
+        if not conn.closed and not conn.autocommit:
+            # Left in a transaction (e.g. by a failed export) - reset before reuse
+            try:
+                conn.rollback()
+                conn.autocommit = True
+            except psycopg2.Error:
+                self._close(conn)
+        with self._lock:
+            self._in_use -= 1
+            if not conn.closed:
+                self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            if self._pid == os.getpid():
+                stats['in_use'] = self._in_use
+                stats['idle'] = len(self._idle)
+        stats['avg_wait_time'] = stats['wait_time'] / stats['waits'] if stats['waits'] else 0.0
+        stats['maxconn'] = self.maxconn
+        return stats
+
+    def closeall(self):
+        if self._pid == os.getpid():
+            with self._lock:
+                idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._close(conn)
+        self._pid = None
+
+
+def init_db_pool(app):
+    """Create the connection pool for the app (connections are opened on first use)"""
+    app.extensions['db_pool'] = DatabasePool(
+        app.config['DB_CONFIG'],
+        minconn=app.config['DB_POOL_MIN'],
+        maxconn=app.config['DB_POOL_MAX'],
+        idle_timeout=app.config['DB_POOL_IDLE_TIMEOUT'],
+        health_check_interval=app.config['DB_POOL_HEALTH_CHECK_INTERVAL'],
+        wait_timeout=app.config['DB_POOL_WAIT_TIMEOUT'],
+    )
+
+
+def get_db_pool():
+    return current_app.extensions['db_pool']
+
+
+@contextmanager
 def get_db_connection():
-    """Get database connection using Flask app config"""
+    """Borrow a pooled database connection using Flask app config"""
+    pool = get_db_pool()
     try:
-        conn = psycopg2.connect(
-            host=current_app.config['DB_CONFIG']['host'],
-            port=current_app.config['DB_CONFIG']['port'],
-            database=current_app.config['DB_CONFIG']['database'],
-            user=current_app.config['DB_CONFIG']['user'],
-            password=current_app.config['DB_CONFIG']['password']
-        )
-        return conn
+        conn = pool.getconn()
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         raise
-
-def get_playlists_data():
-    """Get all playlists with their videos and statistics"""
-    conn = get_db_connection()
     try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+def get_data_version():
+    """Get the data version marker bumped by the loader and aggregation jobs"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            schema = current_app.config['DB_SCHEMA']
+            cur.execute(f"""
+                SELECT version, updated_at
+                FROM {schema}.data_version
+                WHERE name = 'dashboard'
+            """)
+            row = cur.fetchone()
+            return DataVersion(*row) if row else None
+
+
+@cached_query
+def get_playlists_page(search=None, after=None, limit=20):
+    """Get one page of playlists (keyset pagination on playlist_title, playlist_id)
+
+    after is the (playlist_title, playlist_id) of the last playlist of the previous page.
+    """
+    with get_db_connection() as conn:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             schema = current_app.config['DB_SCHEMA']
+            conditions = []
+            params = {'limit': limit}
+            if search:
+                conditions.append("p.playlist_title ILIKE %(search)s")
+                params['search'] = f"%{search}%"
+            if after:
+                conditions.append("(p.playlist_title, p.playlist_id) > (%(after_title)s, %(after_id)s)")
+                params['after_title'], params['after_id'] = after
+            where = f"AND {' AND '.join(conditions)}" if conditions else ""
             cur.execute(f"""
                 SELECT 
-                    playlist_id,
-                    playlist_title,
-                    video_id,
-                    title,
-                    view_count,
-                    like_count,
-                    published_at
-                FROM {schema}.yt_movies
-                ORDER BY playlist_title, view_count DESC
-            """)
+                    p.playlist_id,
+                    p.playlist_title,
+                    c.video_count
+                FROM {schema}.playlists p
+                CROSS JOIN LATERAL (
+                    SELECT COUNT(*) AS video_count
+                    FROM {schema}.playlist_videos pv
+                    WHERE pv.playlist_key = p.playlist_key
+                ) c
+                WHERE c.video_count > 0 {where}
+                ORDER BY p.playlist_title, p.playlist_id
+                LIMIT %(limit)s
+            """, params)
+            return cur.fetchall()
+
+
+@cached_query
+def get_playlist_videos(playlist_id, top=None, after=None, limit=500):
+    """Get videos of one playlist ordered by published_at (keyset pagination)
+    or, with top, the top N videos by view_count
+
+    after is the (published_at, video_id) of the last video of the previous page;
+    videos without published_at sort first, both in the order and in the keyset.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            schema = current_app.config['DB_SCHEMA']
+            params = {'playlist_id': playlist_id, 'limit': top or limit}
+            keyset = ""
+            if top:
+                order_by = "v.view_count DESC, v.video_id"
+            else:
+                if after:
+                    keyset = """AND (COALESCE(v.published_at, '-infinity'), v.video_id)
+                        > (COALESCE(%(after_published_at)s::timestamp, '-infinity'), %(after_video_id)s)"""
+                    params['after_published_at'], params['after_video_id'] = after
+                order_by = "COALESCE(v.published_at, '-infinity'), v.video_id"
+            cur.execute(f"""
+                SELECT 
+                    v.video_id,
+                    v.title,
+                    v.view_count,
+                    v.like_count,
+                    v.published_at
+                FROM {schema}.playlists p
+                JOIN {schema}.playlist_videos pv ON pv.playlist_key = p.playlist_key
+                JOIN {schema}.videos v ON v.video_key = pv.video_key
+                WHERE p.playlist_id = %(playlist_id)s {keyset}
+                ORDER BY {order_by}
+                LIMIT %(limit)s
+            """, params)
             return cur.fetchall()
-    finally:
-        conn.close()
 
 
+@cached_query
 def get_top_playlists():
     """Get playlists ranked by total views"""
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             schema = current_app.config['DB_SCHEMA']
             cur.execute(f"""
@@ -67,28 +336,178 @@ def get_top_playlists():
                 ORDER BY total_views DESC
             """)
             return cur.fetchall()
-    finally:
-        conn.close()
 
 
 
-def get_playlists_monthly_data():
-    """Get playlists data aggregated by month and year from agg_playlists_monthly table"""
-    conn = get_db_connection()
+def parse_month(value):
+    """'YYYY-MM' -> date of the first day of the month"""
     try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+
+
+def month_range(start=None, end=None):
+    """Month range of the monthly charts as (first month, last month) dates.
+
+    Defaults: MONTHLY_RANGE_START and the month of yesterday (the last day
+    the aggregation covers). Raises ValueError for malformed or reversed
+    ranges and ranges longer than MONTHLY_MAX_MONTHS.
+    """
+    start = parse_month(start or current_app.config['MONTHLY_RANGE_START'])
+    end = parse_month(end) if end else (date.today() - timedelta(days=1)).replace(day=1)
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if months < 1:
+        raise ValueError('Range end is before its start')
+    if months > current_app.config['MONTHLY_MAX_MONTHS']:
+        raise ValueError(f"Range longer than {current_app.config['MONTHLY_MAX_MONTHS']} months")
+    return start, end
+
+
+def month_keys(start, end):
+    """'YYYY.MM' keys of the months start..end (dates, first of month)"""
+    keys = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        keys.append(f'{year:04d}.{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+
+def densify_payload(payload, months):
+    """Sparse payload (non-empty months only) -> series over months, months without videos are 0"""
+    index = {year_month: position for position, year_month in enumerate(payload['year_month'])}
+
+    def series(name):
+        values = payload[name]
+        return [values[index[month]] if month in index else 0 for month in months]
+
+    return {
+        'id': payload['id'],
+        'title': payload['title'],
+        'year_month': months,
+        'total_views': series('total_views'),
+        'total_likes': series('total_likes'),
+        'video_count': series('video_count'),
+    }
+
+
+@cached_query
+def get_playlists_monthly_payloads(start, end):
+    """Get per-playlist monthly chart payloads for the months start..end (dates, first of month).
+
+    agg_playlists_monthly_payload holds one precomputed payload per playlist
+    with the non-empty months only; it is sliced to the range here and the
+    months without videos are filled with 0 (playlists without videos in the
+    range get zero series). The payload is returned as JSON text (columnar:
+    year_month, total_views, total_likes and video_count arrays).
+    """
+    with get_db_connection() as conn:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             schema = current_app.config['DB_SCHEMA']
             cur.execute(f"""
                 SELECT 
                     playlist_id,
                     playlist_title,
-                    year_month,
-                    total_views,
-                    total_likes,
-                    total_videos as video_count
-                FROM {schema}.agg_playlists_monthly
-                ORDER BY playlist_title, year_month
+                    payload
+                FROM {schema}.agg_playlists_monthly_payload
+                ORDER BY playlist_title
             """)
-            return cur.fetchall()
-    finally:
-        conn.close() 
\ No newline at end of file
+            rows = cur.fetchall()
+    months = month_keys(start, end)
+    return [
+        {
+            'playlist_id': row['playlist_id'],
+            'playlist_title': row['playlist_title'],
+            'payload': json.dumps(densify_payload(row['payload'], months), separators=(',', ':'))
+        }
+        for row in rows
+    ]
+
+
+def join_payloads(rows):
+    """Combine pre-serialized playlist payloads into one JSON array without decoding them"""
+    return '[' + ','.join(row['payload'] for row in rows) + ']'
+
+
+# Export datasets: (columns as (name, type), FROM clause, filter conditions by parameter, ORDER BY).
+# Types are the Parquet column types (see app/export.py).
+EXPORT_DATASETS = {
+    'videos': (
+        [('video_id', 'string'), ('title', 'string'), ('playlist_id', 'string'), ('playlist_title', 'string'),
+         ('view_count', 'int64'), ('like_count', 'int64'), ('published_at', 'timestamp')],
+        """{schema}.playlists p
+                JOIN {schema}.playlist_videos pv ON pv.playlist_key = p.playlist_key
+                JOIN {schema}.videos v ON v.video_key = pv.video_key""",
+        {
+            'playlist_id': "p.playlist_id = %(playlist_id)s",
+            'published_from': "v.published_at >= %(published_from)s",
+            'published_to': "v.published_at < %(published_to)s::date + 1",
+        },
+        # Primary key order of playlist_videos: rows come straight from the index, no sort before the first batch
+        "pv.playlist_key, pv.video_key",
+    ),
+    'playlists-summary': (
+        [('playlist_id', 'string'), ('playlist_title', 'string'), ('total_views', 'int64'),
+         ('total_likes', 'int64'), ('total_videos', 'int64'), ('avg_views', 'float64'), ('avg_likes', 'float64')],
+        "{schema}.agg_playlists_summary",
+        {
+            'playlist_id': "playlist_id = %(playlist_id)s",
+        },
+        "playlist_id",
+    ),
+    'playlists-monthly': (
+        [('year_month', 'string'), ('playlist_id', 'string'), ('playlist_title', 'string'),
+         ('total_views', 'int64'), ('total_likes', 'int64'), ('total_videos', 'int64')],
+        "{schema}.agg_playlists_monthly",
+        {
+            'playlist_id': "playlist_id = %(playlist_id)s",
+            'month_from': "year_month >= %(month_from)s",
+            'month_to': "year_month <= %(month_to)s",
+        },
+        "year_month, playlist_id",
+    ),
+}
+
+# Casts of the selected columns, so every driver value matches its export type
+EXPORT_CASTS = {'int64': 'bigint', 'float64': 'double precision'}
+
+
+def iter_export_batches(dataset, filters, batch_size):
+    """Stream the rows of an export dataset in batches of batch_size tuples.
+
+    Uses a named (server-side) cursor, so at most one batch is held in memory
+    regardless of the result size. filters maps the dataset's filter names to
+    values (None = not filtered). Not cached: every call runs the query.
+    """
+    columns, source, conditions, order_by = EXPORT_DATASETS[dataset]
+    params = {name: value for name, value in filters.items() if value is not None}
+    where = " AND ".join(conditions[name] for name in params) or "TRUE"
+    select = ",\n                    ".join(
+        f"{name}::{EXPORT_CASTS[kind]} AS {name}" if kind in EXPORT_CASTS else name
+        for name, kind in columns
+    )
+    with get_db_connection() as conn:
+        # Named cursors live in a transaction; the pool hands out autocommit connections
+        conn.autocommit = False
+        try:
+            with conn.cursor(name=f"export_{dataset.replace('-', '_')}") as cur:
+                cur.itersize = batch_size
+                schema = current_app.config['DB_SCHEMA']
+                cur.execute(f"""
+                    SELECT 
+                    {select}
+                    FROM {source.format(schema=schema)}
+                    WHERE {where}
+                    ORDER BY {order_by}
+                """, params)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            # Also when the client disconnects mid-stream (generator closed)
+            if not conn.closed:
+                conn.rollback()
+                conn.autocommit = True
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Chunked CSV and Parquet encoding of streamed export batches.
+
+Each batch of rows from the database is encoded and handed to the response
+as soon as it is fetched (one CSV chunk or one Parquet row group per batch),
+so worker memory stays bounded by the batch size, not the export size.
+Parquet is encoded with pyarrow (in requirements.txt).
+"""
+
+import csv
+import io
+from datetime import datetime
+
+CSV_MIMETYPE = 'text/csv'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def csv_chunks(columns, batches):
+    """Header and one CSV chunk (str) per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting the bytes written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_chunks(columns, batches):
+    """Parquet file as bytes chunks: one row group per batch, footer at the end"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'string': pa.string(), 'int64': pa.int64(), 'float64': pa.float64(), 'timestamp': pa.timestamp('us')}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
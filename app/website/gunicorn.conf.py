@@ -1,14 +1,26 @@
 # Gunicorn configuration file
+from os import environ
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
 bind = "0.0.0.0:34576"
-workers = 4
-worker_class = "sync"
+workers = int(environ.get('GUNICORN_WORKERS', 4))
+# gthread: every worker serves `threads` requests at once, so a slow query holds one thread
+# instead of a whole worker. "sync" restores one request per worker.
+worker_class = environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 100
-timeout = 30
+timeout = int(environ.get('GUNICORN_TIMEOUT', 30))
 keepalive = 2
 user = None
 group = None
 tmp_upload_dir = None
 logconfig = None
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"' 
\ No newline at end of file
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+
+# One connection pool per worker shared by its threads; by default sized so no thread waits for a connection
+environ.setdefault('FLASK_DB_POOL_MAX', str(threads))
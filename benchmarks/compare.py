@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files (run_benchmarks.py output).
+
+Prints every timing / throughput metric present in both files with the relative
+change and exits with status 1 when any metric regressed by more than
+--threshold (timings up, rps down).
+
+Usage:
+  python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import json
+import sys
+
+# Metrics compared between runs; all other numbers are context
+LOWER_IS_BETTER = ('median', 'p50_ms', 'p95_ms', 'p99_ms')
+HIGHER_IS_BETTER = ('rps',)
+
+
+def flatten(data, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1} for numeric leaves"""
+    items = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            items.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            items[path] = value
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative regression (default: 10%%)')
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    old_metrics = flatten(old['sizes'], 'sizes')
+    new_metrics = flatten(new['sizes'], 'sizes')
+    print(f"{old['commit']} -> {new['commit']}")
+
+    regressions = 0
+    for path in sorted(old_metrics.keys() & new_metrics.keys()):
+        metric = path.rsplit('.', 1)[-1]
+        if metric not in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            continue
+        before, after = old_metrics[path], new_metrics[path]
+        if not before:
+            continue
+        change = (after - before) / before
+        regressed = change > args.threshold if metric in LOWER_IS_BETTER else change < -args.threshold
+        regressions += regressed
+        marker = '  REGRESSION' if regressed else ''
+        print(f"{path:<90} {before:>12.4f} -> {after:>12.4f} {change:>+8.1%}{marker}")
+
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the website read paths and the aggregation SQL.
+
+Seeds the benchmark database (fixtures.py), then runs every query function of
+app/website/app/database.py and every statement of
+app/database_definitions/aggregations/*.sql with auto_explain enabled
+(log_analyze + log_buffers, i.e. EXPLAIN (ANALYZE, BUFFERS) of the statements
+actually executed). The plans are written as JSON to benchmarks/results/.
+
+Flags:
+  - sequential scans of large source tables (videos, playlist_videos, --min-rows) in website
+    queries and incremental aggregations, which are expected to use indexes
+  - with --baseline: sequential scans that were not in the baseline plan and
+    total plan cost growth above --threshold
+
+Exits with status 1 when anything is flagged. auto_explain is loaded per
+session (LOAD), so the benchmark database user must be a superuser.
+
+Usage (from the repository root, against a database whose name ends with _bench):
+  python benchmarks/explain_plans.py --rows 100000 --output /tmp/plans.json
+  python benchmarks/explain_plans.py --rows 100000 --baseline /tmp/plans.json
+"""
+
+import argparse
+import json
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psycopg2.extensions
+
+from run_benchmarks import REPO_ROOT, RESULTS_DIR, configure_environment, git_commit
+from fixtures import SCHEMA, SOURCE_TABLES as FIXTURE_TABLES, bench_db_config, connect, reset_schema, load_movies, server_version
+
+AGGREGATIONS_DIR = REPO_ROOT / 'app' / 'database_definitions' / 'aggregations'
+# Tables that grow with the channel; indexed read paths must not scan them
+SOURCE_TABLES = ('videos', 'playlist_videos', 'yt_movies_snapshots')
+
+AUTO_EXPLAIN = """
+    LOAD 'auto_explain';
+    SET auto_explain.log_min_duration = 0;
+    SET auto_explain.log_analyze = on;
+    SET auto_explain.log_buffers = on;
+    SET auto_explain.log_format = 'json';
+    SET auto_explain.log_level = 'notice';
+"""
+
+
+class PlanCapture:
+    """Collects auto_explain plans sent to the client as notices"""
+
+    def __init__(self):
+        self.notices = deque()
+
+    def enable(self, conn):
+        conn.notices = self.notices
+        with conn.cursor() as cursor:
+            cursor.execute(AUTO_EXPLAIN)
+
+    def take(self):
+        """Plans captured since the last call, in execution order"""
+        plans = []
+        while self.notices:
+            notice = self.notices.popleft()
+            if 'plan:' in notice:
+                plans.append(json.loads(notice[notice.index('{'):]))
+        return plans
+
+    def connection_factory(self):
+        """psycopg2 connection class enabling the capture on every new connection"""
+        capture = self
+
+        class CapturingConnection(psycopg2.extensions.connection):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                capture.enable(self)
+                self.commit()
+
+        return CapturingConnection
+
+
+def walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk(child)
+
+
+def summarize_plan(explain):
+    plan = explain['Plan']
+    nodes = list(walk(plan))
+    return {
+        'total_cost': plan['Total Cost'],
+        'actual_ms': round(plan.get('Actual Total Time', 0), 3),
+        'rows': plan.get('Actual Rows'),
+        'shared_hit_blocks': plan.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': plan.get('Shared Read Blocks', 0),
+        'seq_scans': sorted({node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'}),
+        'node_types': sorted({node['Node Type'] for node in nodes}),
+        'plan': explain
+    }
+
+
+def sample_keys(conn):
+    """A playlist and one of its videos from the middle of the fixture, used as query arguments"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT playlist_id, playlist_title
+            FROM {SCHEMA}.playlists
+            ORDER BY playlist_title, playlist_id
+            OFFSET (SELECT COUNT(*) / 2 FROM {SCHEMA}.playlists) LIMIT 1
+        """)
+        playlist_id, playlist_title = cursor.fetchone()
+        cursor.execute(f"""
+            SELECT v.published_at, v.video_id
+            FROM {SCHEMA}.playlists p
+            JOIN {SCHEMA}.playlist_videos pv ON pv.playlist_key = p.playlist_key
+            JOIN {SCHEMA}.videos v ON v.video_key = pv.video_key
+            WHERE p.playlist_id = %s
+            ORDER BY v.published_at, v.video_id
+            OFFSET 10 LIMIT 1
+        """, (playlist_id,))
+        after_video = cursor.fetchone()
+    return {'playlist_id': playlist_id, 'playlist_title': playlist_title, 'after_video': after_video}
+
+
+def website_queries(sample):
+    """(label, call) for every query function of the website database module"""
+    from app import database as db
+
+    playlist_id = sample['playlist_id']
+    return [
+        ('get_data_version', lambda: db.get_data_version()),
+        ('get_playlists_page', lambda: db.get_playlists_page()),
+        ('get_playlists_page:search', lambda: db.get_playlists_page(search=sample['playlist_title'])),
+        ('get_playlists_page:after', lambda: db.get_playlists_page(after=(sample['playlist_title'], playlist_id))),
+        ('get_playlist_videos', lambda: db.get_playlist_videos(playlist_id)),
+        ('get_playlist_videos:after', lambda: db.get_playlist_videos(playlist_id, after=sample['after_video'])),
+        ('get_playlist_videos:top', lambda: db.get_playlist_videos(playlist_id, top=10)),
+        ('get_top_playlists', lambda: db.get_top_playlists()),
+        ('get_playlists_monthly_payloads', lambda: db.get_playlists_monthly_payloads(*db.month_range())),
+    ]
+
+
+def run_sql_file(conn, capture, path):
+    with conn.cursor() as cursor:
+        cursor.execute(path.read_text())
+    return capture.take()
+
+
+def explain_aggregations(conn, capture):
+    """Full aggregations first, then incremental runs without changes, then the verify queries.
+
+    refresh_*.sql needs the materialized views (ddl/materialized_views.sql) and is skipped.
+    """
+    full = sorted(path for path in AGGREGATIONS_DIR.glob('agg_*.sql') if not path.stem.endswith('_incremental'))
+    incremental = sorted(AGGREGATIONS_DIR.glob('agg_*_incremental.sql'))
+    verify = sorted(AGGREGATIONS_DIR.glob('verify_*.sql'))
+
+    plans = {}
+    for path in full:
+        for number, explain in enumerate(run_sql_file(conn, capture, path), 1):
+            plans[f"aggregations/{path.name}#{number}"] = summarize_plan(explain)
+    with conn.cursor() as cursor:
+        cursor.execute(f"ANALYZE {SCHEMA}.agg_playlists_summary, {SCHEMA}.agg_playlists_monthly, "
+                       f"{SCHEMA}.agg_playlists_monthly_payload")
+    for path in incremental:
+        # The first run establishes the watermark, the second one is the steady state
+        run_sql_file(conn, capture, path)
+        for number, explain in enumerate(run_sql_file(conn, capture, path), 1):
+            plans[f"aggregations/{path.name}#{number}"] = summarize_plan(explain)
+    for path in verify:
+        for number, explain in enumerate(run_sql_file(conn, capture, path), 1):
+            plans[f"aggregations/{path.name}#{number}"] = summarize_plan(explain)
+    return plans
+
+
+def explain_website(sample, capture):
+    from app import create_app
+
+    flask_app = create_app()
+    flask_app.config['CACHE_ENABLED'] = False
+    # The pool opens connections lazily with this config
+    flask_app.config['DB_CONFIG']['connection_factory'] = capture.connection_factory()
+
+    plans = {}
+    with flask_app.app_context():
+        for label, call in website_queries(sample):
+            capture.take()
+            call()
+            captured = capture.take()
+            for number, explain in enumerate(captured, 1):
+                plans[f"website/{label}" + (f"#{number}" if len(captured) > 1 else '')] = summarize_plan(explain)
+        flask_app.extensions['db_pool'].closeall()
+    return plans
+
+
+def large_relations(conn, min_rows):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relname = ANY(%s) AND c.reltuples >= %s
+        """, (SCHEMA, list(SOURCE_TABLES), min_rows))
+        return {row[0] for row in cursor.fetchall()}
+
+
+def expects_index(label):
+    return label.startswith('website/') or '_incremental.sql' in label
+
+
+def find_regressions(plans, large, baseline, threshold):
+    findings = []
+    for label, plan in plans.items():
+        if expects_index(label):
+            for relation in sorted(set(plan['seq_scans']) & large):
+                findings.append(f"{label}: seq scan on {relation}")
+        previous = baseline.get(label)
+        if previous is None:
+            continue
+        for relation in sorted(set(plan['seq_scans']) - set(previous['seq_scans'])):
+            findings.append(f"{label}: new seq scan on {relation} (baseline: {', '.join(previous['node_types'])})")
+        if previous['total_cost'] and plan['total_cost'] > previous['total_cost'] * (1 + threshold):
+            change = plan['total_cost'] / previous['total_cost'] - 1
+            findings.append(f"{label}: cost {previous['total_cost']:.0f} -> {plan['total_cost']:.0f} ({change:+.0%})")
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN (ANALYZE, BUFFERS) regression check')
+    parser.add_argument('--rows', type=int, default=100_000, help='Fixture size (videos)')
+    parser.add_argument('--min-rows', type=int, default=10_000,
+                        help='Tables with at least this many rows must not be seq-scanned by indexed paths')
+    parser.add_argument('--baseline', help='Plan file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.20, help='Allowed relative cost growth (default: 20%%)')
+    parser.add_argument('--output', help='Plan file (default: benchmarks/results/plans-<timestamp>-<commit>.json)')
+    args = parser.parse_args()
+
+    db_config = bench_db_config()
+    configure_environment(db_config)
+    conn = connect(db_config)
+    capture = PlanCapture()
+
+    reset_schema(conn)
+    load_movies(conn, args.rows)
+    with conn.cursor() as cursor:
+        # Visibility map for index-only scans, like a vacuumed production table
+        for table in FIXTURE_TABLES:
+            cursor.execute(f"VACUUM ANALYZE {SCHEMA}.{table}")
+    sample = sample_keys(conn)
+    capture.enable(conn)
+
+    plans = explain_aggregations(conn, capture)
+    plans.update(explain_website(sample, capture))
+    large = large_relations(conn, args.min_rows)
+
+    commit = git_commit()
+    result = {
+        'commit': commit,
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'postgres': server_version(conn),
+        'rows': args.rows,
+        'plans': plans
+    }
+    conn.close()
+
+    for label, plan in plans.items():
+        seq_scans = ', '.join(plan['seq_scans']) or '-'
+        print(f"{label:<60} cost {plan['total_cost']:>12.1f} {plan['actual_ms']:>10.2f} ms  seq: {seq_scans}")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['plans']
+    findings = find_regressions(plans, large, baseline, args.threshold)
+
+    commit_time = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    output = Path(args.output) if args.output else RESULTS_DIR / f"plans-{commit_time}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, default=str))
+    print(f"Plans written to {output}")
+
+    if findings:
+        print('\n'.join(findings))
+        print(f"{len(findings)} plan regression(s)")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the YouTube Data API v3 endpoints used by the data loader
+(channels, playlists, playlistItems, videos).
+
+The channel is synthetic and deterministic: video number g belongs to playlist
+g % playlists, so the same ids can be preloaded into the database by fixtures.py.
+The uploads playlist (UPLOADS_PLAYLIST_ID) lists every video, newest first.
+Latency, page size and 429 injection are configurable. ETag / If-None-Match is
+supported on every endpoint.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PUBLISHED_FROM = datetime(2024, 1, 1, tzinfo=timezone.utc)
+UPLOADS_PLAYLIST_ID = 'UUfake'
+
+
+def video_id(number):
+    return f"v{number:010d}"
+
+
+def playlist_id(number):
+    return f"PL{number:06d}"
+
+
+class FakeChannel:
+    """Synthetic channel: `videos` videos spread round-robin over `playlists` playlists"""
+
+    def __init__(self, videos=10_000, playlists=100, stats_tick=0):
+        self.videos = videos
+        self.playlists = playlists
+        # Bumping the tick changes view/like counts, so a check run has updates to write
+        self.stats_tick = stats_tick
+
+    def playlist_numbers(self):
+        return range(self.playlists)
+
+    def playlist_videos(self, playlist_number):
+        return range(playlist_number, self.videos, self.playlists)
+
+    def uploads(self):
+        return range(self.videos - 1, -1, -1)
+
+    def published_at(self, number):
+        # Spread over the period covered by the monthly aggregation, newest last
+        days = (datetime.now(timezone.utc) - PUBLISHED_FROM).days - 2
+        return (PUBLISHED_FROM + timedelta(days=days * number // max(1, self.videos))).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def statistics(self, number):
+        views = (number * 7919) % 1_000_000 + self.stats_tick * 10
+        return {
+            'viewCount': str(views),
+            'likeCount': str(views // 20),
+            'commentCount': str(views // 200)
+        }
+
+
+class FakeYouTubeAPI:
+    """Threaded HTTP server serving FakeChannel under http://127.0.0.1:<port>/youtube/v3"""
+
+    def __init__(self, channel, latency_ms=0.0, page_size=50, error_rate=0.0, seed=0, port=0):
+        self.channel = channel
+        self.latency_ms = latency_ms
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.requests = {'channels': 0, 'playlists': 0, 'playlistItems': 0, 'videos': 0, 'injected_429': 0, 'not_modified': 0}
+        self._requests_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/youtube/v3"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, name):
+        with self._requests_lock:
+            self.requests[name] += 1
+
+    def _should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _page(self, numbers, params):
+        """Slice of `numbers` for the request's pageToken (offset) and maxResults"""
+        size = min(int(params.get('maxResults', 5)), self.page_size)
+        offset = int(params.get('pageToken') or 0)
+        page = numbers[offset:offset + size]
+        next_token = str(offset + size) if offset + size < len(numbers) else None
+        return page, next_token
+
+    def channels(self, params):
+        return {'items': [{'id': params['id'], 'contentDetails': {'relatedPlaylists': {'uploads': UPLOADS_PLAYLIST_ID}}}]}
+
+    def playlists(self, params):
+        channel = self.channel
+        if params.get('id') == UPLOADS_PLAYLIST_ID:
+            return {'items': [{'id': UPLOADS_PLAYLIST_ID, 'contentDetails': {'itemCount': len(channel.uploads())}}]}
+        numbers, next_token = self._page(channel.playlist_numbers(), params)
+        items = [
+            {
+                'id': playlist_id(number),
+                'snippet': {'title': f"Playlist {number}", 'publishedAt': channel.published_at(0)},
+                'contentDetails': {'itemCount': len(channel.playlist_videos(number))}
+            }
+            for number in numbers
+        ]
+        for item in items:
+            item['etag'] = hashlib.md5(json.dumps(item, sort_keys=True).encode()).hexdigest()
+        return {'items': items, 'nextPageToken': next_token}
+
+    def playlist_items(self, params):
+        channel = self.channel
+        if params['playlistId'] == UPLOADS_PLAYLIST_ID:
+            videos = channel.uploads()
+        else:
+            videos = channel.playlist_videos(int(params['playlistId'][2:]))
+        numbers, next_token = self._page(videos, params)
+        items = [
+            {
+                'snippet': {
+                    'title': f"Video {number}",
+                    'description': 'x' * 500,
+                    'publishedAt': channel.published_at(number),
+                    'resourceId': {'videoId': video_id(number)}
+                }
+            }
+            for number in numbers
+        ]
+        return {'items': items, 'nextPageToken': next_token}
+
+    def videos(self, params):
+        channel = self.channel
+        items = []
+        for vid in params['id'].split(','):
+            number = int(vid[1:])
+            if number >= channel.videos:
+                continue
+            items.append({
+                'id': vid,
+                'snippet': {'title': f"Video {number}", 'publishedAt': channel.published_at(number)},
+                'statistics': channel.statistics(number)
+            })
+        return {'items': items}
+
+    def _handler_class(self):
+        api = self
+        routes = {'channels': api.channels, 'playlists': api.playlists, 'playlistItems': api.playlist_items, 'videos': api.videos}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.rsplit('/', 1)[-1]
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if endpoint not in routes:
+                    self._send(404)
+                    return
+
+                if api.latency_ms:
+                    time.sleep(api.latency_ms / 1000)
+                if api._should_fail():
+                    api._count('injected_429')
+                    body = json.dumps({'error': {'code': 429, 'errors': [{'reason': 'rateLimitExceeded'}]}}).encode()
+                    self._send(429, body, {'Content-Type': 'application/json'})
+                    return
+
+                api._count(endpoint)
+                data = routes[endpoint](params)
+                # Like the real API, the ETag is part of the response body
+                etag = hashlib.md5(json.dumps(data).encode()).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    api._count('not_modified')
+                    self._send(304, headers={'ETag': etag})
+                    return
+                body = json.dumps({'etag': etag, **data}).encode()
+                self._send(200, body, {'Content-Type': 'application/json', 'ETag': etag})
+
+        return Handler
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fake YouTube Data API server')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--videos', type=int, default=10_000)
+    parser.add_argument('--playlists', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--error-rate', type=float, default=0)
+    args = parser.parse_args()
+
+    server = FakeYouTubeAPI(FakeChannel(args.videos, args.playlists), args.latency_ms,
+                            args.page_size, args.error_rate, port=args.port)
+    print(f"Serving fake YouTube API at {server.base_url}")
+    server.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
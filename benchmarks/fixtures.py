@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Postgres fixtures for the benchmarks: a fresh zero_stats schema built from
+app/database_definitions/ddl/ddl.sql and synthetic playlists / videos /
+playlist_videos tables.
+
+Rows are generated server-side (generate_series) with the same video and
+playlist ids as FakeChannel (video g in playlist g % playlists), so the loader
+benchmark updates preloaded rows.
+Because the schema is dropped and recreated, the target database name must end
+with "_bench" (see BENCH_DB_NAME).
+"""
+
+import os
+import time
+from pathlib import Path
+
+import psycopg2
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DDL_PATH = REPO_ROOT / 'app' / 'database_definitions' / 'ddl' / 'ddl.sql'
+SCHEMA = 'zero_stats'
+# Tables the fixture generates (the video data after normalization)
+SOURCE_TABLES = ('playlists', 'videos', 'playlist_videos')
+
+
+def bench_db_config():
+    """Connection settings of the benchmark database (BENCH_DB_* environment variables)"""
+    return {
+        'host': os.getenv('BENCH_DB_HOST', 'localhost'),
+        'port': os.getenv('BENCH_DB_PORT', '5432'),
+        'database': os.getenv('BENCH_DB_NAME', 'zero_stats_bench'),
+        'user': os.getenv('BENCH_DB_USER', 'postgres'),
+        'password': os.getenv('BENCH_DB_PASSWORD', '')
+    }
+
+
+def connect(db_config):
+    if not db_config['database'].endswith('_bench'):
+        raise ValueError(f"Refusing to run benchmarks against '{db_config['database']}' (name must end with _bench)")
+    conn = psycopg2.connect(**db_config)
+    conn.autocommit = True
+    return conn
+
+
+def reset_schema(conn):
+    """Drop and recreate the zero_stats schema from the project DDL"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        cursor.execute(DDL_PATH.read_text())
+
+
+def playlists_for(rows):
+    """Playlist count used for a fixture size (about 100 videos per playlist, 10..2000)"""
+    return max(10, min(2000, rows // 100))
+
+
+def load_movies(conn, rows, playlists=None, seed=0.42):
+    """Fill playlists / videos / playlist_videos with `rows` synthetic videos, returns the load time in seconds"""
+    playlists = playlists or playlists_for(rows)
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT setseed(%s)", (seed,))
+        cursor.execute(f"TRUNCATE {SCHEMA}.playlist_videos, {SCHEMA}.videos, {SCHEMA}.playlists, "
+                       f"{SCHEMA}.yt_movies_snapshots, {SCHEMA}.yt_movies_refresh RESTART IDENTITY")
+        cursor.execute(f"""
+            INSERT INTO {SCHEMA}.playlists (playlist_key, playlist_id, playlist_title)
+            SELECT
+                g + 1,
+                'PL' || lpad(g::text, 6, '0'),
+                'Playlist ' || g
+            FROM generate_series(0, %(playlists)s - 1) AS g
+        """, {'playlists': playlists})
+        cursor.execute(f"""
+            INSERT INTO {SCHEMA}.videos (video_key, video_id, title, view_count, like_count, published_at)
+            SELECT
+                g + 1,
+                'v' || lpad(g::text, 10, '0'),
+                'Video ' || g,
+                (random() * 1000000)::int,
+                (random() * 50000)::int,
+                TIMESTAMP '2024-01-01'
+                    + (g::float / %(rows)s) * (CURRENT_DATE - 2 - DATE '2024-01-01') * INTERVAL '1 day'
+            FROM generate_series(0, %(rows)s - 1) AS g
+        """, {'rows': rows})
+        cursor.execute(f"""
+            INSERT INTO {SCHEMA}.playlist_videos (playlist_key, video_key)
+            SELECT g %% %(playlists)s + 1, g + 1
+            FROM generate_series(0, %(rows)s - 1) AS g
+        """, {'rows': rows, 'playlists': playlists})
+        # Explicit keys above: move the sequences past them for rows inserted by the loader
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{SCHEMA}.playlists', 'playlist_key'), %s)", (playlists,))
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{SCHEMA}.videos', 'video_key'), %s)", (max(rows, 1),))
+        for table in SOURCE_TABLES:
+            cursor.execute(f"ANALYZE {SCHEMA}.{table}")
+    return time.perf_counter() - started
+
+
+def delete_videos_from(conn, first_video_id):
+    """Remove videos with id >= first_video_id (and their playlist memberships)"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM {SCHEMA}.playlist_videos pv
+            USING {SCHEMA}.videos v
+            WHERE v.video_key = pv.video_key AND v.video_id >= %(video_id)s;
+            DELETE FROM {SCHEMA}.videos WHERE video_id >= %(video_id)s;
+        """, {'video_id': first_video_id})
+
+
+def table_size(conn, tables=SOURCE_TABLES):
+    """Total size (with indexes) of the given tables in bytes"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sum(pg_total_relation_size(t))::bigint FROM unnest(%s::regclass[]) AS t",
+                       ([f"{SCHEMA}.{table}" for table in tables],))
+        return cursor.fetchone()[0]
+
+
+def server_version(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        return cursor.fetchone()[0]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create the benchmark schema and synthetic video rows')
+    parser.add_argument('--rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    connection = connect(bench_db_config())
+    reset_schema(connection)
+    elapsed = load_movies(connection, args.rows)
+    print(f"Loaded {args.rows} rows in {elapsed:.1f}s ({table_size(connection) / 1024 / 1024:.1f} MiB)")
+    connection.close()
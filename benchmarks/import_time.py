@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Import-time budget of the data loader package (DAG parsing and CLI startup).
+
+Imports the loader entry points in a fresh interpreter with -X importtime,
+several times, and fails (exit status 1) when
+  - a module that must only be loaded on use is imported (requests, psycopg2,
+    dotenv: they are needed by DataLoader() / the settings, not by the import)
+  - the median cumulative import time of the package exceeds --budget-ms
+
+Runs without a database or network and without the loader's dependencies installed.
+
+Usage (from the repository root):
+  python benchmarks/import_time.py
+  python benchmarks/import_time.py --budget-ms 50 --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = 'data_loader'
+MODULES = ['data_loader.data_loader', 'data_loader.scheduler', 'data_loader.run_loader']
+LAZY_MODULES = ('requests', 'urllib3', 'psycopg2', 'dotenv')
+
+
+def measure():
+    """One interpreter run: {module: (self_us, cumulative_us, depth)} in import order"""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT / 'app'))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(MODULES)}"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        imports[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return imports
+
+
+def package_time_us(imports):
+    """Cumulative time of the package's top-level imports (includes everything they import)"""
+    return sum(cumulative for name, (_, cumulative, depth) in imports.items()
+               if depth == 0 and name.split('.')[0] == PACKAGE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Data loader import-time budget')
+    parser.add_argument('--budget-ms', type=float, default=75, help='Allowed median import time (default: 75 ms)')
+    parser.add_argument('--runs', type=int, default=7, help='Measured interpreter runs (after one warm-up)')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to print')
+    args = parser.parse_args()
+
+    measure()  # warm-up: bytecode compilation
+    runs = [measure() for _ in range(args.runs)]
+    median_ms = statistics.median(package_time_us(imports) for imports in runs) / 1000
+
+    last = runs[-1]
+    print(f"import {', '.join(MODULES)}: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:g} ms)")
+    for name, (self_us, cumulative_us, _) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {self_us / 1000:>7.2f} ms self {cumulative_us / 1000:>8.2f} ms cumulative  {name}")
+
+    failures = []
+    eager = sorted(name for name in last if name.split('.')[0] in LAZY_MODULES)
+    if eager:
+        failures.append(f"imported at import time: {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"import time {median_ms:.1f} ms exceeds the budget of {args.budget_ms:g} ms")
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
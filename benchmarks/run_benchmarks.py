@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the data loader, the aggregation SQL and the website.
+
+Suites:
+  loader        check_for_new_videos (uploads delta and reconcile) against the fake YouTube API
+  aggregations  agg_playlists_monthly / agg_playlists_summary (full and incremental)
+  website       /playlists/, /playlists-monthly/, /top-playlists/ under a threaded load generator
+  serving       /playlists/ and /api/playlists served by gunicorn with sync vs gthread workers
+
+Every suite runs for each fixture size (--rows). Results are written as JSON to
+benchmarks/results/, compare two result files with compare.py.
+
+Usage (from the repository root, against a database whose name ends with _bench):
+  python benchmarks/run_benchmarks.py --rows 10000,100000 --suites loader,aggregations,website,serving
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / 'results'
+QUERIES_DIR = REPO_ROOT / 'app' / 'airflow' / 'queries'
+WEBSITE_DIR = REPO_ROOT / 'app' / 'website'
+
+# data_loader is imported as a top-level package (like in its Docker image),
+# the website as its own "app" package
+sys.path.insert(0, str(REPO_ROOT / 'app'))
+sys.path.insert(0, str(REPO_ROOT / 'app' / 'website'))
+
+from fixtures import (bench_db_config, connect, reset_schema, load_movies, delete_videos_from, playlists_for,
+                      table_size, server_version)
+from fake_youtube_api import FakeChannel, FakeYouTubeAPI, video_id
+
+AGGREGATIONS = [
+    'agg_playlists_monthly.sql',
+    'agg_playlists_summary.sql',
+]
+WEBSITE_ROUTES = ['/playlists/', '/playlists-monthly/', '/top-playlists/']
+SERVING_ROUTES = ['/playlists/', '/api/playlists?limit=20']
+WORKER_CLASSES = ['sync', 'gthread']
+
+
+def configure_environment(db_config):
+    """Point the loader and the website at the benchmark database.
+
+    Must run before data_loader.config / the Flask app are imported. Local state
+    files (fetch state, checkpoint, reports, quota) are disabled so every run
+    does the same work.
+    """
+    os.environ.update({
+        'DB_HOST': db_config['host'],
+        'DB_PORT': str(db_config['port']),
+        'DB_NAME': db_config['database'],
+        'DB_USER': db_config['user'],
+        'DB_PASSWORD': db_config['password'],
+        'DB_SCHEMA': 'zero_stats',
+        'DB_TABLE': 'yt_movies',
+        'YOUTUBE_API_KEY': 'bench-key',
+        'CHANNEL_ID': 'UCbench',
+        'FETCH_STATE_PATH': '',
+        'CHECKPOINT_PATH': '',
+        'RUN_REPORT_PATH': '',
+        'PROMETHEUS_TEXTFILE_PATH': '',
+        'QUOTA_STATE_PATH': '',
+        'API_RATE_LIMIT_PER_SECOND': '0',
+        'API_BACKOFF_BASE_SECONDS': '0.05',
+        'FLASK_DB_HOST': db_config['host'],
+        'FLASK_DB_PORT': str(db_config['port']),
+        'FLASK_DB_NAME': db_config['database'],
+        'FLASK_DB_USER': db_config['user'],
+        'FLASK_DB_PASSWORD': db_config['password'],
+        'FLASK_DB_SCHEMA': 'zero_stats',
+    })
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'runs': [round(value, 4) for value in values],
+        'min': round(values[0], 4),
+        'median': round(statistics.median(values), 4),
+        'max': round(values[-1], 4)
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bench_loader(conn, rows, args):
+    """Time check_for_new_videos on a channel whose videos are already in the database.
+
+    Before every run the newest --loader-new-videos videos of the channel are
+    removed from videos / playlist_videos, so each run discovers them again. The default check
+    (uploads playlist delta) and the full playlist rescan (reconcile) are timed
+    separately; `seconds` is the default check, comparable across commits.
+    """
+    from data_loader.data_loader import DataLoader
+
+    channel = FakeChannel(videos=min(rows, args.loader_videos), playlists=playlists_for(rows))
+    stored_videos = max(0, channel.videos - args.loader_new_videos)
+    delete_videos_from(conn, video_id(channel.videos))
+
+    def run_mode(api, reconcile):
+        runs = []
+        details = []
+        for repeat in range(args.repeat):
+            # New statistics on every run, so each run has rows to update
+            channel.stats_tick += 1
+            delete_videos_from(conn, video_id(stored_videos))
+            loader = DataLoader()
+            loader.youtube_api.base_url = api.base_url
+            try:
+                loader.initialize_database()
+                started = time.perf_counter()
+                summary = loader.check_for_new_videos(reconcile=reconcile)
+                runs.append(time.perf_counter() - started)
+                report = loader.metrics.report()
+                details.append({
+                    'summary': summary,
+                    'spans': report['spans'],
+                    'counters': report['counters'],
+                    'api': loader.youtube_api.get_request_stats()
+                })
+            finally:
+                loader.cleanup()
+        return summarize(runs), details[-1]
+
+    with FakeYouTubeAPI(channel, args.latency_ms, args.page_size, args.error_rate) as api:
+        seconds, last_run = run_mode(api, reconcile=False)
+        reconcile_seconds, reconcile_last_run = run_mode(api, reconcile=True)
+        fake_requests = dict(api.requests)
+
+    return {
+        'channel_videos': channel.videos,
+        'new_videos': channel.videos - stored_videos,
+        'playlists': channel.playlists,
+        'latency_ms': args.latency_ms,
+        'page_size': args.page_size,
+        'error_rate': args.error_rate,
+        'seconds': seconds,
+        'last_run': last_run,
+        'reconcile': {'seconds': reconcile_seconds, 'last_run': reconcile_last_run},
+        'fake_api_requests': fake_requests
+    }
+
+
+def run_sql_file(conn, path):
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute(path.read_text())
+    return time.perf_counter() - started
+
+
+def bench_aggregations(conn, args):
+    """Time the full aggregation queries and their incremental variants"""
+    results = {}
+    for file_name in AGGREGATIONS:
+        path = QUERIES_DIR / file_name
+        results[file_name] = summarize([run_sql_file(conn, path) for _ in range(args.repeat)])
+
+        incremental_path = QUERIES_DIR / file_name.replace('.sql', '_incremental.sql')
+        if not incremental_path.exists():
+            continue
+        # First incremental run establishes the watermark, later ones see no changes
+        run_sql_file(conn, incremental_path)
+        noop = [run_sql_file(conn, incremental_path) for _ in range(args.repeat)]
+        touched = []
+        for _ in range(args.repeat):
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE zero_stats.videos SET view_count = view_count + 1 WHERE random() < 0.01")
+            touched.append(run_sql_file(conn, incremental_path))
+        results[incremental_path.name] = {
+            'no_changes': summarize(noop),
+            'one_percent_changed': summarize(touched)
+        }
+    return results
+
+
+def load_route(base_url, route, concurrency, duration):
+    """Hammer one route from `concurrency` threads for `duration` seconds"""
+    import requests
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies = []
+        local_statuses = {}
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = session.get(base_url + route)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'statuses': statuses
+    }
+
+
+def bench_website(conn, args):
+    """Load-test the dashboard routes with the page cache disabled and enabled"""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    # The pages read the aggregation tables
+    for file_name in AGGREGATIONS:
+        run_sql_file(conn, QUERIES_DIR / file_name)
+
+    flask_app = create_app()
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = {}
+    try:
+        for route in WEBSITE_ROUTES:
+            results[route] = {}
+            for cache_enabled in (False, True):
+                flask_app.config['CACHE_ENABLED'] = cache_enabled
+                load_route(base_url, route, 1, 0.2)  # warm-up
+                results[route]['cached' if cache_enabled else 'uncached'] = load_route(
+                    base_url, route, args.concurrency, args.duration
+                )
+    finally:
+        server.shutdown()
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(worker_class, args):
+    """Run the website with app/website/gunicorn.conf.py and the given worker class"""
+    import requests
+
+    port = free_port()
+    env = dict(os.environ,
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_THREADS=str(args.threads),
+               FLASK_CACHE_ENABLED='false')
+    env.pop('FLASK_DB_POOL_MAX', None)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+         '--bind', f"127.0.0.1:{port}", 'wsgi:app'],
+        cwd=WEBSITE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start")
+
+
+def bench_serving(conn, args):
+    """Same hardware, same worker count: sync vs gthread workers with the page cache disabled"""
+    for file_name in AGGREGATIONS:
+        run_sql_file(conn, QUERIES_DIR / file_name)
+
+    results = {}
+    for worker_class in WORKER_CLASSES:
+        process, base_url = start_gunicorn(worker_class, args)
+        try:
+            results[worker_class] = {}
+            for route in SERVING_ROUTES:
+                load_route(base_url, route, 1, 0.2)  # warm-up
+                results[worker_class][route] = load_route(base_url, route, args.serving_concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='zero_stats benchmark harness')
+    parser.add_argument('--rows', default='10000,100000,1000000',
+                        help='Comma-separated fixture sizes (videos)')
+    parser.add_argument('--suites', default='loader,aggregations,website,serving')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per loader / SQL measurement')
+    parser.add_argument('--loader-videos', type=int, default=10_000, help='Videos on the fake channel (max: rows)')
+    parser.add_argument('--loader-new-videos', type=int, default=20,
+                        help='Newest channel videos missing from the database before every loader run')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Fake API latency per request')
+    parser.add_argument('--page-size', type=int, default=50, help='Fake API max page size')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake API requests answered with 429')
+    parser.add_argument('--concurrency', type=int, default=8, help='Load generator threads per route')
+    parser.add_argument('--duration', type=float, default=10, help='Load test seconds per route and cache mode')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers in the serving suite')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gthread worker in the serving suite')
+    parser.add_argument('--serving-concurrency', type=int, default=32, help='Load generator threads in the serving suite')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<timestamp>-<commit>.json)')
+    args = parser.parse_args()
+
+    suites = {suite.strip() for suite in args.suites.split(',') if suite.strip()}
+    sizes = [int(rows) for rows in args.rows.split(',') if rows.strip()]
+
+    db_config = bench_db_config()
+    configure_environment(db_config)
+    conn = connect(db_config)
+
+    commit = git_commit()
+    result = {
+        'commit': commit,
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'postgres': server_version(conn),
+        'args': vars(args),
+        'sizes': {}
+    }
+
+    for rows in sizes:
+        print(f"== {rows} rows")
+        reset_schema(conn)
+        size_result = {'fixture_seconds': round(load_movies(conn, rows), 2)}
+        size_result['table_bytes'] = table_size(conn)
+
+        if 'aggregations' in suites:
+            print("   aggregations")
+            size_result['aggregations'] = bench_aggregations(conn, args)
+        if 'website' in suites:
+            print("   website")
+            size_result['website'] = bench_website(conn, args)
+        if 'serving' in suites:
+            print("   serving")
+            size_result['serving'] = bench_serving(conn, args)
+        if 'loader' in suites:
+            # Last: the loader changes the video tables
+            print("   loader")
+            size_result['loader'] = bench_loader(conn, rows, args)
+
+        result['sizes'][str(rows)] = size_result
+
+    conn.close()
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{commit}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, default=str))
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()